@@ -2,13 +2,26 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 
 from app.bot.handlers import router
+from app.bot.middlewares import (
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    QueryStatsMiddleware,
+    TelegramMetricsMiddleware,
+)
+from app.config import get_settings
 
 
 def create_dispatcher() -> Dispatcher:
     dp = Dispatcher()
+    dp.update.outer_middleware(MetricsMiddleware())
+    dp.update.outer_middleware(QueryStatsMiddleware())
+    if get_settings().profiling_enabled:
+        dp.update.outer_middleware(ProfilingMiddleware())
     dp.include_router(router)
     return dp
 
 
 def create_bot(token: str) -> Bot:
-    return Bot(token=token, default=DefaultBotProperties(parse_mode="HTML"))
+    bot = Bot(token=token, default=DefaultBotProperties(parse_mode="HTML"))
+    bot.session.middleware(TelegramMetricsMiddleware())
+    return bot
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import inspect
+from typing import Awaitable, Callable, Iterable
+
+from aiogram import Router
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery
+
+from app.config import get_settings
+from app.texts import _t
+
+
+CallbackHandler = Callable[..., Awaitable[None]]
+
+
+class CallbackAction:
+    """Тип callback-данных: короткий код на проводе и целочисленные поля.
+
+    Формат: ``<code>[:<field>...]``, например ``rp:42``. Старое длинное имя
+    (``renew:pick:42``) продолжает распознаваться для уже отправленных кнопок.
+    """
+
+    __slots__ = ("code", "legacy", "fields")
+
+    def __init__(self, code: str, legacy: str, *fields: str) -> None:
+        self.code = code
+        self.legacy = legacy
+        self.fields = fields
+
+    def pack(self, *values: int) -> str:
+        if len(values) != len(self.fields):
+            raise ValueError(f"{self.legacy} expects {len(self.fields)} values, got {len(values)}")
+        if not values:
+            return self.code
+        return ":".join([self.code, *(str(int(value)) for value in values)])
+
+    def unpack(self, args: list[str]) -> dict[str, int]:
+        if len(args) != len(self.fields):
+            raise ValueError(f"{self.legacy} expects {len(self.fields)} values, got {len(args)}")
+        return {name: int(value) for name, value in zip(self.fields, args)}
+
+    def __repr__(self) -> str:
+        return f"CallbackAction({self.code!r}, {self.legacy!r})"
+
+
+# ─── Меню ─────────────────────────────────────────────────────
+CANCEL = CallbackAction("x", "cancel")
+MENU = CallbackAction("m", "menu")
+VPN_INFO = CallbackAction("vi", "vpn:info")
+TARIFFS_INFO = CallbackAction("ti", "tariffs:info")
+BALANCE_REFRESH = CallbackAction("br", "balance:refresh")
+
+# ─── Клиенты ──────────────────────────────────────────────────
+CLIENT_NEW = CallbackAction("cn", "client:new")
+CLIENT_NEW_BACK = CallbackAction("cnb", "client:new:back")
+CLIENT_NEW_DAYS = CallbackAction("cnd", "client:new:days", "days")
+CLIENT_NEW_CONFIRM = CallbackAction("cnc", "client:new:confirm")
+CLIENT_NEW_CONFIRM_BACK = CallbackAction("cncb", "client:new:confirm:back")
+CLIENT_LIST = CallbackAction("cl", "client:list")
+CLIENT_LIST_PAGE = CallbackAction("clp", "client:list:page", "page")
+SKIP_TG = CallbackAction("st", "skip:tg")
+SKIP_DAYS = CallbackAction("sd", "skip:days")
+TARIFF_BACK = CallbackAction("tb", "tariff:back")
+TARIFF_PICK = CallbackAction("tp", "tariff:pick", "tariff_id")
+AMOUNT_NEW = CallbackAction("an", "amount:new", "price")
+IMPORT_CONFIRM = CallbackAction("ic", "import:confirm")
+
+# ─── Продление ────────────────────────────────────────────────
+CLIENT_RENEW = CallbackAction("cr", "client:renew")
+RENEW_LIST_PAGE = CallbackAction("rlp", "renew:list:page", "page")
+RENEW_PICK = CallbackAction("rp", "renew:pick", "client_id")
+RENEW_BACK = CallbackAction("rb", "renew:back")
+RENEW_DAYS = CallbackAction("rd", "renew:days", "days")
+RENEW_TARIFF_BACK = CallbackAction("rtb", "renew:tariff:back")
+RENEW_SAME = CallbackAction("rs", "renew:same")
+RENEW_CONFIRM = CallbackAction("rc", "renew:confirm")
+RENEW_CONFIRM_BACK = CallbackAction("rcb", "renew:confirm:back")
+AMOUNT_RENEW = CallbackAction("ar", "amount:renew", "amount")
+RENEW_BULK = CallbackAction("rbk", "renew:bulk")
+RENEW_BULK_PAGE = CallbackAction("rbp", "renew:bulk:page", "page")
+RENEW_BULK_TOGGLE = CallbackAction("rbt", "renew:bulk:toggle", "client_id", "page")
+RENEW_BULK_ALL = CallbackAction("rba", "renew:bulk:all", "page")
+RENEW_BULK_NEXT = CallbackAction("rbn", "renew:bulk:next")
+RENEW_BULK_DAYS = CallbackAction("rbd", "renew:bulk:days", "days")
+RENEW_BULK_CONFIRM = CallbackAction("rbc", "renew:bulk:confirm")
+
+# ─── Переводы ─────────────────────────────────────────────────
+DEBT_PAY = CallbackAction("dp", "debt:pay")
+TRANSFER_CONFIRM = CallbackAction("tc", "transfer:confirm", "request_id")
+TRANSFER_REJECT = CallbackAction("tr", "transfer:reject", "request_id")
+
+# ─── Владелец ─────────────────────────────────────────────────
+OWNER_AGENTS = CallbackAction("oa", "owner:agents")
+OWNER_BACK = CallbackAction("ob", "owner:back")
+OWNER_ADD_AGENT = CallbackAction("oaa", "owner:add_agent")
+OWNER_LIMIT = CallbackAction("ol", "owner:limit")
+OWNER_LIMIT_PAGE = CallbackAction("olp", "owner:limit:page", "page")
+OWNER_LIMIT_PICK = CallbackAction("olk", "owner:limit:pick", "agent_id")
+OWNER_REPORT = CallbackAction("or", "owner:report")
+OWNER_REPORT_PAGE = CallbackAction("orp", "owner:report:page", "page")
+OWNER_REVENUE = CallbackAction("orv", "owner:revenue", "days")
+OWNER_EXPORT_MENU = CallbackAction("oem", "owner:export:menu")
+OWNER_EXPORT = CallbackAction("oe", "owner:export", "dataset", "fmt")
+OWNER_COMPENSATE_CONFIRM = CallbackAction("occ", "owner:compensate:confirm")
+OWNER_SYNC = CallbackAction("os", "owner:sync")
+OWNER_REFRESH_AGENTS = CallbackAction("ora", "owner:refresh_agents")
+OWNER_NOTIFY_PREVIEW = CallbackAction("onp", "owner:notify:preview")
+OWNER_NOTIFY_SEND = CallbackAction("ons", "owner:notify:send")
+OWNER_DELETE_CLIENT = CallbackAction("odc", "owner:delete:client")
+OWNER_DELETE_CLIENT_PAGE = CallbackAction("odcp", "owner:delete:client:page", "page")
+OWNER_DELETE_CLIENT_PICK = CallbackAction("odck", "owner:delete:client:pick", "client_id")
+OWNER_DELETE_CLIENT_CONFIRM = CallbackAction("odcc", "owner:delete:client:confirm", "client_id")
+OWNER_DELETE_AGENT = CallbackAction("oda", "owner:delete:agent")
+OWNER_DELETE_AGENT_PAGE = CallbackAction("odap", "owner:delete:agent:page", "page")
+OWNER_DELETE_AGENT_PICK = CallbackAction("odak", "owner:delete:agent:pick", "agent_id")
+OWNER_DELETE_AGENT_CONFIRM = CallbackAction("odac", "owner:delete:agent:confirm", "agent_id")
+
+
+ACTIONS: tuple[CallbackAction, ...] = tuple(
+    value for value in list(globals().values()) if isinstance(value, CallbackAction)
+)
+
+
+class CallbackTable:
+    """Маршрутизация callback-запросов одним поиском в словаре по коду."""
+
+    def __init__(self, actions: Iterable[CallbackAction], name: str = "callbacks") -> None:
+        self.router = Router(name=name)
+        self._by_code: dict[str, CallbackAction] = {}
+        self._by_legacy: dict[str, CallbackAction] = {}
+        self._handlers: dict[str, tuple[CallbackHandler, bool]] = {}
+        self._max_fields = 0
+        for action in actions:
+            if action.code in self._by_code or action.legacy in self._by_legacy:
+                raise ValueError(f"Duplicate callback action {action!r}")
+            self._by_code[action.code] = action
+            self._by_legacy[action.legacy] = action
+            self._max_fields = max(self._max_fields, len(action.fields))
+        legacy_heads = {action.legacy.split(":", 1)[0] for action in self._by_legacy.values()}
+        clashes = legacy_heads & self._by_code.keys()
+        if clashes:
+            raise ValueError(f"Callback codes clash with legacy prefixes: {sorted(clashes)}")
+        self.router.callback_query.register(self._dispatch)
+
+    def route(self, action: CallbackAction) -> Callable[[CallbackHandler], CallbackHandler]:
+        if action.code not in self._by_code:
+            raise ValueError(f"Unknown callback action {action!r}")
+
+        def decorator(handler: CallbackHandler) -> CallbackHandler:
+            if action.code in self._handlers:
+                raise ValueError(f"Callback action {action!r} already has a handler")
+            wants_state = "state" in inspect.signature(handler).parameters
+            self._handlers[action.code] = (handler, wants_state)
+            return handler
+
+        return decorator
+
+    def resolve(self, data: str) -> tuple[CallbackAction, dict[str, int]] | None:
+        """Возвращает действие и разобранные поля; ValueError при битых полях."""
+        code, _, rest = data.partition(":")
+        action = self._by_code.get(code)
+        if action is not None:
+            return action, action.unpack(rest.split(":") if rest else [])
+        return self._resolve_legacy(data)
+
+    def _resolve_legacy(self, data: str) -> tuple[CallbackAction, dict[str, int]] | None:
+        parts = data.split(":")
+        for arity in range(min(self._max_fields, len(parts) - 1) + 1):
+            name = ":".join(parts[: len(parts) - arity]) if arity else data
+            action = self._by_legacy.get(name)
+            if action is not None and len(action.fields) == arity:
+                return action, action.unpack(parts[len(parts) - arity :] if arity else [])
+        return None
+
+    async def _dispatch(self, call: CallbackQuery, state: FSMContext) -> None:
+        try:
+            resolved = self.resolve(call.data or "")
+        except ValueError:
+            await call.answer(_t(get_settings().text_page_invalid), show_alert=True)
+            return
+        entry = self._handlers.get(resolved[0].code) if resolved else None
+        if entry is None:
+            await call.answer()
+            return
+        handler, wants_state = entry
+        if wants_state:
+            await handler(call, state=state, **resolved[1])
+        else:
+            await handler(call, **resolved[1])
+
+
+callback_table = CallbackTable(ACTIONS)
+route = callback_table.route
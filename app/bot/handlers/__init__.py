@@ -1,14 +1,23 @@
 from aiogram import Router
 
+from app.bot.callbacks import callback_table
+
 from .clients import router as clients_router
+from .compensations import router as compensations_router
+from .imports import router as imports_router
 from .menu import router as menu_router
 from .owner import router as owner_router
 from .payments import router as payments_router
 from .renewals import router as renewals_router
+from .search import router as search_router
 
 router = Router()
 router.include_router(menu_router)
 router.include_router(clients_router)
+router.include_router(imports_router)
 router.include_router(renewals_router)
 router.include_router(payments_router)
 router.include_router(owner_router)
+router.include_router(compensations_router)
+router.include_router(search_router)
+router.include_router(callback_table.router)
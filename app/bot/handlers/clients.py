@@ -1,10 +1,12 @@
 import logging
 from datetime import datetime
+from uuid import uuid4
 
 from aiogram import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
+from app.bot import callbacks as cb
 from app.bot.keyboards import (
     amount_presets_keyboard,
     back_to_menu_keyboard,
@@ -13,7 +15,6 @@ from app.bot.keyboards import (
     clients_keyboard,
     new_client_confirm_keyboard,
     new_client_days_keyboard,
-    skip_keyboard,
     tariffs_keyboard,
 )
 from app.bot.states import NewClientState, RenewState
@@ -22,15 +23,15 @@ from app.db.session import SessionLocal
 from app.services.agent_service import get_agent_by_id, get_or_create_agent
 from app.services.client_service import (
     add_days,
-    create_client,
     get_client_by_id,
     get_client_by_username,
     get_client_by_username_any,
     list_clients_by_agent,
     list_clients_with_agents,
 )
-from app.services.debt_service import increase_debt
-from app.services.remnawave_service import create_user_only, username_exists
+from app.services.data_version import clients_version
+from app.services.job_service import JOB_CREATE, enqueue_job
+from app.services.remnawave_service import username_exists
 
 from .common import (
     _amount_presets,
@@ -47,13 +48,21 @@ from .common import (
     _t,
     _tariffs_for_user,
 )
-from .menu import _edit_or_send, _render_error_prompt, _render_menu_text, _show_start_menu, _show_status_then_menu
+from .menu import (
+    _edit_or_send,
+    _render_error_prompt,
+    _render_menu,
+    _render_menu_text,
+    _show_start_menu,
+    _show_status_then_menu,
+)
+from .pages import PageSource, PageVersion, RenderedPage, _show_page
 
 
 router = Router()
 
 
-@router.callback_query(lambda call: call.data == "client:new")
+@cb.route(cb.CLIENT_NEW)
 async def new_client_callback(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -92,7 +101,7 @@ async def new_client_callback(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "tariff:back")
+@cb.route(cb.TARIFF_BACK)
 async def tariff_back(call: CallbackQuery, state: FSMContext) -> None:
     settings = get_settings()
     data = await state.get_data()
@@ -196,7 +205,7 @@ async def new_client_username(message: Message, state: FSMContext) -> None:
     )
 
 
-@router.callback_query(lambda call: call.data == "client:new:back")
+@cb.route(cb.CLIENT_NEW_BACK)
 async def new_client_days_back(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -212,16 +221,11 @@ async def new_client_days_back(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data.startswith("client:new:days:"))
-async def new_client_pick_days(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.CLIENT_NEW_DAYS)
+async def new_client_pick_days(call: CallbackQuery, state: FSMContext, days: int) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
         return
-    try:
-        days = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(get_settings().text_page_invalid), show_alert=True)
-        return
     await state.update_data(days=days, telegram_id=None)
     settings = get_settings()
     is_owner = call.from_user.id == settings.owner_telegram_id
@@ -248,7 +252,7 @@ async def new_client_pick_days(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "skip:tg")
+@cb.route(cb.SKIP_TG)
 async def new_client_skip_tg(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -284,17 +288,12 @@ async def new_client_skip_tg(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data.startswith("tariff:pick:"))
-async def tariff_pick(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.TARIFF_PICK)
+async def tariff_pick(call: CallbackQuery, state: FSMContext, tariff_id: int) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
         return
     settings = get_settings()
-    try:
-        tariff_id = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(settings.text_no_access_alert), show_alert=True)
-        return
     data = await state.get_data()
     current_state = await state.get_state()
     target_agent_id = data.get("agent_id")
@@ -359,7 +358,7 @@ async def tariff_pick(call: CallbackQuery, state: FSMContext) -> None:
                 desc=desc_line,
                 prompt=price_prompt,
             ),
-            reply_markup=amount_presets_keyboard("amount:new", presets),
+            reply_markup=amount_presets_keyboard(cb.AMOUNT_NEW, presets),
             is_menu=True,
         )
         await call.answer()
@@ -434,7 +433,7 @@ async def tariff_pick(call: CallbackQuery, state: FSMContext) -> None:
                 profit=profit_label,
                 prompt=prompt_with_hint,
             ),
-            reply_markup=amount_presets_keyboard("amount:renew", presets),
+            reply_markup=amount_presets_keyboard(cb.AMOUNT_RENEW, presets),
             is_menu=True,
         )
         await call.answer()
@@ -469,7 +468,7 @@ async def new_client_price(message: Message, state: FSMContext) -> None:
             name=message.from_user.full_name,
             error_text=_t(get_settings().text_amount_invalid_example),
             prompt_text=f"{_t(get_settings().text_new_client_price_prompt)}\n\n{_t(get_settings().text_amount_choose_hint)}",
-            reply_markup=amount_presets_keyboard("amount:new", _amount_presets(base_price)),
+            reply_markup=amount_presets_keyboard(cb.AMOUNT_NEW, _amount_presets(base_price)),
         )
         return
     if price <= 0:
@@ -482,7 +481,7 @@ async def new_client_price(message: Message, state: FSMContext) -> None:
             name=message.from_user.full_name,
             error_text=_t(get_settings().text_amount_positive),
             prompt_text=f"{_t(get_settings().text_new_client_price_prompt)}\n\n{_t(get_settings().text_amount_choose_hint)}",
-            reply_markup=amount_presets_keyboard("amount:new", _amount_presets(base_price)),
+            reply_markup=amount_presets_keyboard(cb.AMOUNT_NEW, _amount_presets(base_price)),
         )
         return
 
@@ -498,7 +497,7 @@ async def new_client_price(message: Message, state: FSMContext) -> None:
     amount_total = _calc_amount_by_days(settings, price, days)
     owner_share = _calc_base_debt(settings, days, base_price)
     profit = amount_total - owner_share
-    await state.update_data(new_client_amount_monthly=price)
+    await state.update_data(new_client_amount_monthly=price, job_key=uuid4().hex)
     await state.set_state(NewClientState.waiting_confirm)
     await _render_menu_text(
         bot=message.bot,
@@ -522,18 +521,12 @@ async def new_client_price(message: Message, state: FSMContext) -> None:
     return
 
 
-@router.callback_query(lambda call: call.data.startswith("amount:new:"))
-async def new_client_amount_preset(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.AMOUNT_NEW)
+async def new_client_amount_preset(call: CallbackQuery, state: FSMContext, price: int) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
         return
     settings = get_settings()
-    token = call.data.split(":")[-1]
-    try:
-        price = int(token)
-    except ValueError:
-        await call.answer(_t(settings.text_amount_invalid), show_alert=True)
-        return
     if price <= 0:
         await call.answer(_t(settings.text_amount_positive), show_alert=True)
         return
@@ -546,7 +539,7 @@ async def new_client_amount_preset(call: CallbackQuery, state: FSMContext) -> No
     amount_total = _calc_amount_by_days(settings, price, days)
     owner_share = _calc_base_debt(settings, days, base_price)
     profit = amount_total - owner_share
-    await state.update_data(new_client_amount_monthly=price)
+    await state.update_data(new_client_amount_monthly=price, job_key=uuid4().hex)
     await state.set_state(NewClientState.waiting_confirm)
     await _edit_or_send(
         call,
@@ -567,7 +560,7 @@ async def new_client_amount_preset(call: CallbackQuery, state: FSMContext) -> No
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "client:new:confirm")
+@cb.route(cb.CLIENT_NEW_CONFIRM)
 async def new_client_confirm(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -577,7 +570,11 @@ async def new_client_confirm(call: CallbackQuery, state: FSMContext) -> None:
     if not amount_monthly:
         await call.answer(_t(get_settings().text_amount_invalid), show_alert=True)
         return
-    await _create_client_in_remnawave(
+    # Без ключа идемпотентности повторное нажатие создало бы второе задание.
+    if not data.get("job_key"):
+        await call.answer(_t(get_settings().text_confirm_expired), show_alert=True)
+        return
+    await _enqueue_client_creation(
         actor_id=call.from_user.id,
         actor_name=call.from_user.full_name,
         actor_username=call.from_user.username,
@@ -589,12 +586,13 @@ async def new_client_confirm(call: CallbackQuery, state: FSMContext) -> None:
         base_price=data.get("tariff_base_price"),
         tariff_name=data.get("tariff_name"),
         tariff_remnawave=data.get("tariff_remnawave") or {},
+        job_key=data["job_key"],
     )
     await state.clear()
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "client:new:confirm:back")
+@cb.route(cb.CLIENT_NEW_CONFIRM_BACK)
 async def new_client_confirm_back(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -606,13 +604,13 @@ async def new_client_confirm_back(call: CallbackQuery, state: FSMContext) -> Non
     await _edit_or_send(
         call,
         f"{_t(settings.text_new_client_price_prompt)}\n\n{_t(settings.text_amount_choose_hint)}",
-        reply_markup=amount_presets_keyboard("amount:new", _amount_presets(base_price)),
+        reply_markup=amount_presets_keyboard(cb.AMOUNT_NEW, _amount_presets(base_price)),
         is_menu=True,
     )
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "client:list")
+@cb.route(cb.CLIENT_LIST)
 async def clients_list(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -622,21 +620,16 @@ async def clients_list(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data.startswith("client:list:page:"))
-async def clients_list_page(call: CallbackQuery) -> None:
+@cb.route(cb.CLIENT_LIST_PAGE)
+async def clients_list_page(call: CallbackQuery, page: int) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
         return
-    try:
-        page = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(get_settings().text_page_invalid), show_alert=True)
-        return
     await _render_clients_list(call, page=page, edit=True)
     await call.answer()
 
 
-async def _create_client_in_remnawave(
+async def _enqueue_client_creation(
     actor_id: int,
     actor_name: str,
     actor_username: str | None,
@@ -645,6 +638,7 @@ async def _create_client_in_remnawave(
     telegram_id: int | None,
     days: int,
     monthly_price: int,
+    job_key: str,
     base_price: int | None = None,
     tariff_name: str | None = None,
     tariff_remnawave: dict | None = None,
@@ -703,78 +697,37 @@ async def _create_client_in_remnawave(
             logging.info("Client already exists in DB: agent_id=%s username=%s id=%s", agent.id, username, existing.id)
             return
 
-        try:
-            result = await create_user_only(
-                username=username,
-                days=days,
-                description=f"agent:{agent.telegram_id}",
-                telegram_id=telegram_id,
-                overrides=(tariff_remnawave or {}),
-            )
-        except Exception as exc:
-            logging.exception("Create Remnawave error")
-            await _show_status_then_menu(
-                bot=message.bot,
-                chat_id=message.chat.id,
-                user_id=actor_id,
-                name=actor_name,
-                is_owner=actor_id == settings.owner_telegram_id,
-                status_text=_t(settings.text_create_error, error=exc),
-            )
-            return
-        if result.get("exists"):
-            await _show_status_then_menu(
-                bot=message.bot,
-                chat_id=message.chat.id,
-                user_id=actor_id,
-                name=actor_name,
-                is_owner=actor_id == settings.owner_telegram_id,
-                status_text=_t(settings.text_username_taken_panel, username=username),
-            )
-            return
-
-        expires_at = result.get("expires_at")
-        subscription_link = result.get("subscription_url")
-        amount_total = _calc_amount_by_days(settings, monthly_price, days)
-        await create_client(
+        # Панель меняет воркер очереди: пользователь не ждёт её ответа, результат придёт в меню.
+        await enqueue_job(
             session,
-            agent_id=agent.id,
-            username=username,
-            telegram_id=telegram_id,
-            expires_at=expires_at,
-            subscription_link=subscription_link,
-            monthly_price=monthly_price,
-            last_payment_amount=amount_total,
-            last_payment_at=datetime.utcnow(),
-            tariff_name=tariff_name,
-            tariff_base_price=base_price,
-        )
-        logging.info(
-            "Client created in DB after Remnawave: agent_id=%s username=%s",
-            agent.id,
-            username,
-        )
-        await increase_debt(session, agent, owner_share, f"Создание клиента {username}")
-        profit = amount_total - owner_share
-        await _show_status_then_menu(
-            bot=message.bot,
+            JOB_CREATE,
+            f"create:{job_key}",
+            {
+                "agent_id": agent.id,
+                "username": username,
+                "telegram_id": telegram_id,
+                "days": days,
+                "monthly_price": monthly_price,
+                "amount_total": _calc_amount_by_days(settings, monthly_price, days),
+                "owner_share": owner_share,
+                "base_price": base_price,
+                "tariff_name": tariff_name,
+                "overrides": tariff_remnawave or {},
+                "description": f"agent:{agent.telegram_id}",
+                "actor_name": actor_name,
+                "is_owner": actor_id == settings.owner_telegram_id,
+            },
             chat_id=message.chat.id,
             user_id=actor_id,
-            name=actor_name,
-            is_owner=actor_id == settings.owner_telegram_id,
-            status_text=_t(
-                settings.text_create_success,
-                username=username,
-                days=days,
-                profit=profit,
-                amount=amount_total,
-                base_price=owner_share,
-                payable=agent.current_debt,
-            ),
-            extra_text=(
-                _t(settings.text_subscription_link, link=subscription_link) if subscription_link else None
-            ),
         )
+    await _render_menu(
+        bot=message.bot,
+        chat_id=message.chat.id,
+        user_id=actor_id,
+        name=actor_name,
+        is_owner=actor_id == settings.owner_telegram_id,
+        text=_t(settings.text_job_queued),
+    )
 
 
 def _format_date(value: datetime | None) -> str:
@@ -835,59 +788,57 @@ async def _render_clients_list(call: CallbackQuery, page: int, edit: bool = Fals
     settings = get_settings()
     is_owner = call.from_user.id == settings.owner_telegram_id
     is_admin = call.from_user.id in settings.admin_id_set
+    user = call.from_user
 
-    async with SessionLocal() as session:
-        if is_owner or is_admin:
-            client_rows = await list_clients_with_agents(session)
-            lines = [
-                _format_client_line(client, _agent_display(agent))
-                for client, agent in client_rows
-                if client.username
-            ]
-        else:
-            agent = await get_or_create_agent(
-                session,
-                call.from_user.id,
-                call.from_user.full_name,
-                call.from_user.username,
+    async def load() -> PageSource:
+        async with SessionLocal() as session:
+            if is_owner or is_admin:
+                # Версия до чтения: изменение во время выборки не оставит в кеше старую страницу.
+                version = PageVersion.of(clients_version, None)
+                client_rows = await list_clients_with_agents(session)
+                lines = [
+                    _format_client_line(client, _agent_display(agent))
+                    for client, agent in client_rows
+                    if client.username
+                ]
+            else:
+                agent = await get_or_create_agent(
+                    session,
+                    user.id,
+                    user.full_name,
+                    user.username,
+                )
+                version = PageVersion.of(clients_version, agent.id)
+                clients = await list_clients_by_agent(session, agent.id)
+                lines = [
+                    _format_client_line(client, None)
+                    for client in clients
+                    if client.username
+                ]
+
+        page_size = 5
+        total_pages = max(1, (len(lines) + page_size - 1) // page_size)
+        header = (
+            _t(settings.text_clients_list_header_owner)
+            if is_owner or is_admin
+            else _t(settings.text_clients_list_header_agent)
+        )
+        separator = _t(settings.text_client_list_separator)
+
+        def render(page: int) -> RenderedPage:
+            if not lines:
+                return RenderedPage(_t(settings.text_clients_list_empty), back_to_menu_keyboard(), page, total_pages)
+            start_idx = (page - 1) * page_size
+            end_idx = start_idx + page_size
+            page_lines = lines[start_idx:end_idx]
+            body = f"\n{separator}\n".join(page_lines) if separator else "\n\n".join(page_lines)
+            return RenderedPage(
+                f"{header} · {page}/{total_pages}\n\n{body}",
+                clients_list_pagination_keyboard(page, total_pages),
+                page,
+                total_pages,
             )
-            clients = await list_clients_by_agent(session, agent.id)
-            lines = [
-                _format_client_line(client, None)
-                for client in clients
-                if client.username
-            ]
-
-    if not lines:
-        await _edit_or_send(call, _t(settings.text_clients_list_empty), reply_markup=back_to_menu_keyboard(), is_menu=True)
-        return
 
-    page_size = 5
-    total_pages = max(1, (len(lines) + page_size - 1) // page_size)
-    page = max(1, min(page, total_pages))
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    header = (
-        _t(settings.text_clients_list_header_owner)
-        if is_owner or is_admin
-        else _t(settings.text_clients_list_header_agent)
-    )
-    separator = _t(settings.text_client_list_separator)
-    page_lines = lines[start_idx:end_idx]
-    body = f"\n{separator}\n".join(page_lines) if separator else "\n\n".join(page_lines)
-    status_text = f"{header} · {page}/{total_pages}\n\n{body}"
+        return PageSource(version, total_pages, render)
 
-    if edit:
-        await _edit_or_send(
-            call,
-            status_text,
-            reply_markup=clients_list_pagination_keyboard(page, total_pages),
-            is_menu=True,
-        )
-        return
-    await _edit_or_send(
-        call,
-        status_text,
-        reply_markup=clients_list_pagination_keyboard(page, total_pages),
-        is_menu=True,
-    )
+    await _show_page(call, "clients", None if is_owner or is_admin else user.id, page, load)
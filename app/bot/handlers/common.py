@@ -1,9 +1,12 @@
+import html
 import re
 import math
+import time
 
 from app.config import get_settings
 from app.db.session import SessionLocal
 from app.services.agent_service import get_agent_by_telegram_id
+from app.texts import _t
 
 
 USERNAME_PATTERN = re.compile(r"^[a-zA-Z0-9_-]{3,36}$")
@@ -11,11 +14,6 @@ _SKIP_TOKENS = {"/skip", "skip", "пропустить"}
 _CANCEL_TOKENS = {"/cancel", "cancel", "отмена", "стоп"}
 
 
-def _t(value: str, **kwargs) -> str:
-    text = value.replace("\\n", "\n")
-    return text.format(**kwargs) if kwargs else text
-
-
 def _tariffs_for_user(settings, telegram_id: int, show_all: bool = False) -> list[dict]:
     if show_all:
         return settings.tariffs()
@@ -108,3 +106,44 @@ def _agent_display(agent) -> str:
         return agent.name
     telegram_id = getattr(agent, "telegram_id", "")
     return str(telegram_id) if telegram_id else ""
+
+
+def _short_list(items: list[str], limit: int = 15) -> str:
+    """Первые ``limit`` строк (с экранированием HTML) и счётчик остальных — для списков ошибок в сообщениях."""
+    lines = [html.escape(item) for item in items[:limit]]
+    if len(items) > limit:
+        lines.append(f"… ещё {len(items) - limit}")
+    return "\n".join(lines)
+
+
+def _throttled_editor(edit, interval: float):
+    """Правит одно сообщение через ``edit(text, **kwargs)`` не чаще раза в ``interval`` секунд.
+
+    Итоговая правка (``final=True``) проходит всегда. ``text`` может быть функцией:
+    тогда текст собирается, только если правка состоится.
+    """
+    last_edit = 0.0
+
+    async def update(text, *, final: bool = False, **kwargs) -> None:
+        nonlocal last_edit
+        now = time.monotonic()
+        if not final and now - last_edit < interval:
+            return
+        last_edit = now
+        try:
+            await edit(text() if callable(text) else text, **kwargs)
+        except Exception:
+            # «message is not modified» и флуд-лимиты не должны прерывать операцию.
+            pass
+
+    return update
+
+
+def _progress_editor(message, template: str, interval: float):
+    """Колбэк прогресса для долгих операций: правит одно сообщение не чаще раза в ``interval`` секунд."""
+    update = _throttled_editor(message.edit_text, interval)
+
+    async def progress(done: int, total: int) -> None:
+        await update(lambda: _t(template, done=done, total=total), final=done >= total)
+
+    return progress
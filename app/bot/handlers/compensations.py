@@ -0,0 +1,247 @@
+import asyncio
+import html
+import logging
+import shlex
+from datetime import datetime, timedelta
+from functools import partial
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, Message
+
+from app.bot import callbacks as cb
+from app.bot.keyboards import back_to_menu_keyboard, compensation_confirm_keyboard
+from app.bot.states import CompensationState
+from app.config import get_settings
+from app.db.session import SessionLocal
+from app.models import Compensation
+from app.services.agent_service import get_agent_by_telegram_id, get_agent_by_username
+from app.services.compensation_service import (
+    STATUS_DONE,
+    STATUS_RUNNING,
+    cancel_compensations,
+    count_targets,
+    create_compensation,
+    list_running_compensations,
+    run_compensation,
+    set_progress_message,
+)
+
+from .common import _agent_display, _short_list, _t, _throttled_editor
+
+
+router = Router()
+
+# Запущенные проходы: ссылка держит задачу от сборщика мусора.
+_TASKS: dict[int, asyncio.Task] = {}
+
+
+def _compensation_text(settings, compensation: Compensation) -> str:
+    values = {
+        "days": compensation.days,
+        "total": compensation.total,
+        "extended": compensation.extended,
+        "failed": compensation.failed,
+    }
+    if compensation.status == STATUS_RUNNING:
+        return _t(
+            settings.text_compensation_progress, done=compensation.extended + compensation.failed, **values
+        )
+    text = _t(
+        settings.text_compensation_done if compensation.status == STATUS_DONE else settings.text_compensation_cancelled,
+        **values,
+    )
+    if compensation.failed_usernames:
+        text += "\n\n" + _t(settings.text_compensation_failed_header) + "\n" + _short_list(compensation.failed_usernames)
+    return text
+
+
+def _progress_sender(bot, interval: float):
+    """Правит сообщение с прогрессом не чаще раза в ``interval`` секунд; итог — всегда."""
+    update = None
+
+    async def progress(compensation: Compensation) -> None:
+        nonlocal update
+        if compensation.chat_id is None or compensation.message_id is None:
+            return
+        if update is None:
+            update = _throttled_editor(
+                partial(bot.edit_message_text, chat_id=compensation.chat_id, message_id=compensation.message_id),
+                interval,
+            )
+        running = compensation.status == STATUS_RUNNING
+        await update(
+            lambda: _compensation_text(get_settings(), compensation),
+            final=not running,
+            reply_markup=None if running else back_to_menu_keyboard(),
+        )
+
+    return progress
+
+
+async def _run(bot, compensation_id: int) -> None:
+    settings = get_settings()
+    try:
+        await run_compensation(
+            compensation_id,
+            concurrency=settings.compensation_concurrency,
+            rate_per_second=settings.compensation_rate_per_second,
+            chunk_size=settings.compensation_chunk_size,
+            progress=_progress_sender(bot, settings.progress_edit_interval_seconds),
+        )
+    except Exception:
+        # Чекпоинт уже в базе: при следующем запуске бота проход продолжится с него.
+        logging.exception("Compensation %s failed", compensation_id)
+    finally:
+        _TASKS.pop(compensation_id, None)
+
+
+def start_compensation(bot, compensation_id: int) -> None:
+    if compensation_id not in _TASKS:
+        _TASKS[compensation_id] = asyncio.create_task(_run(bot, compensation_id), name=f"compensation-{compensation_id}")
+
+
+async def resume_compensations(bot) -> int:
+    """Продолжает компенсации, прерванные остановкой бота, с сохранённого чекпоинта."""
+    async with SessionLocal() as session:
+        running = await list_running_compensations(session)
+    for compensation in running:
+        logging.info(
+            "Resuming compensation %s from client_id=%s", compensation.id, compensation.last_client_id
+        )
+        start_compensation(bot, compensation.id)
+    return len(running)
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+async def _parse_filters(settings, args: list[str]) -> tuple[dict, list[str]]:
+    """``agent=… tariff=… from=… to=…`` → (фильтры для сервиса, подписи отбора). ValueError — с аргументом."""
+    filters: dict = {}
+    labels: list[str] = []
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        key = key.lower()
+        if not sep or not value:
+            raise ValueError(arg)
+        if key == "agent":
+            async with SessionLocal() as session:
+                if value.isdigit():
+                    agent = await get_agent_by_telegram_id(session, int(value))
+                else:
+                    agent = await get_agent_by_username(session, value)
+            if agent is None:
+                raise ValueError(arg)
+            filters["agent_id"] = agent.id
+            labels.append(_t(settings.text_compensation_filter_agent, agent=_agent_display(agent)))
+        elif key == "tariff":
+            filters["tariff_name"] = value
+            labels.append(_t(settings.text_compensation_filter_tariff, tariff=html.escape(value)))
+        elif key in ("from", "to"):
+            try:
+                date = _parse_date(value)
+            except ValueError:
+                raise ValueError(arg) from None
+            if key == "from":
+                filters["expires_from"] = date
+                labels.append(_t(settings.text_compensation_filter_from, date=value))
+            else:
+                # «по» включительно: верхняя граница — начало следующего дня.
+                filters["expires_to"] = date + timedelta(days=1)
+                labels.append(_t(settings.text_compensation_filter_to, date=value))
+        else:
+            raise ValueError(arg)
+    return filters, labels
+
+
+@router.message(Command("compensate"))
+async def compensate_command(message: Message, command: CommandObject, state: FSMContext) -> None:
+    """/compensate ДНИ [agent=…] [tariff=…] [from=…] [to=…]; status / stop — ход и остановка."""
+    settings = get_settings()
+    if message.from_user.id != settings.owner_telegram_id:
+        await message.answer(_t(settings.text_no_access_message))
+        return
+    try:
+        args = shlex.split(command.args or "")
+    except ValueError:
+        args = []
+    mode = args[0].lower() if args else ""
+    if mode == "status":
+        async with SessionLocal() as session:
+            running = await list_running_compensations(session)
+        text = "\n".join(_compensation_text(settings, item) for item in running)
+        await message.answer(text or _t(settings.text_compensation_none))
+        return
+    if mode == "stop":
+        async with SessionLocal() as session:
+            count = await cancel_compensations(session)
+        await message.answer(
+            _t(settings.text_compensation_stopped, count=count) if count else _t(settings.text_compensation_none)
+        )
+        return
+    if not mode.isdigit() or int(mode) <= 0:
+        await message.answer(_t(settings.text_compensation_usage))
+        return
+    try:
+        filters, labels = await _parse_filters(settings, args[1:])
+    except ValueError as exc:
+        await message.answer(_t(settings.text_compensation_invalid, arg=html.escape(str(exc))))
+        return
+    label = ", ".join(labels) or _t(settings.text_compensation_filter_all)
+    async with SessionLocal() as session:
+        count = await count_targets(session, **filters)
+    if not count:
+        await message.answer(_t(settings.text_compensation_empty, filters=label))
+        return
+    await state.set_state(CompensationState.waiting_confirm)
+    await state.update_data(
+        compensation={
+            "days": int(mode),
+            **{key: value.isoformat() if isinstance(value, datetime) else value for key, value in filters.items()},
+        }
+    )
+    await message.answer(
+        _t(settings.text_compensation_preview, filters=label, count=count, days=int(mode)),
+        reply_markup=compensation_confirm_keyboard(),
+    )
+
+
+@cb.route(cb.OWNER_COMPENSATE_CONFIRM)
+async def compensate_confirm(call: CallbackQuery, state: FSMContext) -> None:
+    settings = get_settings()
+    if call.from_user.id != settings.owner_telegram_id:
+        await call.answer(_t(settings.text_no_access_alert), show_alert=True)
+        return
+    params = (await state.get_data()).get("compensation")
+    await state.clear()
+    if not params:
+        await call.answer(_t(settings.text_compensation_expired), show_alert=True)
+        return
+    days = params.pop("days")
+    filters = {
+        key: datetime.fromisoformat(value) if key in ("expires_from", "expires_to") else value
+        for key, value in params.items()
+    }
+    async with SessionLocal() as session:
+        # Один проход за раз: предел запросов к панели общий для всей компенсации.
+        if await list_running_compensations(session):
+            await call.answer(_t(settings.text_compensation_busy), show_alert=True)
+            return
+        compensation = await create_compensation(
+            session, days, chat_id=call.message.chat.id, user_id=call.from_user.id, **filters
+        )
+        await call.answer()
+        text = _compensation_text(settings, compensation)
+        try:
+            await call.message.edit_text(text)
+            message_id = call.message.message_id
+        except Exception:
+            message_id = (await call.message.answer(text)).message_id
+        await set_progress_message(session, compensation.id, message_id)
+    logging.info(
+        "Compensation %s started: days=%s total=%s filters=%s", compensation.id, days, compensation.total, filters
+    )
+    start_compensation(call.bot, compensation.id)
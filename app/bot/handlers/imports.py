@@ -0,0 +1,220 @@
+import logging
+
+from aiogram import F, Router
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, Message
+
+from app.bot import callbacks as cb
+from app.bot.keyboards import back_to_menu_keyboard, cancel_keyboard, import_confirm_keyboard
+from app.bot.states import ImportState
+from app.config import get_settings
+from app.db.session import SessionLocal
+from app.services.agent_service import get_or_create_agent
+from app.services.import_service import find_taken_usernames, import_clients, parse_import_csv
+
+from .common import (
+    USERNAME_PATTERN,
+    _calc_amount_by_days,
+    _calc_base_debt,
+    _credit_limit_exceeded,
+    _is_agent_allowed,
+    _progress_editor,
+    _short_list,
+    _t,
+    _tariffs_for_user,
+)
+from .menu import _edit_or_send, _show_start_menu
+
+
+router = Router()
+
+# Агенты, у которых импорт уже идёт: второй файл не запускаем параллельно первому.
+_RUNNING: set[int] = set()
+
+
+def _resolve_rows(settings, telegram_id: int, is_owner: bool, rows: list[dict]) -> tuple[list[dict], list[str]]:
+    """Тариф и суммы по правилам обычного подключения; строка → payload как у JOB_CREATE."""
+    tariffs = _tariffs_for_user(settings, telegram_id, show_all=is_owner)
+    by_name = {tariff["name"].lower(): tariff for tariff in tariffs}
+    default_tariff = tariffs[0] if tariffs else None
+    resolved: list[dict] = []
+    errors: list[str] = []
+    for row in rows:
+        tariff = by_name.get(row["tariff"].lower()) if row["tariff"] else default_tariff
+        if row["tariff"] and tariff is None:
+            errors.append(f"строка {row['line']}: нет тарифа {row['tariff']!r}")
+            continue
+        base_price = tariff["base_price"] if tariff else settings.base_subscription_price
+        resolved.append(
+            {
+                "username": row["username"],
+                "telegram_id": row["telegram_id"],
+                "days": row["days"],
+                "monthly_price": row["monthly_price"],
+                "amount_total": _calc_amount_by_days(settings, row["monthly_price"], row["days"]),
+                "owner_share": _calc_base_debt(settings, row["days"], base_price),
+                "base_price": base_price,
+                "tariff_name": tariff["name"] if tariff else _t(settings.text_client_tariff_default),
+                "overrides": (tariff.get("remnawave") if tariff else None) or {},
+            }
+        )
+    return resolved, errors
+
+
+@router.message(Command("import"))
+async def import_command(message: Message, state: FSMContext) -> None:
+    """/import — массовое подключение клиентов из CSV."""
+    settings = get_settings()
+    if not await _is_agent_allowed(message.from_user.id):
+        await message.answer(_t(settings.text_no_access_message))
+        return
+    await state.set_state(ImportState.waiting_file)
+    await message.answer(
+        _t(settings.text_import_prompt, max_rows=settings.import_max_rows),
+        reply_markup=cancel_keyboard(),
+    )
+
+
+@router.message(ImportState.waiting_file, F.document)
+async def import_file(message: Message, state: FSMContext) -> None:
+    settings = get_settings()
+    if not await _is_agent_allowed(message.from_user.id):
+        await message.answer(_t(settings.text_no_access_message))
+        await state.clear()
+        return
+    document = message.document
+    if document.file_size and document.file_size > settings.import_max_file_kb * 1024:
+        await message.answer(
+            _t(settings.text_import_too_large, max_kb=settings.import_max_file_kb),
+            reply_markup=cancel_keyboard(),
+        )
+        return
+    buffer = await message.bot.download(document)
+    try:
+        rows, errors = parse_import_csv(buffer.read(), settings.import_max_rows, USERNAME_PATTERN)
+    except ValueError as exc:
+        rows, errors = [], [str(exc)]
+    is_owner = message.from_user.id == settings.owner_telegram_id or message.from_user.id in settings.admin_id_set
+    rows, tariff_errors = _resolve_rows(settings, message.from_user.id, is_owner, rows)
+    errors.extend(tariff_errors)
+    if errors or not rows:
+        await message.answer(
+            _t(settings.text_import_invalid, errors=_short_list(errors) or "—"),
+            reply_markup=cancel_keyboard(),
+        )
+        return
+
+    status = await message.answer(_t(settings.text_import_checking, count=len(rows)))
+    try:
+        async with SessionLocal() as session:
+            taken = await find_taken_usernames(
+                session, [row["username"] for row in rows], settings.import_concurrency
+            )
+    except Exception as exc:
+        logging.exception("Import collision check failed")
+        await status.edit_text(_t(settings.text_create_error, error=exc), reply_markup=cancel_keyboard())
+        return
+    rows = [row for row in rows if row["username"] not in taken]
+    taken_list = f"\n<i>{_short_list(sorted(taken))}</i>" if taken else ""
+    if not rows:
+        await status.edit_text(_t(settings.text_import_nothing, taken_list=taken_list), reply_markup=cancel_keyboard())
+        await state.clear()
+        return
+    await state.update_data(import_rows=rows)
+    await state.set_state(ImportState.waiting_confirm)
+    await status.edit_text(
+        _t(
+            settings.text_import_preview,
+            count=len(rows),
+            taken=len(taken),
+            taken_list=taken_list,
+            amount_total=sum(row["amount_total"] for row in rows),
+            owner_share=sum(row["owner_share"] for row in rows),
+        ),
+        reply_markup=import_confirm_keyboard(),
+    )
+
+
+@router.message(ImportState.waiting_file)
+async def import_not_file(message: Message, state: FSMContext) -> None:
+    settings = get_settings()
+    if (message.text or "").startswith("/"):
+        await state.clear()
+        await _show_start_menu(message)
+        return
+    await message.answer(_t(settings.text_import_not_file), reply_markup=cancel_keyboard())
+
+
+@cb.route(cb.IMPORT_CONFIRM)
+async def import_confirm(call: CallbackQuery, state: FSMContext) -> None:
+    settings = get_settings()
+    if not await _is_agent_allowed(call.from_user.id):
+        await call.answer(_t(settings.text_no_access_alert), show_alert=True)
+        return
+    rows = (await state.get_data()).get("import_rows")
+    await state.clear()
+    if not rows:
+        await call.answer(_t(settings.text_import_expired), show_alert=True)
+        return
+    async with SessionLocal() as session:
+        agent = await get_or_create_agent(
+            session, call.from_user.id, call.from_user.full_name, call.from_user.username
+        )
+    if not agent.is_active:
+        await call.answer(_t(settings.text_agent_blocked), show_alert=True)
+        return
+    owner_share = sum(row["owner_share"] for row in rows)
+    # Лимит проверяется один раз на всю пачку, а не на каждого клиента.
+    if _credit_limit_exceeded(agent, owner_share):
+        await _edit_or_send(
+            call,
+            _t(settings.text_limit_reached_create, current=agent.current_debt, limit=agent.credit_limit),
+            reply_markup=cancel_keyboard(),
+        )
+        await call.answer()
+        return
+    if agent.id in _RUNNING:
+        await call.answer(_t(settings.text_import_busy), show_alert=True)
+        return
+    await call.answer()
+
+    _RUNNING.add(agent.id)
+    progress = _progress_editor(
+        call.message, settings.text_import_progress, settings.progress_edit_interval_seconds
+    )
+    try:
+        await progress(0, len(rows))
+        result = await import_clients(
+            agent.id,
+            rows,
+            description=f"agent:{agent.telegram_id}",
+            concurrency=settings.import_concurrency,
+            batch_size=settings.import_batch_size,
+            progress=progress,
+        )
+    finally:
+        _RUNNING.discard(agent.id)
+
+    details = []
+    if result.taken:
+        details.append(_t(settings.text_import_taken_header) + "\n" + _short_list(result.taken))
+    if result.failed:
+        details.append(
+            _t(settings.text_import_failed_header)
+            + "\n"
+            + _short_list([f"{username}: {error}" for username, error in result.failed])
+        )
+    if result.unsaved:
+        details.append(_t(settings.text_import_unsaved_header) + "\n" + _short_list(result.unsaved))
+    await _edit_or_send(
+        call,
+        _t(
+            settings.text_import_done,
+            created=len(result.created),
+            taken=len(result.taken),
+            failed=len(result.failed),
+        )
+        + "".join(f"\n\n{part}" for part in details),
+        reply_markup=back_to_menu_keyboard(),
+    )
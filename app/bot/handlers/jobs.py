@@ -0,0 +1,80 @@
+from app.config import get_settings
+from app.models import PanelJob
+from app.services.job_service import (
+    ERROR_AGENT_NOT_FOUND,
+    ERROR_CLIENT_NOT_FOUND,
+    ERROR_USERNAME_TAKEN,
+    JOB_CREATE,
+    JOB_EXTEND,
+)
+
+from .common import _t
+from .menu import _render_menu
+
+
+class _StoredError(str):
+    # Тексты ошибок выводят {error!r}, а в задаче уже лежит repr исключения.
+    def __repr__(self) -> str:
+        return str(self)
+
+
+def _job_failure_text(settings, job: PanelJob) -> str:
+    payload = job.payload
+    if job.error == ERROR_USERNAME_TAKEN:
+        return _t(settings.text_username_taken_panel, username=payload.get("username"))
+    if job.error == ERROR_CLIENT_NOT_FOUND:
+        return _t(settings.text_client_not_found)
+    if job.error == ERROR_AGENT_NOT_FOUND:
+        return _t(settings.text_target_agent_not_found)
+    error = _StoredError(job.error or "")
+    if job.kind == JOB_EXTEND:
+        return _t(settings.text_renew_error, error=error)
+    return _t(settings.text_create_error, error=error)
+
+
+def _job_success_text(settings, job: PanelJob) -> str:
+    payload = job.payload
+    result = job.result or {}
+    if job.kind == JOB_CREATE:
+        text = _t(
+            settings.text_create_success,
+            username=payload["username"],
+            days=payload["days"],
+            profit=payload["amount_total"] - payload["owner_share"],
+            amount=payload["amount_total"],
+            base_price=payload["owner_share"],
+            payable=result.get("payable"),
+        )
+        link = (result.get("panel") or {}).get("subscription_url")
+        if link:
+            text = f"{text}\n\n{_t(settings.text_subscription_link, link=link)}"
+        return text
+    if job.kind == JOB_EXTEND:
+        return _t(
+            settings.text_renew_success,
+            days=payload["days"],
+            profit=payload["amount_total"] - payload["owner_share"],
+            amount=payload["amount_total"],
+            owner_share=payload["owner_share"],
+            payable=result.get("payable"),
+        )
+    return _t(settings.text_job_update_done, username=result.get("username"))
+
+
+async def notify_job_finished(bot, job: PanelJob) -> None:
+    """Показывает результат задачи в меню пользователя, который её поставил."""
+    if not job.chat_id or not job.user_id:
+        return
+    settings = get_settings()
+    if job.status == "done":
+        text = _job_success_text(settings, job)
+    else:
+        text = _job_failure_text(settings, job)
+    await _render_menu(
+        bot=bot,
+        chat_id=job.chat_id,
+        user_id=job.user_id,
+        name=job.payload.get("actor_name") or str(job.user_id),
+        is_owner=bool(job.payload.get("is_owner")),
+        text=text,
+    )
@@ -5,6 +5,7 @@ from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
+from app.bot import callbacks as cb
 from app.bot.keyboards import back_to_menu_keyboard, main_menu
 from app.config import get_settings
 from app.db.session import SessionLocal
@@ -289,7 +290,7 @@ async def ping(message: Message) -> None:
     await message.answer(_t(settings.text_ping))
 
 
-@router.callback_query(lambda call: call.data == "cancel")
+@cb.route(cb.CANCEL)
 async def cancel_callback(call: CallbackQuery, state: FSMContext) -> None:
     settings = get_settings()
     if not await _ensure_access(call):
@@ -308,7 +309,7 @@ async def cancel_callback(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "menu")
+@cb.route(cb.MENU)
 async def menu_callback(call: CallbackQuery, state: FSMContext) -> None:
     if not await _ensure_access(call):
         return
@@ -327,7 +328,7 @@ async def menu_callback(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "vpn:info")
+@cb.route(cb.VPN_INFO)
 async def vpn_info(call: CallbackQuery) -> None:
     if not await _ensure_access(call):
         return
@@ -356,7 +357,7 @@ async def vpn_info(call: CallbackQuery) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "tariffs:info")
+@cb.route(cb.TARIFFS_INFO)
 async def tariffs_info(call: CallbackQuery) -> None:
     if not await _ensure_access(call):
         return
@@ -383,7 +384,7 @@ async def tariffs_info(call: CallbackQuery) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "balance:refresh")
+@cb.route(cb.BALANCE_REFRESH)
 async def balance_refresh(call: CallbackQuery) -> None:
     if not await _ensure_access(call):
         return
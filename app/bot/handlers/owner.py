@@ -1,11 +1,15 @@
+import html
+import logging
 import math
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 
 from aiogram import Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import BufferedInputFile, CallbackQuery, FSInputFile, Message
 
+from app.bot import callbacks as cb
 from app.bot.keyboards import (
     agents_limit_pagination_keyboard,
     agents_limit_keyboard,
@@ -18,11 +22,14 @@ from app.bot.keyboards import (
     main_menu,
     owner_report_pagination_keyboard,
     owner_agents_menu,
+    owner_export_keyboard,
+    owner_revenue_keyboard,
 )
 from app.bot.states import AddAgentState, DeleteClientState, LimitAgentState
 from app.config import get_settings
 from app.db.session import SessionLocal
 from app.remnawave.client import RemnawaveClient
+from app.services import profiling_service
 from app.services.agent_service import (
     get_agent_by_id,
     get_agent_by_telegram_id,
@@ -38,8 +45,13 @@ from app.services.client_service import (
     delete_client_by_id,
     list_clients_with_agents,
 )
+from app.services.data_version import agents_version, bump_agents_version, bump_clients_version, clients_version
+from app.services.export_service import DATASETS, FORMATS, export_filename, export_to_file
 from app.services.notify_service import list_expiring_clients, notify_expiring_clients
+from app.services.revenue_service import backfill_revenue, revenue_by_agent, revenue_by_tariff, revenue_totals
+from app.services.search_service import search_clients
 from app.services.sync_service import sync_all_clients_with_remnawave
+from app.texts import reload_texts
 
 from .common import _agent_display, _is_cancel, _is_start, _t
 from .menu import (
@@ -49,6 +61,7 @@ from .menu import (
     _show_start_menu,
     _show_status_then_menu,
 )
+from .pages import PageSource, PageVersion, RenderedPage, _show_page
 
 
 router = Router()
@@ -160,7 +173,77 @@ async def notify_expiring_preview_command(message: Message) -> None:
     )
 
 
-@router.callback_query(lambda call: call.data == "owner:notify:preview")
+@router.message(Command("reload_texts"))
+async def reload_texts_command(message: Message) -> None:
+    settings = get_settings()
+    user_id = message.from_user.id
+    if user_id != settings.owner_telegram_id and user_id not in settings.admin_id_set:
+        await message.answer(_t(settings.text_no_access_message))
+        return
+    catalog = reload_texts()
+    settings = get_settings()
+    await message.answer(
+        _t(
+            settings.text_owner_reload_texts_done,
+            count=len(catalog.templates),
+            errors=len(catalog.errors),
+        )
+    )
+
+
+def _bounded_int(value: str | None, default: int, upper: int) -> int:
+    try:
+        number = int(value) if value else default
+    except ValueError:
+        number = default
+    return max(1, min(number, upper))
+
+
+@router.message(Command("profile"))
+async def profile_command(message: Message, command: CommandObject) -> None:
+    settings = get_settings()
+    if message.from_user.id != settings.owner_telegram_id:
+        await message.answer(_t(settings.text_no_access_message))
+        return
+    if not settings.profiling_enabled:
+        await message.answer(_t(settings.text_profile_disabled))
+        return
+
+    args = (command.args or "").split()
+    mode = args[0].lower() if args else ""
+    value = args[1] if len(args) > 1 else None
+    bot = message.bot
+    chat_id = message.chat.id
+
+    async def deliver(filename: str, data: bytes, caption: str) -> None:
+        await bot.send_document(chat_id, BufferedInputFile(data, filename=filename), caption=caption)
+
+    if mode == "stop":
+        stopped = profiling_service.cancel()
+        await message.answer(_t(settings.text_profile_stopped if stopped else settings.text_profile_none))
+        return
+    if mode == profiling_service.MODE_SAMPLE:
+        seconds = _bounded_int(value, 30, settings.profiling_max_seconds)
+        started = profiling_service.start_sampling(
+            seconds, settings.profiling_sample_interval_ms / 1000, deliver
+        )
+        text = _t(settings.text_profile_started_sample, seconds=seconds)
+    elif mode == profiling_service.MODE_UPDATES:
+        count = _bounded_int(value, 50, settings.profiling_max_updates)
+        started = profiling_service.start_updates_profile(count, deliver)
+        text = _t(settings.text_profile_started_updates, count=count)
+    elif mode == profiling_service.MODE_SYNC:
+        started = profiling_service.start_sync_profile(deliver)
+        text = _t(settings.text_profile_started_sync)
+    else:
+        await message.answer(_t(settings.text_profile_usage))
+        return
+    if not started:
+        text = _t(settings.text_profile_busy, mode=profiling_service.current_mode())
+    await message.answer(text)
+
+
+@cb.route(cb.OWNER_NOTIFY_PREVIEW)
 async def owner_notify_preview(call: CallbackQuery) -> None:
     settings = get_settings()
     if call.from_user.id != settings.owner_telegram_id and call.from_user.id not in settings.admin_id_set:
@@ -176,7 +259,7 @@ async def owner_notify_preview(call: CallbackQuery) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "owner:notify:send")
+@cb.route(cb.OWNER_NOTIFY_SEND)
 async def owner_notify_send(call: CallbackQuery) -> None:
     settings = get_settings()
     if call.from_user.id != settings.owner_telegram_id and call.from_user.id not in settings.admin_id_set:
@@ -192,7 +275,7 @@ async def owner_notify_send(call: CallbackQuery) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "owner:agents")
+@cb.route(cb.OWNER_AGENTS)
 async def owner_agents(call: CallbackQuery) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
@@ -202,7 +285,7 @@ async def owner_agents(call: CallbackQuery) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "owner:limit")
+@cb.route(cb.OWNER_LIMIT)
 async def owner_limit_menu(call: CallbackQuery) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
@@ -212,17 +295,12 @@ async def owner_limit_menu(call: CallbackQuery) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data.startswith("owner:limit:page:"))
-async def owner_limit_page(call: CallbackQuery) -> None:
+@cb.route(cb.OWNER_LIMIT_PAGE)
+async def owner_limit_page(call: CallbackQuery, page: int) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    try:
-        page = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(settings.text_page_invalid), show_alert=True)
-        return
     await _render_owner_limit_menu(call, page=page)
     await call.answer()
 
@@ -257,13 +335,12 @@ async def _render_owner_limit_menu(call: CallbackQuery, page: int) -> None:
     )
 
 
-@router.callback_query(lambda call: call.data.startswith("owner:limit:pick:"))
-async def owner_limit_pick(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.OWNER_LIMIT_PICK)
+async def owner_limit_pick(call: CallbackQuery, state: FSMContext, agent_id: int) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    agent_id = int(call.data.split(":")[-1])
     await state.update_data(agent_id=agent_id)
     await state.set_state(LimitAgentState.waiting_limit)
     await _edit_or_send(
@@ -275,7 +352,7 @@ async def owner_limit_pick(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "owner:add_agent")
+@cb.route(cb.OWNER_ADD_AGENT)
 async def owner_add_agent(call: CallbackQuery, state: FSMContext) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
@@ -425,6 +502,7 @@ async def owner_limit_set(message: Message, state: FSMContext) -> None:
             return
         agent.credit_limit = limit
         await session.commit()
+        bump_agents_version()
     await state.clear()
     limit_text = _t(settings.text_limit_none) if limit == 0 else f"{limit} ₽"
     await _show_status_then_menu(
@@ -437,7 +515,7 @@ async def owner_limit_set(message: Message, state: FSMContext) -> None:
     )
 
 
-@router.callback_query(lambda call: call.data == "owner:sync")
+@cb.route(cb.OWNER_SYNC)
 async def owner_sync(call: CallbackQuery) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
@@ -446,12 +524,7 @@ async def owner_sync(call: CallbackQuery) -> None:
 
     await _edit_or_send(call, _t(settings.text_owner_sync_start), is_menu=True)
     async with SessionLocal() as session:
-        client = RemnawaveClient(
-            settings.remnawave_api_url,
-            settings.remnawave_api_key,
-            settings.remnawave_mode,
-            settings.remnawave_caddy_token,
-        )
+        client = RemnawaveClient.from_settings(settings)
         removed, updated = await sync_all_clients_with_remnawave(session, client)
     await _edit_or_send(
         call,
@@ -462,7 +535,7 @@ async def owner_sync(call: CallbackQuery) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "owner:refresh_agents")
+@cb.route(cb.OWNER_REFRESH_AGENTS)
 async def owner_refresh_agents(call: CallbackQuery) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
@@ -501,6 +574,8 @@ async def owner_refresh_agents(call: CallbackQuery) -> None:
 
         if updated:
             await session.commit()
+            # Имена агентов видны в списках клиентов у владельца.
+            bump_clients_version()
 
     await _edit_or_send(
         call,
@@ -511,7 +586,7 @@ async def owner_refresh_agents(call: CallbackQuery) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "owner:report")
+@cb.route(cb.OWNER_REPORT)
 async def owner_report(call: CallbackQuery) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
@@ -521,84 +596,214 @@ async def owner_report(call: CallbackQuery) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data.startswith("owner:report:page:"))
-async def owner_report_page(call: CallbackQuery) -> None:
+@cb.route(cb.OWNER_REPORT_PAGE)
+async def owner_report_page(call: CallbackQuery, page: int) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    try:
-        page = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(settings.text_page_invalid), show_alert=True)
-        return
     await _render_owner_report(call, page=page)
     await call.answer()
 
 
+def _agents_data_version() -> tuple:
+    # Сводка по агентам меняется и с их клиентами: число клиентов, имена.
+    return agents_version(), clients_version(None)
+
+
 async def _render_owner_report(call: CallbackQuery, page: int) -> None:
     settings = get_settings()
-    async with SessionLocal() as session:
-        agents_with_counts = await list_agents(session)
 
-    if not agents_with_counts:
-        await _edit_or_send(call, _t(settings.text_owner_report_no_agents), reply_markup=owner_agents_menu(), is_menu=True)
-        return
-
-    total_agents = len(agents_with_counts)
-    total_active = sum(1 for agent, _ in agents_with_counts if agent.is_active)
-    total_clients = sum(count for _, count in agents_with_counts)
-    total_debt = sum(agent.current_debt for agent, _ in agents_with_counts)
-    limit_sum = sum(agent.credit_limit for agent, _ in agents_with_counts if agent.credit_limit > 0)
-    limit_infinite = sum(1 for agent, _ in agents_with_counts if agent.credit_limit <= 0)
-    if limit_infinite and limit_sum:
-        limit_total = f"∞ + {limit_sum} ₽"
-    elif limit_infinite:
-        limit_total = _t(settings.text_limit_infinite)
-    else:
-        limit_total = f"{limit_sum} ₽"
+    async def load() -> PageSource:
+        async with SessionLocal() as session:
+            version = PageVersion.of(_agents_data_version)
+            agents_with_counts = await list_agents(session)
+        page_size = 6
+        total_pages = max(1, math.ceil(len(agents_with_counts) / page_size))
+        total_agents = len(agents_with_counts)
+        total_active = sum(1 for agent, _ in agents_with_counts if agent.is_active)
+        total_clients = sum(count for _, count in agents_with_counts)
+        total_debt = sum(agent.current_debt for agent, _ in agents_with_counts)
+        limit_sum = sum(agent.credit_limit for agent, _ in agents_with_counts if agent.credit_limit > 0)
+        limit_infinite = sum(1 for agent, _ in agents_with_counts if agent.credit_limit <= 0)
+        if limit_infinite and limit_sum:
+            limit_total = f"∞ + {limit_sum} ₽"
+        elif limit_infinite:
+            limit_total = _t(settings.text_limit_infinite)
+        else:
+            limit_total = f"{limit_sum} ₽"
+
+        header = _t(settings.text_owner_report_header)
+        summary = _t(
+            settings.text_owner_report_summary,
+            agents=total_agents,
+            active=total_active,
+            clients=total_clients,
+            debt=total_debt,
+            limit=limit_total,
+        )
+        cards = []
+        for agent, client_count in agents_with_counts:
+            status = "✅" if agent.is_active else "🚫"
+            limit = _t(settings.text_limit_infinite) if agent.credit_limit <= 0 else f"{agent.credit_limit} ₽"
+            cards.append(
+                _t(
+                    settings.text_owner_report_line,
+                    status=status,
+                    name=_agent_display(agent),
+                    id=agent.telegram_id,
+                    payable=agent.current_debt,
+                    limit=limit,
+                    clients=client_count,
+                )
+            )
 
-    page_size = 6
-    total_pages = max(1, math.ceil(len(agents_with_counts) / page_size))
-    page = max(1, min(page, total_pages))
-    start = (page - 1) * page_size
-    end = start + page_size
-    page_rows = agents_with_counts[start:end]
-
-    header = _t(settings.text_owner_report_header)
-    summary = _t(
-        settings.text_owner_report_summary,
-        agents=total_agents,
-        active=total_active,
-        clients=total_clients,
-        debt=total_debt,
-        limit=limit_total,
-    )
-    cards = []
-    for agent, client_count in page_rows:
-        status = "✅" if agent.is_active else "🚫"
-        limit = _t(settings.text_limit_infinite) if agent.credit_limit <= 0 else f"{agent.credit_limit} ₽"
-        cards.append(
+        def render(page: int) -> RenderedPage:
+            if not agents_with_counts:
+                return RenderedPage(_t(settings.text_owner_report_no_agents), owner_agents_menu(), page, total_pages)
+            start = (page - 1) * page_size
+            end = start + page_size
+            text = "\n\n".join([part for part in [header, summary, *cards[start:end]] if part.strip()])
+            return RenderedPage(text, owner_report_pagination_keyboard(page, total_pages), page, total_pages)
+
+        return PageSource(version, total_pages, render)
+
+    await _show_page(call, "report", None, page, load)
+
+
+_REVENUE_PERIOD_TEXTS = {
+    1: "text_owner_revenue_period_day",
+    7: "text_owner_revenue_period_week",
+    30: "text_owner_revenue_period_month",
+}
+
+
+@cb.route(cb.OWNER_REVENUE)
+async def owner_revenue(call: CallbackQuery, days: int) -> None:
+    settings = get_settings()
+    if not _is_owner_or_admin(call.from_user.id):
+        await call.answer(_t(settings.text_no_access_alert), show_alert=True)
+        return
+    if days not in _REVENUE_PERIOD_TEXTS:
+        days = 1
+    async with SessionLocal() as session:
+        totals = await revenue_totals(session, days)
+        agents = await revenue_by_agent(session, days)
+        tariffs = await revenue_by_tariff(session, days)
+
+    parts = [
+        _t(settings.text_owner_revenue_header, period=_t(getattr(settings, _REVENUE_PERIOD_TEXTS[days]))),
+        _t(settings.text_owner_revenue_summary, **totals),
+    ]
+    if agents:
+        lines = [
             _t(
-                settings.text_owner_report_line,
-                status=status,
+                settings.text_owner_revenue_agent_line,
                 name=_agent_display(agent),
-                id=agent.telegram_id,
-                payable=agent.current_debt,
-                limit=limit,
-                clients=client_count,
+                revenue=revenue,
+                owner_share=owner_share,
+                renewals=renewals,
             )
-        )
-    text = "\n\n".join([part for part in [header, summary, *cards] if part.strip()])
+            for agent, revenue, owner_share, renewals in agents
+        ]
+        parts.append("\n".join([_t(settings.text_owner_revenue_agents_header), *lines]))
+    if tariffs:
+        lines = [
+            _t(
+                settings.text_owner_revenue_tariff_line,
+                name=name or _t(settings.text_client_tariff_default),
+                revenue=revenue,
+                renewals=renewals,
+            )
+            for name, revenue, renewals in tariffs
+        ]
+        parts.append("\n".join([_t(settings.text_owner_revenue_tariffs_header), *lines]))
     await _edit_or_send(
         call,
-        text,
-        reply_markup=owner_report_pagination_keyboard(page, total_pages),
+        "\n\n".join(part for part in parts if part.strip()),
+        reply_markup=owner_revenue_keyboard(days),
         is_menu=True,
     )
+    await call.answer()
+
 
+@router.message(Command("revenue_backfill"))
+async def revenue_backfill_command(message: Message, command: CommandObject) -> None:
+    """/revenue_backfill [дней] — пересобрать сводку выручки (за последние N дней или целиком)."""
+    settings = get_settings()
+    if message.from_user.id != settings.owner_telegram_id:
+        await message.answer(_t(settings.text_no_access_message))
+        return
+    arg = (command.args or "").strip()
+    since = datetime.utcnow().date() - timedelta(days=int(arg) - 1) if arg.isdigit() and int(arg) > 0 else None
+    async with SessionLocal() as session:
+        rows = await backfill_revenue(session, since)
+    await message.answer(_t(settings.text_revenue_backfill_done, rows=rows))
 
-@router.callback_query(lambda call: call.data == "owner:delete:client")
+
+@cb.route(cb.OWNER_EXPORT_MENU)
+async def owner_export_menu(call: CallbackQuery) -> None:
+    settings = get_settings()
+    if not _is_owner_or_admin(call.from_user.id):
+        await call.answer(_t(settings.text_no_access_alert), show_alert=True)
+        return
+    await _edit_or_send(call, _t(settings.text_export_menu), reply_markup=owner_export_keyboard(), is_menu=True)
+    await call.answer()
+
+
+@cb.route(cb.OWNER_EXPORT)
+async def owner_export(call: CallbackQuery, dataset: int, fmt: int) -> None:
+    settings = get_settings()
+    if not _is_owner_or_admin(call.from_user.id):
+        await call.answer(_t(settings.text_no_access_alert), show_alert=True)
+        return
+    if not (0 <= dataset < len(DATASETS) and 0 <= fmt < len(FORMATS)):
+        await call.answer(_t(settings.text_page_invalid), show_alert=True)
+        return
+    await call.answer()
+    await _send_export(call.bot, call.message.chat.id, DATASETS[dataset], FORMATS[fmt])
+
+
+@router.message(Command("export"))
+async def export_command(message: Message, command: CommandObject) -> None:
+    """/export [clients|renewals|debts] [csv|xlsx]; без аргументов — меню выгрузки."""
+    settings = get_settings()
+    if not _is_owner_or_admin(message.from_user.id):
+        await message.answer(_t(settings.text_no_access_message))
+        return
+    args = (command.args or "").lower().split()
+    if not args or args[0] not in DATASETS:
+        await message.answer(_t(settings.text_export_menu), reply_markup=owner_export_keyboard())
+        return
+    fmt = args[1] if len(args) > 1 and args[1] in FORMATS else FORMATS[0]
+    await _send_export(message.bot, message.chat.id, args[0], fmt)
+
+
+async def _send_export(bot, chat_id: int, dataset: str, fmt: str) -> None:
+    settings = get_settings()
+    status = await bot.send_message(chat_id=chat_id, text=_t(settings.text_export_preparing))
+    path = None
+    try:
+        async with SessionLocal() as session:
+            path, rows = await export_to_file(session, dataset, fmt, settings.export_chunk_size)
+        await bot.send_document(
+            chat_id,
+            FSInputFile(path, filename=export_filename(dataset, fmt)),
+            caption=_t(settings.text_export_done, dataset=dataset, rows=rows),
+        )
+    except Exception as exc:
+        logging.exception("Export %s.%s failed", dataset, fmt)
+        await bot.send_message(chat_id=chat_id, text=_t(settings.text_export_failed, error=html.escape(str(exc))))
+    finally:
+        if path:
+            os.unlink(path)
+        try:
+            await bot.delete_message(chat_id=chat_id, message_id=status.message_id)
+        except Exception:
+            pass
+
+
+@cb.route(cb.OWNER_DELETE_CLIENT)
 async def owner_delete_client(call: CallbackQuery, state: FSMContext) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
@@ -609,47 +814,44 @@ async def owner_delete_client(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data.startswith("owner:delete:client:page:"))
-async def owner_delete_client_page(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.OWNER_DELETE_CLIENT_PAGE)
+async def owner_delete_client_page(call: CallbackQuery, state: FSMContext, page: int) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
     await state.set_state(DeleteClientState.waiting_username)
-    try:
-        page = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(settings.text_page_invalid), show_alert=True)
-        return
     await _render_owner_delete_client_menu(call, page=page)
     await call.answer()
 
 
 async def _render_owner_delete_client_menu(call: CallbackQuery, page: int) -> None:
     settings = get_settings()
-    async with SessionLocal() as session:
-        pairs = await list_clients_with_agents(session)
-    if not pairs:
-        await _edit_or_send(call, _t(settings.text_clients_none), reply_markup=owner_agents_menu(), is_menu=True)
-        return
-    rows = [(client.id, f"{client.username} · {_agent_display(agent)}") for client, agent in pairs]
-    page_size = 8
-    total_pages = max(1, math.ceil(len(rows) / page_size))
-    page = max(1, min(page, total_pages))
-    start = (page - 1) * page_size
-    end = start + page_size
-    page_rows = rows[start:end]
-    reply_markup = (
-        delete_clients_keyboard(page_rows)
-        if total_pages == 1
-        else delete_clients_pagination_keyboard(page_rows, page, total_pages)
-    )
-    await _edit_or_send(
-        call,
-        _t(settings.text_owner_delete_client_prompt),
-        reply_markup=reply_markup,
-        is_menu=True,
-    )
+
+    async def load() -> PageSource:
+        async with SessionLocal() as session:
+            version = PageVersion.of(clients_version, None)
+            pairs = await list_clients_with_agents(session)
+        rows = [(client.id, f"{client.username} · {_agent_display(agent)}") for client, agent in pairs]
+        page_size = 8
+        total_pages = max(1, math.ceil(len(rows) / page_size))
+
+        def render(page: int) -> RenderedPage:
+            if not rows:
+                return RenderedPage(_t(settings.text_clients_none), owner_agents_menu(), page, total_pages)
+            start = (page - 1) * page_size
+            end = start + page_size
+            page_rows = rows[start:end]
+            reply_markup = (
+                delete_clients_keyboard(page_rows)
+                if total_pages == 1
+                else delete_clients_pagination_keyboard(page_rows, page, total_pages)
+            )
+            return RenderedPage(_t(settings.text_owner_delete_client_prompt), reply_markup, page, total_pages)
+
+        return PageSource(version, total_pages, render)
+
+    await _show_page(call, "delete_client", None, page, load)
 
 
 @router.message(DeleteClientState.waiting_username)
@@ -671,10 +873,26 @@ async def owner_delete_client_message(message: Message, state: FSMContext) -> No
     raw = (message.text or "").strip().lstrip("@")
     async with SessionLocal() as session:
         client = None
+        matches = []
         if forward_user:
             client = await get_client_by_tg_any(session, telegram_id=forward_user.id)
         else:
             client = await get_client_by_username_any(session, raw)
+            if not client:
+                matches = await search_clients(session, raw, limit=settings.client_search_limit)
+    if not client and matches:
+        await _render_menu_text(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            user_id=message.from_user.id,
+            name=message.from_user.full_name,
+            text=_t(settings.text_client_search_results, count=len(matches)),
+            reply_markup=delete_clients_keyboard(
+                [(match.id, f"{match.username} · {_agent_display(match.agent)}") for match in matches]
+            ),
+            force_new=True,
+        )
+        return
     if not client:
         await _render_error_prompt(
             bot=message.bot,
@@ -693,22 +911,17 @@ async def owner_delete_client_message(message: Message, state: FSMContext) -> No
         user_id=message.from_user.id,
         name=message.from_user.full_name,
         text=_t(settings.text_owner_delete_client_confirm, username=client.username),
-        reply_markup=delete_confirm_keyboard(f"owner:delete:client:confirm:{client.id}"),
+        reply_markup=delete_confirm_keyboard(cb.OWNER_DELETE_CLIENT_CONFIRM.pack(client.id)),
         force_new=True,
     )
 
 
-@router.callback_query(lambda call: call.data.startswith("owner:delete:client:pick:"))
-async def owner_delete_client_pick(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.OWNER_DELETE_CLIENT_PICK)
+async def owner_delete_client_pick(call: CallbackQuery, state: FSMContext, client_id: int) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    try:
-        client_id = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(settings.text_page_invalid), show_alert=True)
-        return
     async with SessionLocal() as session:
         client = await get_client_by_id(session, client_id)
     if not client:
@@ -719,22 +932,17 @@ async def owner_delete_client_pick(call: CallbackQuery, state: FSMContext) -> No
     await _edit_or_send(
         call,
         _t(settings.text_owner_delete_client_confirm, username=client.username),
-        reply_markup=delete_confirm_keyboard(f"owner:delete:client:confirm:{client.id}"),
+        reply_markup=delete_confirm_keyboard(cb.OWNER_DELETE_CLIENT_CONFIRM.pack(client.id)),
         is_menu=True,
     )
 
 
-@router.callback_query(lambda call: call.data.startswith("owner:delete:client:confirm:"))
-async def owner_delete_client_confirm(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.OWNER_DELETE_CLIENT_CONFIRM)
+async def owner_delete_client_confirm(call: CallbackQuery, state: FSMContext, client_id: int) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    try:
-        client_id = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(settings.text_page_invalid), show_alert=True)
-        return
     data = await state.get_data()
     async with SessionLocal() as session:
         deleted = await delete_client_by_id(session, client_id)
@@ -756,7 +964,7 @@ async def owner_delete_client_confirm(call: CallbackQuery, state: FSMContext) ->
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "owner:delete:agent")
+@cb.route(cb.OWNER_DELETE_AGENT)
 async def owner_delete_agent(call: CallbackQuery, state: FSMContext) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
@@ -766,59 +974,51 @@ async def owner_delete_agent(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data.startswith("owner:delete:agent:page:"))
-async def owner_delete_agent_page(call: CallbackQuery) -> None:
+@cb.route(cb.OWNER_DELETE_AGENT_PAGE)
+async def owner_delete_agent_page(call: CallbackQuery, page: int) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    try:
-        page = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(settings.text_page_invalid), show_alert=True)
-        return
     await _render_owner_delete_agent_menu(call, page=page)
     await call.answer()
 
 
 async def _render_owner_delete_agent_menu(call: CallbackQuery, page: int) -> None:
     settings = get_settings()
-    async with SessionLocal() as session:
-        agents_with_counts = await list_agents(session)
-    if not agents_with_counts:
-        await _edit_or_send(call, _t(settings.text_owner_report_no_agents), reply_markup=owner_agents_menu(), is_menu=True)
-        return
-    rows = [(agent.id, _agent_display(agent)) for agent, _ in agents_with_counts]
-    page_size = 8
-    total_pages = max(1, math.ceil(len(rows) / page_size))
-    page = max(1, min(page, total_pages))
-    start = (page - 1) * page_size
-    end = start + page_size
-    page_rows = rows[start:end]
-    reply_markup = (
-        delete_agents_keyboard(page_rows)
-        if total_pages == 1
-        else delete_agents_pagination_keyboard(page_rows, page, total_pages)
-    )
-    await _edit_or_send(
-        call,
-        _t(settings.text_owner_delete_agent_pick),
-        reply_markup=reply_markup,
-        is_menu=True,
-    )
 
+    async def load() -> PageSource:
+        async with SessionLocal() as session:
+            version = PageVersion.of(_agents_data_version)
+            agents_with_counts = await list_agents(session)
+        rows = [(agent.id, _agent_display(agent)) for agent, _ in agents_with_counts]
+        page_size = 8
+        total_pages = max(1, math.ceil(len(rows) / page_size))
+
+        def render(page: int) -> RenderedPage:
+            if not rows:
+                return RenderedPage(_t(settings.text_owner_report_no_agents), owner_agents_menu(), page, total_pages)
+            start = (page - 1) * page_size
+            end = start + page_size
+            page_rows = rows[start:end]
+            reply_markup = (
+                delete_agents_keyboard(page_rows)
+                if total_pages == 1
+                else delete_agents_pagination_keyboard(page_rows, page, total_pages)
+            )
+            return RenderedPage(_t(settings.text_owner_delete_agent_pick), reply_markup, page, total_pages)
+
+        return PageSource(version, total_pages, render)
 
-@router.callback_query(lambda call: call.data.startswith("owner:delete:agent:pick:"))
-async def owner_delete_agent_pick(call: CallbackQuery) -> None:
+    await _show_page(call, "delete_agent", None, page, load)
+
+
+@cb.route(cb.OWNER_DELETE_AGENT_PICK)
+async def owner_delete_agent_pick(call: CallbackQuery, agent_id: int) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    try:
-        agent_id = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(settings.text_page_invalid), show_alert=True)
-        return
     async with SessionLocal() as session:
         agent = await get_agent_by_id(session, agent_id)
     if not agent:
@@ -827,24 +1027,19 @@ async def owner_delete_agent_pick(call: CallbackQuery) -> None:
     await _edit_or_send(
         call,
         _t(settings.text_owner_delete_agent_confirm, name=_agent_display(agent)),
-        reply_markup=delete_confirm_keyboard(f"owner:delete:agent:confirm:{agent.id}"),
+        reply_markup=delete_confirm_keyboard(cb.OWNER_DELETE_AGENT_CONFIRM.pack(agent.id)),
         is_menu=True,
     )
 
 
 
 
-@router.callback_query(lambda call: call.data.startswith("owner:delete:agent:confirm:"))
-async def owner_delete_agent_confirm(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.OWNER_DELETE_AGENT_CONFIRM)
+async def owner_delete_agent_confirm(call: CallbackQuery, state: FSMContext, agent_id: int) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    try:
-        agent_id = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(settings.text_page_invalid), show_alert=True)
-        return
     async with SessionLocal() as session:
         agent, clients_deleted = await delete_agent_by_id(session, agent_id)
     await state.clear()
@@ -864,7 +1059,7 @@ async def owner_delete_agent_confirm(call: CallbackQuery, state: FSMContext) ->
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "owner:back")
+@cb.route(cb.OWNER_BACK)
 async def owner_back(call: CallbackQuery) -> None:
     settings = get_settings()
     if not _is_owner_or_admin(call.from_user.id):
@@ -0,0 +1,150 @@
+"""Страницы списков: кеш готовых страниц и подгрузка соседних в фоне.
+
+Экран отдаёт загрузчик ``PageSource``: одна выборка из базы, версия данных, снятая до
+неё, и функция, рисующая любую страницу из выбранного. Показанная страница и её
+соседи (N−1, N+1) ложатся в кеш; при листании соседняя страница берётся из кеша,
+а следующая за ней догружается в фоне, пока пользователь читает текущую.
+Ключ — экран, область просмотра (None — владелец и админы, иначе telegram_id агента)
+и номер страницы, так что у каждого агента свои страницы.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import date
+from functools import partial
+from typing import Awaitable, Callable, Hashable, NamedTuple
+
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
+
+from app.config import get_settings
+from app.texts import on_texts_reload
+
+from .menu import _edit_or_send
+
+
+class RenderedPage(NamedTuple):
+    text: str
+    reply_markup: InlineKeyboardMarkup
+    page: int
+    total_pages: int
+
+
+class PageVersion(NamedTuple):
+    """Функция текущей версии данных страницы и её значение на момент выборки."""
+
+    current: Callable[[], Hashable]
+    stamp: Hashable
+
+    @classmethod
+    def of(cls, current: Callable[..., Hashable], *args) -> "PageVersion":
+        bound = partial(current, *args)
+        return cls(bound, bound())
+
+    def is_fresh(self) -> bool:
+        return self.current() == self.stamp
+
+
+class PageSource(NamedTuple):
+    version: PageVersion
+    total_pages: int
+    # Рисует страницу 1..total_pages.
+    render: Callable[[int], RenderedPage]
+
+
+PageKey = tuple[str, int | None, int]
+PageLoader = Callable[[], Awaitable[PageSource]]
+
+# Дата в записи — из-за «осталось N дн.» в строках клиентов.
+_PAGES: OrderedDict[PageKey, tuple[PageVersion, date, RenderedPage]] = OrderedDict()
+# Фоновые загрузки по (экран, область): ссылка держит задачу от сборщика мусора.
+_PREFETCHING: dict[tuple[str, int | None], asyncio.Task] = {}
+
+
+@on_texts_reload
+def clear_page_cache() -> None:
+    _PAGES.clear()
+
+
+def _cached_page(key: PageKey) -> RenderedPage | None:
+    entry = _PAGES.get(key)
+    if entry is None:
+        return None
+    version, day, rendered = entry
+    if not version.is_fresh() or day != date.today():
+        del _PAGES[key]
+        return None
+    _PAGES.move_to_end(key)
+    return rendered
+
+
+def _store_page(key: PageKey, version: PageVersion, rendered: RenderedPage) -> None:
+    max_size = get_settings().page_cache_size
+    if max_size <= 0:
+        return
+    _PAGES[key] = (version, date.today(), rendered)
+    _PAGES.move_to_end(key)
+    while len(_PAGES) > max_size:
+        _PAGES.popitem(last=False)
+
+
+def _missing_neighbours(screen: str, scope: int | None, page: int, total_pages: int) -> list[int]:
+    return [
+        neighbour
+        for neighbour in (page + 1, page - 1)
+        if 1 <= neighbour <= total_pages and _cached_page((screen, scope, neighbour)) is None
+    ]
+
+
+def _prefetch_enabled() -> bool:
+    settings = get_settings()
+    return settings.page_prefetch_enabled and settings.page_cache_size > 0
+
+
+def _store_neighbours(screen: str, scope: int | None, page: int, source: PageSource) -> None:
+    if not _prefetch_enabled():
+        return
+    for neighbour in _missing_neighbours(screen, scope, page, source.total_pages):
+        _store_page((screen, scope, neighbour), source.version, source.render(neighbour))
+
+
+async def _prefetch(screen: str, scope: int | None, page: int, load: PageLoader) -> None:
+    try:
+        source = await load()
+        _store_neighbours(screen, scope, page, source)
+    except Exception:
+        logging.exception("Page prefetch failed: screen=%s scope=%s page=%s", screen, scope, page)
+    finally:
+        _PREFETCHING.pop((screen, scope), None)
+
+
+async def _show_page(call: CallbackQuery, screen: str, scope: int | None, page: int, load: PageLoader) -> None:
+    """Показывает страницу из кеша или из новой выборки и готовит соседние страницы."""
+    key = (screen, scope, page)
+    rendered = _cached_page(key)
+    if rendered is None:
+        task = _PREFETCHING.get((screen, scope))
+        if task is not None:
+            # Соседи уже догружаются в фоне: дождаться их дешевле, чем читать базу второй раз.
+            await asyncio.shield(task)
+            rendered = _cached_page(key)
+    if rendered is not None:
+        await _edit_or_send(call, rendered.text, reply_markup=rendered.reply_markup, is_menu=True)
+        if (
+            _prefetch_enabled()
+            and (screen, scope) not in _PREFETCHING
+            and _missing_neighbours(screen, scope, rendered.page, rendered.total_pages)
+        ):
+            _PREFETCHING[(screen, scope)] = asyncio.create_task(
+                _prefetch(screen, scope, rendered.page, load), name=f"prefetch-{screen}-{rendered.page}"
+            )
+        return
+
+    source = await load()
+    rendered = source.render(max(1, min(page, source.total_pages)))
+    _store_page(key, source.version, rendered)
+    if rendered.page != page:
+        _store_page((screen, scope, rendered.page), source.version, rendered)
+    await _edit_or_send(call, rendered.text, reply_markup=rendered.reply_markup, is_menu=True)
+    # Соседние страницы рисуются из той же выборки: листание не ждёт базы.
+    _store_neighbours(screen, scope, rendered.page, source)
@@ -5,6 +5,7 @@ from aiogram import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
+from app.bot import callbacks as cb
 from app.bot.keyboards import cancel_keyboard, transfer_confirm_keyboard
 from app.bot.states import PayDebtState
 from app.config import get_settings
@@ -20,7 +21,7 @@ from .menu import _edit_or_send, _render_error_prompt, _show_start_menu, _show_s
 router = Router()
 
 
-@router.callback_query(lambda call: call.data == "debt:pay")
+@cb.route(cb.DEBT_PAY)
 async def debt_pay_callback(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -116,13 +117,12 @@ async def debt_pay_message(message: Message, state: FSMContext) -> None:
     )
 
 
-@router.callback_query(lambda call: call.data.startswith("transfer:confirm:"))
-async def transfer_confirm(call: CallbackQuery) -> None:
+@cb.route(cb.TRANSFER_CONFIRM)
+async def transfer_confirm(call: CallbackQuery, request_id: int) -> None:
     settings = get_settings()
     if call.from_user.id != settings.owner_telegram_id:
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    request_id = int(call.data.split(":")[-1])
     async with SessionLocal() as session:
         request = await session.get(TransferRequest, request_id)
         if not request or request.status != "pending":
@@ -164,13 +164,12 @@ async def transfer_confirm(call: CallbackQuery) -> None:
             logging.exception("Failed to notify agent about approved transfer")
 
 
-@router.callback_query(lambda call: call.data.startswith("transfer:reject:"))
-async def transfer_reject(call: CallbackQuery) -> None:
+@cb.route(cb.TRANSFER_REJECT)
+async def transfer_reject(call: CallbackQuery, request_id: int) -> None:
     settings = get_settings()
     if call.from_user.id != settings.owner_telegram_id:
         await call.answer(_t(settings.text_no_access_alert), show_alert=True)
         return
-    request_id = int(call.data.split(":")[-1])
     async with SessionLocal() as session:
         request = await session.get(TransferRequest, request_id)
         if not request or request.status != "pending":
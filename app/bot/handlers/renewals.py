@@ -1,36 +1,43 @@
 import logging
 import math
 from datetime import datetime
+from operator import attrgetter, itemgetter
+from uuid import uuid4
 
 from aiogram import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
+from app.bot import callbacks as cb
 from app.bot.keyboards import (
     amount_presets_keyboard,
     back_to_menu_keyboard,
     cancel_keyboard,
     clients_keyboard,
+    renew_bulk_confirm_keyboard,
+    renew_bulk_days_keyboard,
+    renew_bulk_keyboard,
     renew_confirm_keyboard,
     renew_clients_keyboard,
     renew_days_keyboard,
     tariffs_keyboard,
 )
-from app.bot.states import RenewState
+from app.bot.states import BulkRenewState, RenewState
 from app.config import get_settings
 from app.db.session import SessionLocal
-from app.models import Renewal
+from app.payload_log import PayloadLog, Summary
 from app.services.agent_service import get_agent_by_id, get_or_create_agent
 from app.services.client_service import (
-    add_days,
     get_client_by_id,
     get_client_by_username,
     get_client_by_username_any,
     list_clients_by_agent,
     list_clients_with_agents,
 )
-from app.services.debt_service import increase_debt
-from app.services.remnawave_service import create_or_extend_user
+from app.services.data_version import clients_version
+from app.services.job_service import JOB_EXTEND, enqueue_job
+from app.services.renewal_service import bulk_extend
+from app.services.search_service import search_clients
 
 from .common import (
     _amount_presets,
@@ -41,19 +48,33 @@ from .common import (
     _is_cancel,
     _is_skip,
     _is_start,
+    _progress_editor,
+    _short_list,
     _t,
     _tariffs_for_user,
 )
-from .menu import _edit_or_send, _render_error_prompt, _render_menu_text, _show_start_menu, _show_status_then_menu
+from .menu import (
+    _edit_or_send,
+    _render_error_prompt,
+    _render_menu,
+    _render_menu_text,
+    _show_start_menu,
+    _show_status_then_menu,
+)
 from .clients import _format_client_meta
+from .pages import PageSource, PageVersion, RenderedPage, _show_page
 
 
 router = Router()
 
 _RENEW_PAGE_SIZE = 8
+_RENEW_LIST_LOG = PayloadLog("renew_list")
+
+# Пользователи, у которых массовое продление уже идёт.
+_BULK_RUNNING: set[int] = set()
 
 
-@router.callback_query(lambda call: call.data == "client:renew")
+@cb.route(cb.CLIENT_RENEW)
 async def renew_callback(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -63,16 +84,11 @@ async def renew_callback(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data.startswith("renew:list:page:"))
-async def renew_list_page(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.RENEW_LIST_PAGE)
+async def renew_list_page(call: CallbackQuery, state: FSMContext, page: int) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
         return
-    try:
-        page = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(get_settings().text_page_invalid), show_alert=True)
-        return
     await _render_renew_list(call, page=page)
     await call.answer()
 
@@ -123,13 +139,35 @@ def _calc_renew_preview(
     return amount_total, owner_share, profit, extra_client
 
 
+def _renew_list_source(settings, version: PageVersion, items: list[tuple[int, str, int | None]], prompt: str) -> PageSource:
+    total_pages = max(1, math.ceil(len(items) / _RENEW_PAGE_SIZE))
+
+    def render(page: int) -> RenderedPage:
+        if not items:
+            return RenderedPage(_t(settings.text_clients_none), back_to_menu_keyboard(), page, total_pages)
+        start = (page - 1) * _RENEW_PAGE_SIZE
+        end = start + _RENEW_PAGE_SIZE
+        page_rows = items[start:end]
+        reply_markup = (
+            clients_keyboard(page_rows, include_cancel=True, include_bulk=True)
+            if total_pages == 1
+            else renew_clients_keyboard(page_rows, page, total_pages, include_cancel=True, include_bulk=True)
+        )
+        return RenderedPage(prompt, reply_markup, page, total_pages)
+
+    return PageSource(version, total_pages, render)
+
+
 async def _render_renew_list(call: CallbackQuery, page: int) -> None:
     settings = get_settings()
     is_owner = call.from_user.id == settings.owner_telegram_id
     is_admin = call.from_user.id in settings.admin_id_set
-    async with SessionLocal() as session:
-        if is_owner or is_admin:
-            client_rows = await list_clients_with_agents(session)
+    if is_owner or is_admin:
+
+        async def load_all() -> PageSource:
+            async with SessionLocal() as session:
+                version = PageVersion.of(clients_version, None)
+                client_rows = await list_clients_with_agents(session)
             items = [
                 (
                     client.id,
@@ -139,63 +177,41 @@ async def _render_renew_list(call: CallbackQuery, page: int) -> None:
                 for client, agent in client_rows
                 if client.username
             ]
-            if not items:
-                await _edit_or_send(
-                    call,
-                    _t(settings.text_clients_none),
-                    reply_markup=back_to_menu_keyboard(),
-                    is_menu=True,
-                )
-                return
-            total_pages = max(1, math.ceil(len(items) / _RENEW_PAGE_SIZE))
-            page = max(1, min(page, total_pages))
-            start = (page - 1) * _RENEW_PAGE_SIZE
-            end = start + _RENEW_PAGE_SIZE
-            page_rows = items[start:end]
-            reply_markup = (
-                clients_keyboard(page_rows, include_cancel=True)
-                if total_pages == 1
-                else renew_clients_keyboard(page_rows, page, total_pages, include_cancel=True)
-            )
-            await _edit_or_send(
-                call,
-                _t(settings.text_renew_pick_prompt_owner),
-                reply_markup=reply_markup,
-                is_menu=True,
-            )
-            logging.info("Renew list for owner/admin: %s", [c[0] for c in items])
-            return
+            _RENEW_LIST_LOG.log("Renew list for owner/admin: %s", Summary(items, key=itemgetter(0)))
+            return _renew_list_source(settings, version, items, _t(settings.text_renew_pick_prompt_owner))
+
+        await _show_page(call, "renew", None, page, load_all)
+        return
 
+    # Лимит долга проверяется при каждом показе: из кеша берётся только сам список.
+    async with SessionLocal() as session:
         agent = await get_or_create_agent(
             session,
             call.from_user.id,
             call.from_user.full_name,
             call.from_user.username,
         )
-        if _credit_limit_exceeded(agent, 0):
-            await _show_status_then_menu(
-                bot=call.bot,
-                chat_id=call.message.chat.id,
-                user_id=call.from_user.id,
-                name=call.from_user.full_name,
-                is_owner=False,
-                status_text=_t(
-                    settings.text_limit_reached_renew,
-                    current=agent.current_debt,
-                    limit=agent.credit_limit,
-                ),
-            )
-            return
-        clients = await list_clients_by_agent(session, agent.id)
+    if _credit_limit_exceeded(agent, 0):
+        await _show_status_then_menu(
+            bot=call.bot,
+            chat_id=call.message.chat.id,
+            user_id=call.from_user.id,
+            name=call.from_user.full_name,
+            is_owner=False,
+            status_text=_t(
+                settings.text_limit_reached_renew,
+                current=agent.current_debt,
+                limit=agent.credit_limit,
+            ),
+        )
+        return
+    agent_id = agent.id
+
+    async def load_agent() -> PageSource:
+        async with SessionLocal() as session:
+            version = PageVersion.of(clients_version, agent_id)
+            clients = await list_clients_by_agent(session, agent_id)
         clients = [client for client in clients if client.username]
-        if not clients:
-            await _edit_or_send(
-                call,
-                _t(settings.text_clients_none),
-                reply_markup=back_to_menu_keyboard(),
-                is_menu=True,
-            )
-            return
         items = [
             (
                 client.id,
@@ -204,31 +220,17 @@ async def _render_renew_list(call: CallbackQuery, page: int) -> None:
             )
             for client in clients
         ]
-        total_pages = max(1, math.ceil(len(items) / _RENEW_PAGE_SIZE))
-        page = max(1, min(page, total_pages))
-        start = (page - 1) * _RENEW_PAGE_SIZE
-        end = start + _RENEW_PAGE_SIZE
-        page_rows = items[start:end]
-        reply_markup = (
-            clients_keyboard(page_rows, include_cancel=True)
-            if total_pages == 1
-            else renew_clients_keyboard(page_rows, page, total_pages, include_cancel=True)
-        )
-        await _edit_or_send(
-            call,
-            _t(settings.text_renew_pick_prompt_agent),
-            reply_markup=reply_markup,
-            is_menu=True,
-        )
-        logging.info("Renew list for agent %s: %s", agent.id, [c.username for c in clients])
+        _RENEW_LIST_LOG.log("Renew list for agent %s: %s", agent_id, Summary(clients, key=attrgetter("username")))
+        return _renew_list_source(settings, version, items, _t(settings.text_renew_pick_prompt_agent))
+
+    await _show_page(call, "renew", call.from_user.id, page, load_agent)
 
 
-@router.callback_query(lambda call: call.data.startswith("renew:pick:"))
-async def renew_pick_client(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.RENEW_PICK)
+async def renew_pick_client(call: CallbackQuery, state: FSMContext, client_id: int) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
         return
-    client_id = int(call.data.split(":")[-1])
     settings = get_settings()
     is_owner = call.from_user.id == settings.owner_telegram_id
     is_admin = call.from_user.id in settings.admin_id_set
@@ -300,7 +302,7 @@ async def renew_pick_client(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "renew:back")
+@cb.route(cb.RENEW_BACK)
 async def renew_back(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -328,9 +330,11 @@ async def renew_username(message: Message, state: FSMContext) -> None:
     settings = get_settings()
     is_owner = message.from_user.id == settings.owner_telegram_id
     is_admin = message.from_user.id in settings.admin_id_set
+    matches = []
     async with SessionLocal() as session:
         if is_owner or is_admin:
             picked = await get_client_by_username_any(session, username)
+            scope = None
         else:
             agent = await get_or_create_agent(
                 session,
@@ -339,6 +343,22 @@ async def renew_username(message: Message, state: FSMContext) -> None:
                 message.from_user.username,
             )
             picked = await get_client_by_username(session, agent.id, username)
+            scope = agent.id
+        if not picked:
+            matches = await search_clients(session, username, agent_id=scope, limit=settings.client_search_limit)
+    if not picked and matches:
+        await _render_menu_text(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            user_id=message.from_user.id,
+            name=message.from_user.full_name,
+            text=_t(settings.text_client_search_results, count=len(matches)),
+            reply_markup=clients_keyboard(
+                [(match.id, match.username, match.monthly_price) for match in matches], include_cancel=True
+            ),
+            force_new=True,
+        )
+        return
     if not picked:
         await _render_error_prompt(
             bot=message.bot,
@@ -459,7 +479,7 @@ async def renew_days(message: Message, state: FSMContext) -> None:
             user_id=message.from_user.id,
             name=message.from_user.full_name,
             text=f"{_t(settings.text_tariffs_empty)}\n\n{prompt_text}",
-            reply_markup=amount_presets_keyboard("amount:renew", _amount_presets(settings.base_subscription_price)),
+            reply_markup=amount_presets_keyboard(cb.AMOUNT_RENEW, _amount_presets(settings.base_subscription_price)),
             force_new=True,
         )
         await state.update_data(tariff_base_price=settings.base_subscription_price, tariff_remnawave={})
@@ -486,9 +506,9 @@ async def renew_days(message: Message, state: FSMContext) -> None:
         reply_markup=tariffs_keyboard(
             tariffs,
             include_back=True,
-            back_callback="renew:tariff:back",
+            back_callback=cb.RENEW_TARIFF_BACK.pack(),
             label_mode="price",
-            top_button=(_t(settings.btn_renew_same), "renew:same"),
+            top_button=(_t(settings.btn_renew_same), cb.RENEW_SAME.pack()),
         ),
         force_new=True,
     )
@@ -534,7 +554,7 @@ async def _renew_select_days(call: CallbackQuery, state: FSMContext, days: int)
         await _edit_or_send(
             call,
             f"{_t(settings.text_tariffs_empty)}\n\n{prompt_text}",
-            reply_markup=amount_presets_keyboard("amount:renew", _amount_presets(settings.base_subscription_price)),
+            reply_markup=amount_presets_keyboard(cb.AMOUNT_RENEW, _amount_presets(settings.base_subscription_price)),
             is_menu=True,
         )
         await state.update_data(tariff_base_price=settings.base_subscription_price, tariff_remnawave={})
@@ -559,32 +579,27 @@ async def _renew_select_days(call: CallbackQuery, state: FSMContext, days: int)
         reply_markup=tariffs_keyboard(
             tariffs,
             include_back=True,
-            back_callback="renew:tariff:back",
+            back_callback=cb.RENEW_TARIFF_BACK.pack(),
             label_mode="price",
-            top_button=(_t(settings.btn_renew_same), "renew:same"),
+            top_button=(_t(settings.btn_renew_same), cb.RENEW_SAME.pack()),
         ),
         is_menu=True,
     )
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "skip:days")
+@cb.route(cb.SKIP_DAYS)
 async def renew_skip_days(call: CallbackQuery, state: FSMContext) -> None:
     settings = get_settings()
     await _renew_select_days(call, state, settings.default_renew_days)
 
 
-@router.callback_query(lambda call: call.data.startswith("renew:days:"))
-async def renew_pick_days(call: CallbackQuery, state: FSMContext) -> None:
-    try:
-        days = int(call.data.split(":")[-1])
-    except ValueError:
-        await call.answer(_t(get_settings().text_page_invalid), show_alert=True)
-        return
+@cb.route(cb.RENEW_DAYS)
+async def renew_pick_days(call: CallbackQuery, state: FSMContext, days: int) -> None:
     await _renew_select_days(call, state, days)
 
 
-@router.callback_query(lambda call: call.data == "renew:tariff:back")
+@cb.route(cb.RENEW_TARIFF_BACK)
 async def renew_tariff_back(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -776,73 +791,40 @@ async def _process_renewal(
             await state.clear()
             return
 
-        try:
-            result = await create_or_extend_user(
-                username=client.username,
-                days=days,
-                description=f"agent:{target_agent.telegram_id}",
-                telegram_id=client.telegram_id,
-                overrides=tariff_remnawave,
-            )
-            logging.info("Renew Remnawave result: %s", result)
-        except Exception as exc:
-            logging.exception("Renew Remnawave error")
-            await _show_status_then_menu(
-                bot=bot,
-                chat_id=chat_id,
-                user_id=user_id,
-                name=full_name,
-                is_owner=is_owner,
-                status_text=_t(settings.text_renew_error, error=exc),
-            )
-            await state.clear()
-            return
-
-        client.expires_at = result.get("expires_at") or add_days(client.expires_at, days)
-        client.subscription_link = result.get("subscription_url") or client.subscription_link
-        client.monthly_price = amount_monthly
-        client.last_payment_amount = amount_total
-        client.last_payment_at = datetime.utcnow()
-        client.tariff_base_price = base_price
-        client.tariff_name = data.get("tariff_name") or _t(settings.text_client_tariff_default)
-        session.add(
-            Renewal(
-                agent_id=target_agent.id,
-                client_id=client.id,
-                days=days,
-                debt_amount=owner_share,
-                payment_amount=amount_total,
-            )
-        )
-        await session.commit()
-
-        await increase_debt(
+        # Панель меняет воркер очереди: пользователь не ждёт её ответа, результат придёт в меню.
+        await enqueue_job(
             session,
-            target_agent,
-            owner_share,
-            f"Продление {days} дней для {client.username}",
-        )
-        await session.refresh(target_agent)
-        profit = amount_total - owner_share
-        await _show_status_then_menu(
-            bot=bot,
+            JOB_EXTEND,
+            f"extend:{data['job_key']}",
+            {
+                "client_id": client.id,
+                "agent_id": target_agent.id,
+                "days": days,
+                "amount_monthly": amount_monthly,
+                "amount_total": amount_total,
+                "owner_share": owner_share,
+                "base_price": base_price,
+                "tariff_name": data.get("tariff_name") or _t(settings.text_client_tariff_default),
+                "overrides": tariff_remnawave,
+                "description": f"agent:{target_agent.telegram_id}",
+                "actor_name": full_name,
+                "is_owner": is_owner,
+            },
             chat_id=chat_id,
             user_id=user_id,
-            name=full_name,
-            is_owner=is_owner,
-            status_text=_t(
-                settings.text_renew_success,
-                days=days,
-                profit=profit,
-                amount=amount_total,
-                owner_share=owner_share,
-                payable=target_agent.current_debt,
-            ),
         )
+    await _render_menu(
+        bot=bot,
+        chat_id=chat_id,
+        user_id=user_id,
+        name=full_name,
+        is_owner=is_owner,
+        text=_t(settings.text_job_queued),
+    )
     await state.clear()
 
 
-@router.callback_query(lambda call: call.data == "renew:same")
+@cb.route(cb.RENEW_SAME)
 async def renew_same_tariff(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -916,7 +898,7 @@ async def renew_same_tariff(call: CallbackQuery, state: FSMContext) -> None:
         await _edit_or_send(
             call,
             prompt_with_hint,
-            reply_markup=amount_presets_keyboard("amount:renew", _amount_presets(base_price)),
+            reply_markup=amount_presets_keyboard(cb.AMOUNT_RENEW, _amount_presets(base_price)),
             is_menu=True,
         )
         await state.set_state(RenewState.waiting_amount)
@@ -940,7 +922,7 @@ async def renew_same_tariff(call: CallbackQuery, state: FSMContext) -> None:
         ).strip()
         if note:
             upgrade_note = f"\n{note}"
-    await state.update_data(renew_amount_monthly=client_price_value)
+    await state.update_data(renew_amount_monthly=client_price_value, job_key=uuid4().hex)
     await state.set_state(RenewState.waiting_confirm)
     await _edit_or_send(
         call,
@@ -991,7 +973,7 @@ async def renew_amount(message: Message, state: FSMContext) -> None:
             name=message.from_user.full_name,
             error_text=_t(get_settings().text_amount_invalid),
             prompt_text=prompt_text,
-            reply_markup=amount_presets_keyboard("amount:renew", _amount_presets(base_price, current_price)),
+            reply_markup=amount_presets_keyboard(cb.AMOUNT_RENEW, _amount_presets(base_price, current_price)),
         )
         return
     if amount <= 0:
@@ -1005,7 +987,7 @@ async def renew_amount(message: Message, state: FSMContext) -> None:
             name=message.from_user.full_name,
             error_text=_t(get_settings().text_amount_positive),
             prompt_text=prompt_text,
-            reply_markup=amount_presets_keyboard("amount:renew", _amount_presets(base_price, current_price)),
+            reply_markup=amount_presets_keyboard(cb.AMOUNT_RENEW, _amount_presets(base_price, current_price)),
         )
         return
 
@@ -1026,7 +1008,7 @@ async def renew_amount(message: Message, state: FSMContext) -> None:
         ).strip()
         if note:
             upgrade_note = f"\n{note}"
-    await state.update_data(renew_amount_monthly=amount)
+    await state.update_data(renew_amount_monthly=amount, job_key=uuid4().hex)
     await state.set_state(RenewState.waiting_confirm)
     await _render_menu_text(
         bot=message.bot,
@@ -1050,18 +1032,12 @@ async def renew_amount(message: Message, state: FSMContext) -> None:
     )
 
 
-@router.callback_query(lambda call: call.data.startswith("amount:renew:"))
-async def renew_amount_preset(call: CallbackQuery, state: FSMContext) -> None:
+@cb.route(cb.AMOUNT_RENEW)
+async def renew_amount_preset(call: CallbackQuery, state: FSMContext, amount: int) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
         return
     settings = get_settings()
-    token = call.data.split(":")[-1]
-    try:
-        amount = int(token)
-    except ValueError:
-        await call.answer(_t(settings.text_amount_invalid), show_alert=True)
-        return
     if amount <= 0:
         await call.answer(_t(settings.text_amount_positive), show_alert=True)
         return
@@ -1083,7 +1059,7 @@ async def renew_amount_preset(call: CallbackQuery, state: FSMContext) -> None:
         ).strip()
         if note:
             upgrade_note = f"\n{note}"
-    await state.update_data(renew_amount_monthly=amount)
+    await state.update_data(renew_amount_monthly=amount, job_key=uuid4().hex)
     await state.set_state(RenewState.waiting_confirm)
     await _edit_or_send(
         call,
@@ -1105,7 +1081,7 @@ async def renew_amount_preset(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "renew:confirm")
+@cb.route(cb.RENEW_CONFIRM)
 async def renew_confirm(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -1115,6 +1091,10 @@ async def renew_confirm(call: CallbackQuery, state: FSMContext) -> None:
     if not amount_monthly:
         await call.answer(_t(get_settings().text_amount_invalid), show_alert=True)
         return
+    # Без ключа идемпотентности повторное нажатие создало бы второе задание.
+    if not data.get("job_key"):
+        await call.answer(_t(get_settings().text_confirm_expired), show_alert=True)
+        return
     await _process_renewal(
         bot=call.bot,
         chat_id=call.message.chat.id,
@@ -1129,7 +1109,7 @@ async def renew_confirm(call: CallbackQuery, state: FSMContext) -> None:
     await call.answer()
 
 
-@router.callback_query(lambda call: call.data == "renew:confirm:back")
+@cb.route(cb.RENEW_CONFIRM_BACK)
 async def renew_confirm_back(call: CallbackQuery, state: FSMContext) -> None:
     if not await _is_agent_allowed(call.from_user.id):
         await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
@@ -1143,7 +1123,260 @@ async def renew_confirm_back(call: CallbackQuery, state: FSMContext) -> None:
     await _edit_or_send(
         call,
         prompt_text,
-        reply_markup=amount_presets_keyboard("amount:renew", _amount_presets(base_price, current_price)),
+        reply_markup=amount_presets_keyboard(cb.AMOUNT_RENEW, _amount_presets(base_price, current_price)),
+        is_menu=True,
+    )
+    await call.answer()
+
+# ─── Продление нескольких клиентов ───────────────────────────
+
+
+async def _bulk_renew_candidates(call: CallbackQuery) -> list[tuple]:
+    """(клиент, агент) тех, кого пора продлевать: владелец и админы видят всех, агент — своих."""
+    settings = get_settings()
+    async with SessionLocal() as session:
+        if call.from_user.id == settings.owner_telegram_id or call.from_user.id in settings.admin_id_set:
+            pairs = await list_clients_with_agents(session)
+        else:
+            agent = await get_or_create_agent(
+                session,
+                call.from_user.id,
+                call.from_user.full_name,
+                call.from_user.username,
+            )
+            pairs = [(client, agent) for client in await list_clients_by_agent(session, agent.id)]
+    return [
+        (client, agent)
+        for client, agent in pairs
+        if client.username and _days_left_int(client.expires_at) <= settings.renew_min_days_left
+    ]
+
+
+async def _render_bulk_renew(call: CallbackQuery, state: FSMContext, page: int) -> None:
+    settings = get_settings()
+    candidates = await _bulk_renew_candidates(call)
+    if not candidates:
+        await _edit_or_send(call, _t(settings.text_renew_bulk_empty), reply_markup=back_to_menu_keyboard(), is_menu=True)
+        return
+    selected = set((await state.get_data()).get("bulk_renew_ids") or [])
+    show_agent = call.from_user.id == settings.owner_telegram_id or call.from_user.id in settings.admin_id_set
+    total_pages = max(1, math.ceil(len(candidates) / _RENEW_PAGE_SIZE))
+    page = max(1, min(page, total_pages))
+    start = (page - 1) * _RENEW_PAGE_SIZE
+    rows = [
+        (
+            client.id,
+            f"{client.username} · {_format_expires_short(client.expires_at)}"
+            + (f" ({agent.name})" if show_agent else ""),
+            client.id in selected,
+        )
+        for client, agent in candidates[start : start + _RENEW_PAGE_SIZE]
+    ]
+    await _edit_or_send(
+        call,
+        _t(settings.text_renew_bulk_prompt, min_days=settings.renew_min_days_left, count=len(selected)),
+        reply_markup=renew_bulk_keyboard(rows, page, total_pages, len(selected)),
         is_menu=True,
     )
-    await call.answer()
\ No newline at end of file
+
+
+def _bulk_renew_item(settings, client, agent, days: int) -> dict:
+    """Цены как у «Продлить как есть»: тариф и цена клиента прежние, доплата за подорожание тарифа — как в превью."""
+    tariff_name = client.tariff_name or _t(settings.text_client_tariff_default)
+    old_base_price = client.tariff_base_price or settings.base_subscription_price
+    tariffs = _tariffs_for_user(settings, agent.telegram_id)
+    matched = next((t for t in tariffs if (t.get("name") or "") == tariff_name), None)
+    base_price = (matched or {}).get("base_price") or old_base_price
+    amount_monthly = client.monthly_price or base_price
+    amount_total, owner_share, _profit, _extra = _calc_renew_preview(
+        settings,
+        data={
+            "days": days,
+            "renew_old_base_price": old_base_price,
+            "renew_client_price_value": client.monthly_price,
+            "renew_days_left": _days_left_int(client.expires_at),
+        },
+        amount_monthly=amount_monthly,
+        base_price=base_price,
+    )
+    return {
+        "client_id": client.id,
+        "agent_id": agent.id,
+        "days": days,
+        "amount_monthly": amount_monthly,
+        "amount_total": amount_total,
+        "owner_share": owner_share,
+        "base_price": base_price,
+        "tariff_name": tariff_name,
+        "overrides": (matched or {}).get("remnawave") or {},
+        "description": f"agent:{agent.telegram_id}",
+    }
+
+
+async def _bulk_renew_plan(call: CallbackQuery, state: FSMContext) -> tuple[list[dict], str | None]:
+    """Позиции продления по текущему выбору и ошибка для показа; лимит проверяется один раз на сумму агента."""
+    settings = get_settings()
+    data = await state.get_data()
+    selected = set(data.get("bulk_renew_ids") or [])
+    days = data.get("bulk_renew_days") or settings.default_renew_days
+    pairs = [(client, agent) for client, agent in await _bulk_renew_candidates(call) if client.id in selected]
+    if not pairs:
+        return [], _t(settings.text_renew_bulk_none_selected)
+    items = [_bulk_renew_item(settings, client, agent, days) for client, agent in pairs]
+    agents = {agent.id: agent for _, agent in pairs}
+    for agent_id, agent in agents.items():
+        if not agent.is_active:
+            return [], _t(settings.text_target_agent_blocked)
+        total = sum(item["owner_share"] for item in items if item["agent_id"] == agent_id)
+        if _credit_limit_exceeded(agent, total):
+            return [], _t(
+                settings.text_limit_reached_renew_inline, current=agent.current_debt, limit=agent.credit_limit
+            )
+    return items, None
+
+
+@cb.route(cb.RENEW_BULK)
+async def renew_bulk(call: CallbackQuery, state: FSMContext) -> None:
+    if not await _is_agent_allowed(call.from_user.id):
+        await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
+        return
+    await state.set_state(BulkRenewState.selecting)
+    await state.set_data({"bulk_renew_ids": []})
+    await _render_bulk_renew(call, state, page=1)
+    await call.answer()
+
+
+@cb.route(cb.RENEW_BULK_PAGE)
+async def renew_bulk_page(call: CallbackQuery, state: FSMContext, page: int) -> None:
+    if not await _is_agent_allowed(call.from_user.id):
+        await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
+        return
+    await state.set_state(BulkRenewState.selecting)
+    await _render_bulk_renew(call, state, page=page)
+    await call.answer()
+
+
+async def _bulk_renew_select(call: CallbackQuery, state: FSMContext, client_ids: list[int], page: int) -> None:
+    settings = get_settings()
+    selected = list((await state.get_data()).get("bulk_renew_ids") or [])
+    if all(client_id in selected for client_id in client_ids):
+        selected = [client_id for client_id in selected if client_id not in client_ids]
+    else:
+        selected.extend(client_id for client_id in client_ids if client_id not in selected)
+    if len(selected) > settings.bulk_renew_max_clients:
+        await call.answer(
+            _t(settings.text_renew_bulk_too_many, max_clients=settings.bulk_renew_max_clients), show_alert=True
+        )
+        return
+    await state.update_data(bulk_renew_ids=selected)
+    await _render_bulk_renew(call, state, page=page)
+    await call.answer()
+
+
+@cb.route(cb.RENEW_BULK_TOGGLE)
+async def renew_bulk_toggle(call: CallbackQuery, state: FSMContext, client_id: int, page: int) -> None:
+    if not await _is_agent_allowed(call.from_user.id):
+        await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
+        return
+    await _bulk_renew_select(call, state, [client_id], page)
+
+
+@cb.route(cb.RENEW_BULK_ALL)
+async def renew_bulk_all(call: CallbackQuery, state: FSMContext, page: int) -> None:
+    if not await _is_agent_allowed(call.from_user.id):
+        await call.answer(_t(get_settings().text_no_access_alert), show_alert=True)
+        return
+    candidates = await _bulk_renew_candidates(call)
+    start = (max(1, page) - 1) * _RENEW_PAGE_SIZE
+    page_ids = [client.id for client, _ in candidates[start : start + _RENEW_PAGE_SIZE]]
+    await _bulk_renew_select(call, state, page_ids, page)
+
+
+@cb.route(cb.RENEW_BULK_NEXT)
+async def renew_bulk_next(call: CallbackQuery, state: FSMContext) -> None:
+    settings = get_settings()
+    if not await _is_agent_allowed(call.from_user.id):
+        await call.answer(_t(settings.text_no_access_alert), show_alert=True)
+        return
+    selected = (await state.get_data()).get("bulk_renew_ids") or []
+    if not selected:
+        await call.answer(_t(settings.text_renew_bulk_none_selected), show_alert=True)
+        return
+    await state.set_state(BulkRenewState.selecting)
+    await _edit_or_send(
+        call,
+        _t(settings.text_renew_bulk_days_prompt, count=len(selected)),
+        reply_markup=renew_bulk_days_keyboard(),
+        is_menu=True,
+    )
+    await call.answer()
+
+
+@cb.route(cb.RENEW_BULK_DAYS)
+async def renew_bulk_days(call: CallbackQuery, state: FSMContext, days: int) -> None:
+    settings = get_settings()
+    if not await _is_agent_allowed(call.from_user.id):
+        await call.answer(_t(settings.text_no_access_alert), show_alert=True)
+        return
+    await state.update_data(bulk_renew_days=days if days > 0 else settings.default_renew_days)
+    items, error = await _bulk_renew_plan(call, state)
+    if error:
+        await call.answer(error, show_alert=True)
+        return
+    amount_total = sum(item["amount_total"] for item in items)
+    owner_share = sum(item["owner_share"] for item in items)
+    await state.set_state(BulkRenewState.waiting_confirm)
+    await _edit_or_send(
+        call,
+        _t(
+            settings.text_renew_bulk_preview,
+            count=len(items),
+            days=items[0]["days"],
+            amount_total=amount_total,
+            owner_share=owner_share,
+            profit=amount_total - owner_share,
+        ),
+        reply_markup=renew_bulk_confirm_keyboard(),
+        is_menu=True,
+    )
+    await call.answer()
+
+
+@cb.route(cb.RENEW_BULK_CONFIRM)
+async def renew_bulk_confirm(call: CallbackQuery, state: FSMContext) -> None:
+    settings = get_settings()
+    # Отметка до первого await: повторное нажатие, пришедшее, пока идут проверки, не запустит второй проход.
+    if call.from_user.id in _BULK_RUNNING:
+        await call.answer(_t(settings.text_renew_bulk_busy), show_alert=True)
+        return
+    _BULK_RUNNING.add(call.from_user.id)
+    try:
+        if not await _is_agent_allowed(call.from_user.id):
+            await call.answer(_t(settings.text_no_access_alert), show_alert=True)
+            return
+        if await state.get_state() != BulkRenewState.waiting_confirm.state:
+            await call.answer(_t(settings.text_renew_bulk_none_selected), show_alert=True)
+            return
+        # Выбор и цены пересчитываются по свежим данным: между превью и подтверждением могли пройти продления.
+        items, error = await _bulk_renew_plan(call, state)
+        if error:
+            await call.answer(error, show_alert=True)
+            return
+        await state.clear()
+        await call.answer()
+
+        progress = _progress_editor(
+            call.message, settings.text_renew_bulk_progress, settings.progress_edit_interval_seconds
+        )
+        await progress(0, len(items))
+        result = await bulk_extend(items, concurrency=settings.bulk_renew_concurrency, progress=progress)
+    finally:
+        _BULK_RUNNING.discard(call.from_user.id)
+
+    text = _t(settings.text_renew_bulk_done, renewed=len(result.renewed), failed=len(result.failed))
+    if result.failed:
+        failed = _short_list([f"{username}: {error}" for username, error in result.failed])
+        text = f"{text}\n\n{_t(settings.text_renew_bulk_failed_header)}\n{failed}"
+    if result.unrecorded:
+        text = f"{text}\n\n{_t(settings.text_renew_bulk_unrecorded_header)}\n{_short_list(result.unrecorded)}"
+    await _edit_or_send(call, text, reply_markup=back_to_menu_keyboard(), is_menu=True)
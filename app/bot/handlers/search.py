@@ -0,0 +1,63 @@
+from aiogram import Router
+from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+
+from app.config import get_settings
+from app.db.session import SessionLocal
+from app.services.agent_service import get_agent_by_telegram_id
+from app.services.search_service import ClientMatch, search_clients_page
+
+from .common import _agent_display, _t
+from .renewals import _format_expires_short
+
+
+router = Router()
+
+
+def _inline_result(settings, match: ClientMatch, show_agent: bool) -> InlineQueryResultArticle:
+    description = _t(
+        settings.text_inline_client_description,
+        days_left=_format_expires_short(match.expires_at),
+        price=f"{match.monthly_price} ₽/мес" if match.monthly_price else "—",
+        tariff=match.tariff_name or _t(settings.text_client_tariff_default),
+    )
+    if show_agent:
+        description += "\n" + _t(settings.text_inline_client_agent, agent=_agent_display(match.agent))
+    return InlineQueryResultArticle(
+        id=str(match.id),
+        title=match.username,
+        description=description,
+        # Только username: в чате с ботом он попадает в ожидающий ввода сценарий (продление, удаление).
+        input_message_content=InputTextMessageContent(message_text=match.username, parse_mode=None),
+    )
+
+
+@router.inline_query()
+async def client_search_inline(query: InlineQuery) -> None:
+    """@bot часть_username — выбор клиента; страницы листаются курсором в ``offset``."""
+    settings = get_settings()
+    user_id = query.from_user.id
+    async with SessionLocal() as session:
+        if user_id == settings.owner_telegram_id or user_id in settings.admin_id_set:
+            scope = None
+        else:
+            agent = await get_agent_by_telegram_id(session, user_id)
+            if agent is None or not agent.is_active:
+                await query.answer([], is_personal=True, cache_time=settings.inline_search_cache_time)
+                return
+            scope = agent.id
+        matches, cursor = await search_clients_page(
+            session,
+            query.query,
+            agent_id=scope,
+            limit=max(1, min(settings.inline_search_page_size, 50)),
+            cursor=query.offset or None,
+        )
+    # offset ограничен 64 байтами; курсор длиннее (длинный username) — последняя страница.
+    next_offset = cursor if cursor and len(cursor.encode()) <= 64 else ""
+    # is_personal: выдача зависит от того, чьи клиенты видны спрашивающему.
+    await query.answer(
+        [_inline_result(settings, match, scope is None) for match in matches],
+        is_personal=True,
+        cache_time=settings.inline_search_cache_time,
+        next_offset=next_offset,
+    )
@@ -1,13 +1,74 @@
+from functools import lru_cache
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from app.bot import callbacks as cb
 from app.config import get_settings
+from app.texts import _t, on_texts_reload
+
+
+# Клавиатуры зависят только от настроек и аргументов, поэтому кешируются
+# и отдаются общими объектами. InlineKeyboardMarkup не заморожен (pydantic
+# frozen=False): изменение полученной клавиатуры или её строк испортит её
+# для всех. Нужна другая — собрать новую или взять model_copy(deep=True).
+_CACHED_BUILDERS: list = []
+
+
+def _cached(maxsize: int = 1):
+    def decorator(func):
+        cached = lru_cache(maxsize=maxsize)(func)
+        _CACHED_BUILDERS.append(cached)
+        return cached
+
+    return decorator
+
+
+@on_texts_reload
+def clear_keyboard_cache() -> None:
+    for builder in _CACHED_BUILDERS:
+        builder.cache_clear()
+
+
+@_cached(maxsize=64)
+def _button_row(text_name: str, callback_data: str) -> tuple[InlineKeyboardButton, ...]:
+    text = _t(getattr(get_settings(), text_name))
+    return (InlineKeyboardButton(text=text, callback_data=callback_data),)
+
 
+@_cached()
+def _search_row() -> tuple[InlineKeyboardButton, ...]:
+    # Открывает inline-поиск в этом же чате: выбранный клиент придёт сообщением с username.
+    text = _t(get_settings().btn_client_search)
+    return (InlineKeyboardButton(text=text, switch_inline_query_current_chat=""),)
 
-def _t(value: str, **kwargs) -> str:
-    text = value.replace("\\n", "\n")
-    return text.format(**kwargs) if kwargs else text
 
+@_cached(maxsize=512)
+def _nav_row(action: cb.CallbackAction, page: int, total_pages: int) -> tuple[InlineKeyboardButton, ...]:
+    settings = get_settings()
+    nav = []
+    if page > 1:
+        nav.append(InlineKeyboardButton(text=_t(settings.btn_prev), callback_data=action.pack(page - 1)))
+    if page < total_pages:
+        nav.append(InlineKeyboardButton(text=_t(settings.btn_next), callback_data=action.pack(page + 1)))
+    return tuple(nav)
+
+
+def _paginated_keyboard(
+    item_rows: list[list[InlineKeyboardButton]],
+    nav_action: cb.CallbackAction,
+    page: int,
+    total_pages: int,
+    tail_rows: tuple[tuple[InlineKeyboardButton, ...], ...],
+) -> InlineKeyboardMarkup:
+    rows = list(item_rows)
+    nav = _nav_row(nav_action, page, total_pages)
+    if nav:
+        rows.append(list(nav))
+    rows.extend(list(row) for row in tail_rows)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
+
+@_cached(maxsize=1024)
 def main_menu(
     is_owner: bool = False, balance: int | None = None, credit_limit: int | None = None
 ) -> InlineKeyboardMarkup:
@@ -19,180 +80,241 @@ def main_menu(
             limit_text = f"{credit_limit} ₽"
         balance_label = _t(settings.btn_balance_with_limit, balance=balance, limit=limit_text)
     rows = [
-        [InlineKeyboardButton(text=_t(settings.btn_vpn_info), callback_data="vpn:info")],
-        [InlineKeyboardButton(text=_t(settings.btn_tariffs), callback_data="tariffs:info")],
-        [InlineKeyboardButton(text=_t(settings.btn_new_client), callback_data="client:new")],
-        [InlineKeyboardButton(text=_t(settings.btn_renew), callback_data="client:renew")],
-        [InlineKeyboardButton(text=_t(settings.btn_clients), callback_data="client:list")],
-        [InlineKeyboardButton(text=_t(settings.btn_pay), callback_data="debt:pay")],
-        [InlineKeyboardButton(text=balance_label, callback_data="balance:refresh")],
+        list(_button_row("btn_vpn_info", cb.VPN_INFO.pack())),
+        list(_button_row("btn_tariffs", cb.TARIFFS_INFO.pack())),
+        list(_button_row("btn_new_client", cb.CLIENT_NEW.pack())),
+        list(_button_row("btn_renew", cb.CLIENT_RENEW.pack())),
+        list(_button_row("btn_clients", cb.CLIENT_LIST.pack())),
+        list(_button_row("btn_pay", cb.DEBT_PAY.pack())),
+        [InlineKeyboardButton(text=balance_label, callback_data=cb.BALANCE_REFRESH.pack())],
     ]
     if is_owner:
-        rows.append([InlineKeyboardButton(text=_t(settings.btn_owner_agents), callback_data="owner:agents")])
+        rows.append(list(_button_row("btn_owner_agents", cb.OWNER_AGENTS.pack())))
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@_cached()
 def owner_agents_menu() -> InlineKeyboardMarkup:
     settings = get_settings()
     return InlineKeyboardMarkup(
         inline_keyboard=[
             # Управление агентами
-            [InlineKeyboardButton(text=_t(settings.btn_owner_add_agent), callback_data="owner:add_agent")],
+            [InlineKeyboardButton(text=_t(settings.btn_owner_add_agent), callback_data=cb.OWNER_ADD_AGENT.pack())],
+            [
+                InlineKeyboardButton(text=_t(settings.btn_owner_limit), callback_data=cb.OWNER_LIMIT.pack()),
+                InlineKeyboardButton(text=_t(settings.btn_owner_report), callback_data=cb.OWNER_REPORT.pack()),
+            ],
             [
-                InlineKeyboardButton(text=_t(settings.btn_owner_limit), callback_data="owner:limit"),
-                InlineKeyboardButton(text=_t(settings.btn_owner_report), callback_data="owner:report"),
+                InlineKeyboardButton(text=_t(settings.btn_owner_revenue), callback_data=cb.OWNER_REVENUE.pack(1)),
+                InlineKeyboardButton(text=_t(settings.btn_owner_export), callback_data=cb.OWNER_EXPORT_MENU.pack()),
             ],
             # Уведомления
             [
                 InlineKeyboardButton(
-                    text=_t(settings.btn_owner_notify_preview), callback_data="owner:notify:preview"
+                    text=_t(settings.btn_owner_notify_preview), callback_data=cb.OWNER_NOTIFY_PREVIEW.pack()
                 ),
                 InlineKeyboardButton(
-                    text=_t(settings.btn_owner_notify_send), callback_data="owner:notify:send"
+                    text=_t(settings.btn_owner_notify_send), callback_data=cb.OWNER_NOTIFY_SEND.pack()
                 ),
             ],
             # Удаление
             [
                 InlineKeyboardButton(
-                    text=_t(settings.btn_owner_delete_client), callback_data="owner:delete:client"
+                    text=_t(settings.btn_owner_delete_client), callback_data=cb.OWNER_DELETE_CLIENT.pack()
                 ),
                 InlineKeyboardButton(
-                    text=_t(settings.btn_owner_delete_agent), callback_data="owner:delete:agent"
+                    text=_t(settings.btn_owner_delete_agent), callback_data=cb.OWNER_DELETE_AGENT.pack()
                 ),
             ],
             # Служебное
             [
-                InlineKeyboardButton(text=_t(settings.btn_owner_sync), callback_data="owner:sync"),
-                InlineKeyboardButton(text=_t(settings.btn_owner_refresh_agents), callback_data="owner:refresh_agents"),
+                InlineKeyboardButton(text=_t(settings.btn_owner_sync), callback_data=cb.OWNER_SYNC.pack()),
+                InlineKeyboardButton(text=_t(settings.btn_owner_refresh_agents), callback_data=cb.OWNER_REFRESH_AGENTS.pack()),
             ],
-            [InlineKeyboardButton(text=_t(settings.btn_owner_back), callback_data="owner:back")],
+            list(_button_row("btn_owner_back", cb.OWNER_BACK.pack())),
         ]
     )
 
 
-def skip_keyboard(action: str) -> InlineKeyboardMarkup:
-    settings = get_settings()
+@_cached(maxsize=8)
+def skip_keyboard(action: cb.CallbackAction) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text=_t(settings.btn_skip), callback_data=f"skip:{action}")],
-            [InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")],
+            list(_button_row("btn_skip", action.pack())),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
         ]
     )
 
 
+@_cached()
 def renew_days_keyboard() -> InlineKeyboardMarkup:
     settings = get_settings()
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
-                InlineKeyboardButton(text=_t(settings.btn_renew_default_days), callback_data="renew:days:30"),
-                InlineKeyboardButton(text=_t(settings.btn_renew_90_days), callback_data="renew:days:90"),
+                InlineKeyboardButton(text=_t(settings.btn_renew_default_days), callback_data=cb.RENEW_DAYS.pack(30)),
+                InlineKeyboardButton(text=_t(settings.btn_renew_90_days), callback_data=cb.RENEW_DAYS.pack(90)),
             ],
             [
-                InlineKeyboardButton(text=_t(settings.btn_renew_180_days), callback_data="renew:days:180"),
-                InlineKeyboardButton(text=_t(settings.btn_renew_365_days), callback_data="renew:days:365"),
+                InlineKeyboardButton(text=_t(settings.btn_renew_180_days), callback_data=cb.RENEW_DAYS.pack(180)),
+                InlineKeyboardButton(text=_t(settings.btn_renew_365_days), callback_data=cb.RENEW_DAYS.pack(365)),
             ],
-            [InlineKeyboardButton(text=_t(settings.btn_back), callback_data="renew:back")],
+            list(_button_row("btn_back", cb.RENEW_BACK.pack())),
         ]
     )
 
 
+@_cached()
 def new_client_days_keyboard() -> InlineKeyboardMarkup:
     settings = get_settings()
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
-                InlineKeyboardButton(text=_t(settings.btn_renew_default_days), callback_data="client:new:days:30"),
-                InlineKeyboardButton(text=_t(settings.btn_renew_90_days), callback_data="client:new:days:90"),
+                InlineKeyboardButton(text=_t(settings.btn_renew_default_days), callback_data=cb.CLIENT_NEW_DAYS.pack(30)),
+                InlineKeyboardButton(text=_t(settings.btn_renew_90_days), callback_data=cb.CLIENT_NEW_DAYS.pack(90)),
             ],
             [
-                InlineKeyboardButton(text=_t(settings.btn_renew_180_days), callback_data="client:new:days:180"),
-                InlineKeyboardButton(text=_t(settings.btn_renew_365_days), callback_data="client:new:days:365"),
+                InlineKeyboardButton(text=_t(settings.btn_renew_180_days), callback_data=cb.CLIENT_NEW_DAYS.pack(180)),
+                InlineKeyboardButton(text=_t(settings.btn_renew_365_days), callback_data=cb.CLIENT_NEW_DAYS.pack(365)),
             ],
-            [InlineKeyboardButton(text=_t(settings.btn_back), callback_data="client:new:back")],
-            [InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")],
+            list(_button_row("btn_back", cb.CLIENT_NEW_BACK.pack())),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
         ]
     )
 
 
-def renew_confirm_keyboard() -> InlineKeyboardMarkup:
+@_cached()
+def renew_bulk_days_keyboard() -> InlineKeyboardMarkup:
     settings = get_settings()
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text=_t(settings.btn_renew_confirm), callback_data="renew:confirm")],
-            [InlineKeyboardButton(text=_t(settings.btn_renew_edit_amount), callback_data="renew:confirm:back")],
-            [InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")],
+            [
+                InlineKeyboardButton(text=_t(settings.btn_renew_default_days), callback_data=cb.RENEW_BULK_DAYS.pack(30)),
+                InlineKeyboardButton(text=_t(settings.btn_renew_90_days), callback_data=cb.RENEW_BULK_DAYS.pack(90)),
+            ],
+            [
+                InlineKeyboardButton(text=_t(settings.btn_renew_180_days), callback_data=cb.RENEW_BULK_DAYS.pack(180)),
+                InlineKeyboardButton(text=_t(settings.btn_renew_365_days), callback_data=cb.RENEW_BULK_DAYS.pack(365)),
+            ],
+            list(_button_row("btn_back", cb.RENEW_BULK_PAGE.pack(1))),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
         ]
     )
 
 
+@_cached()
+def renew_bulk_confirm_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            list(_button_row("btn_renew_bulk_confirm", cb.RENEW_BULK_CONFIRM.pack())),
+            list(_button_row("btn_back", cb.RENEW_BULK_NEXT.pack())),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
+        ]
+    )
+
+
+@_cached()
+def renew_confirm_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            list(_button_row("btn_renew_confirm", cb.RENEW_CONFIRM.pack())),
+            list(_button_row("btn_renew_edit_amount", cb.RENEW_CONFIRM_BACK.pack())),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
+        ]
+    )
+
+
+@_cached()
 def new_client_confirm_keyboard() -> InlineKeyboardMarkup:
-    settings = get_settings()
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text=_t(settings.btn_new_client_confirm), callback_data="client:new:confirm")],
-            [
-                InlineKeyboardButton(
-                    text=_t(settings.btn_new_client_edit_amount), callback_data="client:new:confirm:back"
-                )
-            ],
-            [InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")],
+            list(_button_row("btn_new_client_confirm", cb.CLIENT_NEW_CONFIRM.pack())),
+            list(_button_row("btn_new_client_edit_amount", cb.CLIENT_NEW_CONFIRM_BACK.pack())),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
         ]
     )
 
 
+@_cached()
+def import_confirm_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            list(_button_row("btn_import_confirm", cb.IMPORT_CONFIRM.pack())),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
+        ]
+    )
+
+
+@_cached()
+def compensation_confirm_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            list(_button_row("btn_compensation_confirm", cb.OWNER_COMPENSATE_CONFIRM.pack())),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
+        ]
+    )
+
+
+@_cached()
 def cancel_keyboard() -> InlineKeyboardMarkup:
-    settings = get_settings()
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")],
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
         ]
     )
 
 
+@_cached(maxsize=256)
 def delete_confirm_keyboard(confirm_cb: str) -> InlineKeyboardMarkup:
-    settings = get_settings()
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text=_t(settings.btn_delete_confirm), callback_data=confirm_cb)],
-            [InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")],
+            list(_button_row("btn_delete_confirm", confirm_cb)),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
         ]
     )
 
 
+@_cached()
 def back_to_menu_keyboard() -> InlineKeyboardMarkup:
-    settings = get_settings()
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text=_t(settings.btn_back_to_menu), callback_data="menu")],
+            list(_button_row("btn_back_to_menu", cb.MENU.pack())),
         ]
     )
 
 
+def _client_pick_rows(client_rows: list[tuple[int, str | None, int | None]]) -> list[list[InlineKeyboardButton]]:
+    rows = []
+    for client_id, username, price in client_rows:
+        label = username or f"client-{client_id}"
+        price_part = f" · {price}₽" if price else ""
+        label = f"{label}{price_part}"
+        rows.append([InlineKeyboardButton(text=label, callback_data=cb.RENEW_PICK.pack(client_id))])
+    return rows
+
+
 def clients_keyboard(
     client_rows: list[tuple[int, str | None, int | None]],
     include_cancel: bool = False,
+    include_bulk: bool = False,
 ) -> InlineKeyboardMarkup:
     """
     client_rows: list of (client_id, username, monthly_price)
     """
-    settings = get_settings()
-    rows = []
-    for client_id, username, price in client_rows:
-        label = username or f"client-{client_id}"
-        price_part = f" · {price}₽" if price else ""
-        label = f"{label}{price_part}"
-        rows.append([InlineKeyboardButton(text=label, callback_data=f"renew:pick:{client_id}")])
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_back_to_menu), callback_data="menu")])
+    rows = _client_pick_rows(client_rows)
+    if include_bulk:
+        rows.append(list(_search_row()))
+        rows.append(list(_button_row("btn_renew_bulk", cb.RENEW_BULK.pack())))
+    rows.append(list(_button_row("btn_back_to_menu", cb.MENU.pack())))
     if include_cancel:
-        rows.append([InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")])
+        rows.append(list(_button_row("btn_cancel", cb.CANCEL.pack())))
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def tariffs_keyboard(
     tariffs: list[dict],
     include_back: bool = False,
-    back_callback: str = "cancel",
+    back_callback: str = cb.CANCEL.pack(),
     include_cancel: bool = True,
     label_mode: str = "traffic",
     top_button: tuple[str, str] | None = None,
@@ -211,30 +333,38 @@ def tariffs_keyboard(
             traffic_gb = (tariff.get("remnawave") or {}).get("traffic_limit_gb")
             traffic = "безлимит" if not traffic_gb or traffic_gb <= 0 else f"{traffic_gb} ГБ"
             label = f"{name} — {traffic}"
-        rows.append([InlineKeyboardButton(text=label, callback_data=f"tariff:pick:{tariff['id']}")])
+        rows.append([InlineKeyboardButton(text=label, callback_data=cb.TARIFF_PICK.pack(tariff["id"]))])
     if include_back:
-        rows.append([InlineKeyboardButton(text=_t(settings.btn_back), callback_data=back_callback)])
+        rows.append(list(_button_row("btn_back", back_callback)))
     if include_cancel:
-        rows.append([InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")])
+        rows.append(list(_button_row("btn_cancel", cb.CANCEL.pack())))
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@_cached()
 def tariff_actions_keyboard() -> InlineKeyboardMarkup:
-    settings = get_settings()
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text=_t(settings.btn_tariff_back), callback_data="tariff:back")],
-            [InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")],
+            list(_button_row("btn_tariff_back", cb.TARIFF_BACK.pack())),
+            list(_button_row("btn_cancel", cb.CANCEL.pack())),
         ]
     )
 
 
 def amount_presets_keyboard(
-    prefix: str,
+    action: cb.CallbackAction,
     amounts: list[int],
-    back_callback: str = "tariff:back",
+    back_callback: str = cb.TARIFF_BACK.pack(),
+) -> InlineKeyboardMarkup:
+    return _amount_presets_keyboard(action, tuple(amounts), back_callback)
+
+
+@_cached(maxsize=256)
+def _amount_presets_keyboard(
+    action: cb.CallbackAction,
+    amounts: tuple[int, ...],
+    back_callback: str,
 ) -> InlineKeyboardMarkup:
-    settings = get_settings()
     rows = []
     for i in range(0, len(amounts), 2):
         row = []
@@ -242,72 +372,97 @@ def amount_presets_keyboard(
             row.append(
                 InlineKeyboardButton(
                     text=f"{value} ₽",
-                    callback_data=f"{prefix}:{value}",
+                    callback_data=action.pack(value),
                 )
             )
         rows.append(row)
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_tariff_back), callback_data=back_callback)])
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")])
+    rows.append(list(_button_row("btn_tariff_back", back_callback)))
+    rows.append(list(_button_row("btn_cancel", cb.CANCEL.pack())))
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@_cached(maxsize=256)
 def clients_list_pagination_keyboard(page: int, total_pages: int) -> InlineKeyboardMarkup:
-    settings = get_settings()
-    rows = []
-    nav = []
-    if page > 1:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_prev), callback_data=f"client:list:page:{page - 1}"))
-    if page < total_pages:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_next), callback_data=f"client:list:page:{page + 1}"))
-    if nav:
-        rows.append(nav)
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_back_to_menu), callback_data="menu")])
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+    return _paginated_keyboard(
+        [],
+        cb.CLIENT_LIST_PAGE,
+        page,
+        total_pages,
+        (_button_row("btn_back_to_menu", cb.MENU.pack()),),
+    )
 
 
 def agents_limit_keyboard(agent_rows: list[tuple[int, str, str]]) -> InlineKeyboardMarkup:
+    rows = _agent_limit_rows(agent_rows)
+    rows.append(list(_button_row("btn_owner_back", cb.OWNER_AGENTS.pack())))
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+@_cached(maxsize=256)
+def owner_report_pagination_keyboard(page: int, total_pages: int) -> InlineKeyboardMarkup:
+    return _paginated_keyboard(
+        [],
+        cb.OWNER_REPORT_PAGE,
+        page,
+        total_pages,
+        (_button_row("btn_owner_back", cb.OWNER_AGENTS.pack()),),
+    )
+
+
+REVENUE_PERIODS = ((1, "btn_revenue_day"), (7, "btn_revenue_week"), (30, "btn_revenue_month"))
+
+
+@_cached(maxsize=4)
+def owner_revenue_keyboard(days: int) -> InlineKeyboardMarkup:
+    settings = get_settings()
+    periods = []
+    for period_days, text_name in REVENUE_PERIODS:
+        text = _t(getattr(settings, text_name))
+        if period_days == days:
+            text = f"• {text} •"
+        periods.append(InlineKeyboardButton(text=text, callback_data=cb.OWNER_REVENUE.pack(period_days)))
+    return InlineKeyboardMarkup(
+        inline_keyboard=[periods, list(_button_row("btn_owner_back", cb.OWNER_AGENTS.pack()))]
+    )
+
+
+# Порядок совпадает с export_service.DATASETS и FORMATS: в callback уходят индексы.
+EXPORT_DATASET_BUTTONS = ("btn_export_clients", "btn_export_renewals", "btn_export_debts")
+EXPORT_FORMAT_LABELS = ("CSV", "XLSX")
+
+
+@_cached()
+def owner_export_keyboard() -> InlineKeyboardMarkup:
     settings = get_settings()
     rows = []
-    for agent_id, name, limit_label in agent_rows:
+    for dataset_index, text_name in enumerate(EXPORT_DATASET_BUTTONS):
+        name = _t(getattr(settings, text_name))
         rows.append(
             [
                 InlineKeyboardButton(
-                    text=_t(settings.text_agent_limit_button, name=name, limit=limit_label),
-                    callback_data=f"owner:limit:pick:{agent_id}",
+                    text=_t(settings.btn_export_item, name=name, format=label),
+                    callback_data=cb.OWNER_EXPORT.pack(dataset_index, format_index),
                 )
+                for format_index, label in enumerate(EXPORT_FORMAT_LABELS)
             ]
         )
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_owner_back), callback_data="owner:agents")])
-    return InlineKeyboardMarkup(inline_keyboard=rows)
-
-
-def owner_report_pagination_keyboard(page: int, total_pages: int) -> InlineKeyboardMarkup:
-    settings = get_settings()
-    rows = []
-    nav = []
-    if page > 1:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_prev), callback_data=f"owner:report:page:{page - 1}"))
-    if page < total_pages:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_next), callback_data=f"owner:report:page:{page + 1}"))
-    if nav:
-        rows.append(nav)
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_owner_back), callback_data="owner:agents")])
+    rows.append(list(_button_row("btn_owner_back", cb.OWNER_AGENTS.pack())))
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def delete_agents_keyboard(agent_rows: list[tuple[int, str]]) -> InlineKeyboardMarkup:
     rows = []
     for agent_id, name in agent_rows:
-        rows.append([InlineKeyboardButton(text=name, callback_data=f"owner:delete:agent:pick:{agent_id}")])
-    rows.append([InlineKeyboardButton(text=_t(get_settings().btn_owner_back), callback_data="owner:agents")])
+        rows.append([InlineKeyboardButton(text=name, callback_data=cb.OWNER_DELETE_AGENT_PICK.pack(agent_id))])
+    rows.append(list(_button_row("btn_owner_back", cb.OWNER_AGENTS.pack())))
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def delete_clients_keyboard(client_rows: list[tuple[int, str]]) -> InlineKeyboardMarkup:
     rows = []
     for client_id, label in client_rows:
-        rows.append([InlineKeyboardButton(text=label, callback_data=f"owner:delete:client:pick:{client_id}")])
-    rows.append([InlineKeyboardButton(text=_t(get_settings().btn_owner_back), callback_data="owner:agents")])
+        rows.append([InlineKeyboardButton(text=label, callback_data=cb.OWNER_DELETE_CLIENT_PICK.pack(client_id))])
+    rows.append(list(_button_row("btn_owner_back", cb.OWNER_AGENTS.pack())))
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
@@ -316,19 +471,16 @@ def delete_clients_pagination_keyboard(
     page: int,
     total_pages: int,
 ) -> InlineKeyboardMarkup:
-    settings = get_settings()
     rows = []
     for client_id, label in client_rows:
-        rows.append([InlineKeyboardButton(text=label, callback_data=f"owner:delete:client:pick:{client_id}")])
-    nav = []
-    if page > 1:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_prev), callback_data=f"owner:delete:client:page:{page - 1}"))
-    if page < total_pages:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_next), callback_data=f"owner:delete:client:page:{page + 1}"))
-    if nav:
-        rows.append(nav)
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_owner_back), callback_data="owner:agents")])
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+        rows.append([InlineKeyboardButton(text=label, callback_data=cb.OWNER_DELETE_CLIENT_PICK.pack(client_id))])
+    return _paginated_keyboard(
+        rows,
+        cb.OWNER_DELETE_CLIENT_PAGE,
+        page,
+        total_pages,
+        (_button_row("btn_owner_back", cb.OWNER_AGENTS.pack()),),
+    )
 
 
 def delete_agents_pagination_keyboard(
@@ -336,24 +488,19 @@ def delete_agents_pagination_keyboard(
     page: int,
     total_pages: int,
 ) -> InlineKeyboardMarkup:
-    settings = get_settings()
     rows = []
     for agent_id, name in agent_rows:
-        rows.append([InlineKeyboardButton(text=name, callback_data=f"owner:delete:agent:pick:{agent_id}")])
-    nav = []
-    if page > 1:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_prev), callback_data=f"owner:delete:agent:page:{page - 1}"))
-    if page < total_pages:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_next), callback_data=f"owner:delete:agent:page:{page + 1}"))
-    if nav:
-        rows.append(nav)
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_owner_back), callback_data="owner:agents")])
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+        rows.append([InlineKeyboardButton(text=name, callback_data=cb.OWNER_DELETE_AGENT_PICK.pack(agent_id))])
+    return _paginated_keyboard(
+        rows,
+        cb.OWNER_DELETE_AGENT_PAGE,
+        page,
+        total_pages,
+        (_button_row("btn_owner_back", cb.OWNER_AGENTS.pack()),),
+    )
 
 
-def agents_limit_pagination_keyboard(
-    agent_rows: list[tuple[int, str, str]], page: int, total_pages: int
-) -> InlineKeyboardMarkup:
+def _agent_limit_rows(agent_rows: list[tuple[int, str, str]]) -> list[list[InlineKeyboardButton]]:
     settings = get_settings()
     rows = []
     for agent_id, name, limit_label in agent_rows:
@@ -361,19 +508,23 @@ def agents_limit_pagination_keyboard(
             [
                 InlineKeyboardButton(
                     text=_t(settings.text_agent_limit_button, name=name, limit=limit_label),
-                    callback_data=f"owner:limit:pick:{agent_id}",
+                    callback_data=cb.OWNER_LIMIT_PICK.pack(agent_id),
                 )
             ]
         )
-    nav = []
-    if page > 1:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_prev), callback_data=f"owner:limit:page:{page - 1}"))
-    if page < total_pages:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_next), callback_data=f"owner:limit:page:{page + 1}"))
-    if nav:
-        rows.append(nav)
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_owner_back), callback_data="owner:agents")])
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+    return rows
+
+
+def agents_limit_pagination_keyboard(
+    agent_rows: list[tuple[int, str, str]], page: int, total_pages: int
+) -> InlineKeyboardMarkup:
+    return _paginated_keyboard(
+        _agent_limit_rows(agent_rows),
+        cb.OWNER_LIMIT_PAGE,
+        page,
+        total_pages,
+        (_button_row("btn_owner_back", cb.OWNER_AGENTS.pack()),),
+    )
 
 
 def renew_clients_keyboard(
@@ -381,28 +532,55 @@ def renew_clients_keyboard(
     page: int,
     total_pages: int,
     include_cancel: bool = False,
+    include_bulk: bool = False,
 ) -> InlineKeyboardMarkup:
     """
     client_rows: list of (client_id, username, monthly_price)
     """
-    settings = get_settings()
-    rows = []
-    for client_id, username, price in client_rows:
-        label = username or f"client-{client_id}"
-        price_part = f" · {price}₽" if price else ""
-        label = f"{label}{price_part}"
-        rows.append([InlineKeyboardButton(text=label, callback_data=f"renew:pick:{client_id}")])
-    nav = []
-    if page > 1:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_prev), callback_data=f"renew:list:page:{page - 1}"))
-    if page < total_pages:
-        nav.append(InlineKeyboardButton(text=_t(settings.btn_next), callback_data=f"renew:list:page:{page + 1}"))
-    if nav:
-        rows.append(nav)
-    rows.append([InlineKeyboardButton(text=_t(settings.btn_back_to_menu), callback_data="menu")])
+    tail_rows = (_button_row("btn_back_to_menu", cb.MENU.pack()),)
+    if include_bulk:
+        tail_rows = (_search_row(), _button_row("btn_renew_bulk", cb.RENEW_BULK.pack())) + tail_rows
     if include_cancel:
-        rows.append([InlineKeyboardButton(text=_t(settings.btn_cancel), callback_data="cancel")])
-    return InlineKeyboardMarkup(inline_keyboard=rows)
+        tail_rows += (_button_row("btn_cancel", cb.CANCEL.pack()),)
+    return _paginated_keyboard(
+        _client_pick_rows(client_rows),
+        cb.RENEW_LIST_PAGE,
+        page,
+        total_pages,
+        tail_rows,
+    )
+
+
+def renew_bulk_keyboard(
+    client_rows: list[tuple[int, str, bool]],
+    page: int,
+    total_pages: int,
+    selected_count: int,
+) -> InlineKeyboardMarkup:
+    """
+    client_rows: list of (client_id, label, selected)
+    """
+    settings = get_settings()
+    item_rows = [
+        [
+            InlineKeyboardButton(
+                text=_t(settings.btn_renew_bulk_item_on if selected else settings.btn_renew_bulk_item_off, label=label),
+                callback_data=cb.RENEW_BULK_TOGGLE.pack(client_id, page),
+            )
+        ]
+        for client_id, label, selected in client_rows
+    ]
+    tail_rows = (
+        (InlineKeyboardButton(text=_t(settings.btn_renew_bulk_page_all), callback_data=cb.RENEW_BULK_ALL.pack(page)),),
+        (
+            InlineKeyboardButton(
+                text=_t(settings.btn_renew_bulk_next, count=selected_count),
+                callback_data=cb.RENEW_BULK_NEXT.pack(),
+            ),
+        ),
+        _button_row("btn_cancel", cb.CANCEL.pack()),
+    )
+    return _paginated_keyboard(item_rows, cb.RENEW_BULK_PAGE, page, total_pages, tail_rows)
 
 
 def transfer_confirm_keyboard(request_id: int) -> InlineKeyboardMarkup:
@@ -412,11 +590,11 @@ def transfer_confirm_keyboard(request_id: int) -> InlineKeyboardMarkup:
             [
                 InlineKeyboardButton(
                     text=_t(settings.btn_transfer_confirm),
-                    callback_data=f"transfer:confirm:{request_id}",
+                    callback_data=cb.TRANSFER_CONFIRM.pack(request_id),
                 ),
                 InlineKeyboardButton(
                     text=_t(settings.btn_transfer_reject),
-                    callback_data=f"transfer:reject:{request_id}",
+                    callback_data=cb.TRANSFER_REJECT.pack(request_id),
                 ),
             ]
         ]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject, Update
+
+from app import metrics
+from app.config import get_settings
+from app.db.query_stats import track_queries
+from app.services import profiling_service
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Внешний middleware апдейтов: число, ошибки и длительность обработки по типу апдейта."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        handled = "false"
+        metrics.UPDATES_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+            handled = "false" if result is UNHANDLED else "true"
+            return result
+        except Exception:
+            handled = "error"
+            metrics.UPDATE_ERRORS.labels(update_type).inc()
+            raise
+        finally:
+            metrics.UPDATES_IN_FLIGHT.dec()
+            metrics.UPDATE_DURATION.labels(update_type).observe(time.perf_counter() - started)
+            metrics.UPDATES_TOTAL.labels(update_type, handled).inc()
+
+
+class QueryStatsMiddleware(BaseMiddleware):
+    """Считает SQL-запросы и время БД на апдейт; тяжёлые апдейты пишет в лог с формами запросов."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        with track_queries() as stats:
+            try:
+                return await handler(event, data)
+            finally:
+                metrics.UPDATE_SQL_QUERIES.labels(update_type).observe(stats.count)
+                metrics.UPDATE_SQL_SECONDS.labels(update_type).observe(stats.seconds)
+                self._log_heavy(event, update_type, stats)
+
+    @staticmethod
+    def _log_heavy(event: TelegramObject, update_type: str, stats) -> None:
+        settings = get_settings()
+        if not settings.sql_log_threshold or stats.count <= settings.sql_log_threshold:
+            return
+        repeated = dict(stats.repeated(settings.sql_repeat_threshold))
+        lines = [
+            f"  {count}x{' [N+1?]' if key in repeated else ''} {key}"
+            for key, count in stats.fingerprints.most_common(10)
+        ]
+        logging.warning(
+            "Update %s (%s): %s SQL queries, %.1f ms in DB\n%s",
+            getattr(event, "update_id", "?"),
+            _describe(event, update_type),
+            stats.count,
+            stats.seconds * 1000,
+            "\n".join(lines),
+        )
+
+
+def _describe(event: TelegramObject, update_type: str) -> str:
+    inner = getattr(event, update_type, None)
+    if update_type == "callback_query" and inner is not None:
+        return f"callback {inner.data}"
+    if update_type == "message" and inner is not None and inner.text and inner.text.startswith("/"):
+        return f"command {inner.text.split()[0]}"
+    return update_type
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """Отмечает начало и конец апдейтов для профиля «следующие N апдейтов» (/profile updates)."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not profiling_service.on_update_start():
+            return await handler(event, data)
+        try:
+            return await handler(event, data)
+        finally:
+            profiling_service.on_update_end()
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: вызовы Bot API, их задержка и число ожидающих ответа."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot,
+        method: TelegramMethod,
+    ):
+        name = type(method).__name__
+        metrics.TELEGRAM_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            response = await make_request(bot, method)
+        except Exception as exc:
+            metrics.TELEGRAM_REQUESTS.labels(name, type(exc).__name__).inc()
+            raise
+        finally:
+            metrics.TELEGRAM_IN_FLIGHT.dec()
+            metrics.TELEGRAM_DURATION.labels(name).observe(time.perf_counter() - started)
+        metrics.TELEGRAM_REQUESTS.labels(name, "ok").inc()
+        return response
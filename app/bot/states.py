@@ -9,6 +9,11 @@ class NewClientState(StatesGroup):
     waiting_confirm = State()
 
 
+class ImportState(StatesGroup):
+    waiting_file = State()
+    waiting_confirm = State()
+
+
 class RenewState(StatesGroup):
     waiting_username = State()
     waiting_days = State()
@@ -17,6 +22,11 @@ class RenewState(StatesGroup):
     waiting_confirm = State()
 
 
+class BulkRenewState(StatesGroup):
+    selecting = State()
+    waiting_confirm = State()
+
+
 class PayDebtState(StatesGroup):
     waiting_amount = State()
 
@@ -29,6 +39,10 @@ class LimitAgentState(StatesGroup):
     waiting_limit = State()
 
 
+class CompensationState(StatesGroup):
+    waiting_confirm = State()
+
+
 class DeleteClientState(StatesGroup):
     waiting_username = State()
     confirm = State()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import json
+import logging
 from functools import lru_cache
 from typing import Optional
 
@@ -25,8 +27,33 @@ class Settings(BaseSettings):
     remnawave_traffic_limit_gb: int = 0
     remnawave_traffic_reset_strategy: str = "MONTH"
     remnawave_hwid_device_limit: int = 0
+    remnawave_timeout_seconds: float = 10.0
+    remnawave_retry_attempts: int = 3
+    remnawave_retry_base_delay: float = 0.3
+    remnawave_retry_max_delay: float = 3.0
+    remnawave_breaker_failure_threshold: int = 5
+    remnawave_breaker_reset_seconds: float = 30.0
+    remnawave_lookup_cache_ttl_seconds: float = 5.0
+    remnawave_lookup_negative_ttl_seconds: float = 3.0
+    remnawave_lookup_cache_size: int = 1024
 
     log_level: str = "INFO"
+    texts_file: Optional[str] = None
+    metrics_host: str = "0.0.0.0"
+    metrics_port: int = 0
+    sql_log_threshold: int = 20
+    sql_repeat_threshold: int = 5
+    profiling_enabled: bool = False
+    profiling_max_seconds: int = 120
+    profiling_sample_interval_ms: int = 10
+    profiling_max_updates: int = 500
+    loop_monitor_interval_ms: int = 100
+    loop_stall_threshold_ms: int = 500
+    log_payload_level: str = "DEBUG"
+    log_payload_sample_rate: float = 1.0
+    log_sample_rates: Optional[str] = None
+    log_payload_max_chars: int = 500
+    log_payload_max_items: int = 20
 
     default_renew_days: int = 30
     default_credit_limit: int = 0
@@ -34,6 +61,32 @@ class Settings(BaseSettings):
     sync_interval_seconds: int = 300
     expiry_notify_days: int = 3
     expiry_notify_interval_seconds: int = 3600
+    agent_stats_check_interval_seconds: int = 3600
+    export_chunk_size: int = 1000
+    progress_edit_interval_seconds: float = 2.0
+    import_max_rows: int = 1000
+    import_max_file_kb: int = 512
+    import_concurrency: int = 8
+    import_batch_size: int = 50
+    bulk_renew_max_clients: int = 100
+    bulk_renew_concurrency: int = 4
+    compensation_concurrency: int = 4
+    compensation_rate_per_second: float = 10.0
+    compensation_chunk_size: int = 100
+    client_search_limit: int = 10
+    client_search_cache_rows: int = 200
+    client_search_cache_ttl_seconds: float = 30.0
+    client_search_cache_size: int = 256
+    inline_search_page_size: int = 20
+    inline_search_cache_time: int = 10
+    page_cache_size: int = 512
+    page_prefetch_enabled: bool = True
+    job_worker_concurrency: int = 4
+    job_poll_interval_seconds: float = 1.0
+    job_max_attempts: int = 5
+    job_retry_base_seconds: int = 5
+    job_retry_max_seconds: int = 300
+    job_lock_timeout_seconds: int = 600
     base_subscription_price: int = 200
     tariff_1_name: Optional[str] = None
     tariff_1_base_price: Optional[str] = None
@@ -121,14 +174,46 @@ class Settings(BaseSettings):
     text_amount_invalid: str = "❌ Введи число"
     text_amount_positive: str = "❌ Сумма должна быть больше нуля"
     text_amount_choose_hint: str = "⬇️ Выбери сумму или введи свою в чат"
+    text_confirm_expired: str = "Подтверждение устарело — начни заново из меню"
 
     # ─── Клиенты ──────────────────────────────────────────────────
     text_clients_none: str = "📭 Клиентов пока нет"
     text_client_not_found_alert: str = "Клиент не найден"
     text_client_not_found: str = "❌ Клиент не найден"
+    text_client_search_results: str = "🔎 Точного совпадения нет. Похожие клиенты: {count}"
+    text_inline_client_description: str = "⏳ {days_left} · 💰 {price} · 📦 {tariff}"
+    text_inline_client_agent: str = "👤 {agent}"
     text_client_exists: str = "ℹ️ Клиент уже есть — используй <b>Продлить</b>"
     text_username_taken_panel: str = "❌ Имя <code>{username}</code> уже занято в панели. Введи другое."
 
+    # ─── Импорт клиентов ──────────────────────────────────────────
+    text_import_prompt: str = (
+        "📥 <b>Импорт клиентов</b>\\n\\n"
+        "Пришли CSV-файл, по клиенту в строке:\\n"
+        "<code>username,days,price,telegram_id,tariff</code>\\n\\n"
+        "<i>days — срок в днях, price — цена клиента за месяц;\\n"
+        "telegram_id и tariff можно не указывать. До {max_rows} строк</i>"
+    )
+    text_import_not_file: str = "📎 Пришли CSV-файл документом"
+    text_import_too_large: str = "❌ Файл больше {max_kb} КБ"
+    text_import_invalid: str = "❌ <b>Файл не принят</b>\\n\\n{errors}"
+    text_import_checking: str = "⏳ Проверяю {count} username в панели…"
+    text_import_nothing: str = "ℹ️ Все username из файла уже заняты{taken_list}"
+    text_import_preview: str = (
+        "📥 <b>Проверка импорта</b>\\n\\n"
+        "👥 К подключению: <b>{count}</b>\\n"
+        "🚫 Уже заняты: <b>{taken}</b>{taken_list}\\n"
+        "💰 Сумма клиентов: <b>{amount_total} ₽</b>\\n"
+        "🏦 К оплате владельцу: <b>{owner_share} ₽</b>"
+    )
+    text_import_expired: str = "Импорт устарел — пришли файл заново"
+    text_import_busy: str = "Импорт уже идёт"
+    text_import_progress: str = "⏳ Импорт: {done} из {total}"
+    text_import_done: str = "✅ <b>Импорт завершён</b>\\n\\nПодключено: <b>{created}</b> · заняты: <b>{taken}</b> · ошибки: <b>{failed}</b>"
+    text_import_taken_header: str = "🚫 <b>Заняты в панели:</b>"
+    text_import_failed_header: str = "❌ <b>Ошибки:</b>"
+    text_import_unsaved_header: str = "⚠️ <b>Созданы в панели, но не сохранены</b> — передай список владельцу:"
+
     # ─── Продление ────────────────────────────────────────────────
     renew_min_days_left: int = 10
     text_renew_pick_prompt_owner: str = "🔄 <b>Продление подписки</b>\\n\\nВыбери клиента или введи username:"
@@ -187,6 +272,30 @@ class Settings(BaseSettings):
     text_days_positive: str = "❌ Дней должно быть больше нуля"
     text_page_invalid: str = "Неверная страница"
     text_renew_amount_prompt: str = "💵 <b>Цена продления</b>\\n\\n<i>Сколько берёшь с клиента?</i>"
+    text_renew_bulk_prompt: str = (
+        "☑️ <b>Продление нескольких клиентов</b>\\n\\n"
+        "Отметь клиентов — тариф и цена останутся прежними.\\n"
+        "<i>В списке те, у кого осталось не больше {min_days} дн. Выбрано: {count}</i>"
+    )
+    text_renew_bulk_empty: str = "📭 Сейчас некого продлевать"
+    text_renew_bulk_none_selected: str = "Отметь хотя бы одного клиента"
+    text_renew_bulk_too_many: str = "За раз можно продлить не больше {max_clients} клиентов"
+    text_renew_bulk_days_prompt: str = "📅 <b>Срок продления</b>\\n\\nВыбрано клиентов: <b>{count}</b>"
+    text_renew_bulk_preview: str = (
+        "✅ <b>Подтверждение продления</b>\\n\\n"
+        "👥 Клиентов: <b>{count}</b>\\n"
+        "📅 Срок: <b>{days} дн.</b>\\n"
+        "💰 Сумма клиентов: <b>{amount_total} ₽</b>\\n"
+        "🏦 К оплате владельцу: <b>{owner_share} ₽</b>\\n"
+        "💎 Доход агента: <b>{profit} ₽</b>"
+    )
+    text_renew_bulk_busy: str = "Продление уже идёт"
+    text_renew_bulk_progress: str = "⏳ Продление: {done} из {total}"
+    text_renew_bulk_done: str = "✅ <b>Продление завершено</b>\\n\\nПродлено: <b>{renewed}</b> · ошибки: <b>{failed}</b>"
+    text_renew_bulk_failed_header: str = "❌ <b>Не продлены:</b>"
+    text_renew_bulk_unrecorded_header: str = (
+        "⚠️ <b>Продлены в панели, но не записаны</b> — не продлевай их повторно, долг нужно внести вручную:"
+    )
     text_agent_blocked: str = "⛔ Аккаунт заблокирован"
     text_target_agent_not_found: str = "❌ Агент не найден"
     text_target_agent_blocked: str = "⛔ Агент заблокирован"
@@ -203,6 +312,8 @@ class Settings(BaseSettings):
     text_create_success: str = "✅ <b>Клиент подключён</b>\\n\\n👤 <code>{username}</code> · {days} дней\\n\\n💰 Заработок: <b>{profit} ₽</b>\\n<i>{amount} ₽ − {base_price} ₽ владельцу</i>\\n\\n📊 К оплате: <b>{payable} ₽</b>"
     text_subscription_link: str = "🔗 <b>Ссылка для клиента:</b>\\n<code>{link}</code>"
 
+    text_job_queued: str = "⏳ <b>Заявка принята</b>\\n\\nВыполняю в панели, результат появится здесь."
+    text_job_update_done: str = "✅ Данные клиента <code>{username}</code> обновлены в панели"
     text_renew_error: str = "❌ <b>Ошибка продления</b>\\n\\n<i>{error!r}</i>"
     text_renew_success: str = "✅ <b>Подписка продлена</b>\\n\\n📅 +{days} дней\\n\\n💰 Заработок: <b>{profit} ₽</b>\\n<i>{amount} ₽ − {owner_share} ₽ владельцу</i>\\n\\n📊 К оплате: <b>{payable} ₽</b>"
     text_subscription_expiring: str = (
@@ -294,6 +405,21 @@ class Settings(BaseSettings):
     text_owner_sync_done: str = "✅ <b>Синхронизация завершена</b>\\n\\nУдалено: {removed}\\nОбновлено: {updated}"
     text_owner_refresh_agents_start: str = "🧹 Обновляю профили агентов..."
     text_owner_refresh_agents_done: str = "✅ Профили агентов обновлены: <b>{updated}</b> из <b>{total}</b>"
+    text_owner_reload_texts_done: str = "✅ Тексты перезагружены: <b>{count}</b>\\nОшибок: <b>{errors}</b>"
+    text_profile_usage: str = (
+        "🔬 <b>Профилирование</b>\\n\\n"
+        "<code>/profile sample 30</code> — сэмплы стека за N секунд\\n"
+        "<code>/profile updates 50</code> — cProfile следующих N апдейтов\\n"
+        "<code>/profile sync</code> — cProfile следующего цикла синхронизации\\n"
+        "<code>/profile stop</code> — отменить"
+    )
+    text_profile_disabled: str = "🔬 Профилирование выключено (PROFILING_ENABLED)"
+    text_profile_busy: str = "⏳ Уже идёт профилирование: {mode}"
+    text_profile_started_sample: str = "🔬 Снимаю стек {seconds} с, файл придёт сюда"
+    text_profile_started_updates: str = "🔬 Профилирую следующие {count} апдейтов, файл придёт сюда"
+    text_profile_started_sync: str = "🔬 Профилирую следующий цикл синхронизации, файл придёт сюда"
+    text_profile_stopped: str = "⏹ Профилирование отменено"
+    text_profile_none: str = "Профилирование не запущено"
     text_owner_report_no_agents: str = "📭 Агентов пока нет"
     text_owner_report_header: str = "📊 <b>Отчёт по агентам</b>"
     text_owner_report_summary: str = (
@@ -306,6 +432,60 @@ class Settings(BaseSettings):
         "  🧾 Лимит: <b>{limit}</b> · 👥 Клиентов: <b>{clients}</b>\\n"
         "  🆔 {id}"
     )
+    text_owner_revenue_header: str = "📈 <b>Выручка: {period}</b>"
+    text_owner_revenue_summary: str = (
+        "Продлений: <b>{renewals}</b> · новых клиентов: <b>{new_clients}</b>\\n"
+        "Выручка: <b>{revenue} ₽</b>\\n"
+        "Доля владельца: <b>{owner_share} ₽</b> · прибыль агентов: <b>{profit} ₽</b>"
+    )
+    text_owner_revenue_agents_header: str = "<b>Агенты</b>"
+    text_owner_revenue_agent_line: str = "▸ {name}: <b>{revenue} ₽</b> · владельцу {owner_share} ₽ · {renewals} прод."
+    text_owner_revenue_tariffs_header: str = "<b>Тарифы</b>"
+    text_owner_revenue_tariff_line: str = "📦 {name}: <b>{revenue} ₽</b> · {renewals} прод."
+    text_owner_revenue_period_day: str = "сегодня"
+    text_owner_revenue_period_week: str = "7 дней"
+    text_owner_revenue_period_month: str = "30 дней"
+    text_revenue_backfill_done: str = "📈 Сводка выручки пересобрана: {rows} строк"
+    text_export_menu: str = "📤 <b>Выгрузка</b>\\n\\nВыбери данные и формат файла"
+    text_export_preparing: str = "⏳ Готовлю выгрузку…"
+    text_export_done: str = "📤 {dataset}: {rows} строк"
+    text_export_failed: str = "❌ Выгрузка не удалась: <i>{error}</i>"
+
+    # ─── Компенсация ──────────────────────────────────────────────
+    text_compensation_usage: str = (
+        "🎁 <b>Компенсация</b>\\n\\n"
+        "<code>/compensate ДНИ [agent=ID|@username] [tariff=Название] [from=ГГГГ-ММ-ДД] [to=ГГГГ-ММ-ДД]</code>\\n\\n"
+        "<i>Продлевает подходящих клиентов без начисления долга.\\n"
+        "/compensate status — ход, /compensate stop — остановить</i>"
+    )
+    text_compensation_invalid: str = "❌ Не понял параметр: <code>{arg}</code>"
+    text_compensation_filter_all: str = "все клиенты"
+    text_compensation_filter_agent: str = "агент {agent}"
+    text_compensation_filter_tariff: str = "тариф {tariff}"
+    text_compensation_filter_from: str = "срок с {date}"
+    text_compensation_filter_to: str = "срок по {date}"
+    text_compensation_empty: str = "📭 Под отбор ({filters}) не попал ни один клиент"
+    text_compensation_preview: str = (
+        "🎁 <b>Подтверждение компенсации</b>\\n\\n"
+        "🔎 Отбор: {filters}\\n"
+        "👥 Клиентов: <b>{count}</b>\\n"
+        "📅 Добавить: <b>{days} дн.</b>\\n\\n"
+        "<i>Долг агентам не начисляется</i>"
+    )
+    text_compensation_expired: str = "Компенсация устарела — отправь команду заново"
+    text_compensation_busy: str = "Компенсация уже идёт — /compensate status"
+    text_compensation_progress: str = "⏳ Компенсация +{days} дн.: {done} из {total} · ошибки: {failed}"
+    text_compensation_done: str = (
+        "✅ <b>Компенсация завершена</b>\\n\\n"
+        "Продлено на {days} дн.: <b>{extended}</b> · ошибки: <b>{failed}</b>"
+    )
+    text_compensation_cancelled: str = (
+        "⏹ <b>Компенсация остановлена</b>\\n\\n"
+        "Продлено на {days} дн.: <b>{extended}</b> из {total} · ошибки: <b>{failed}</b>"
+    )
+    text_compensation_failed_header: str = "❌ <b>Не продлены:</b>"
+    text_compensation_none: str = "Нет идущих компенсаций"
+    text_compensation_stopped: str = "⏹ Остановлено компенсаций: {count}"
 
     # ─── Общие ────────────────────────────────────────────────────
     text_cancelled: str = "👌 Отменено"
@@ -348,6 +528,15 @@ class Settings(BaseSettings):
     btn_owner_add_agent: str = "➕ Добавить агента"
     btn_owner_limit: str = "💳 Лимиты агентов"
     btn_owner_report: str = "📊 Отчёт по агентам"
+    btn_owner_revenue: str = "📈 Выручка"
+    btn_revenue_day: str = "День"
+    btn_revenue_week: str = "Неделя"
+    btn_revenue_month: str = "Месяц"
+    btn_owner_export: str = "📤 Выгрузка"
+    btn_export_clients: str = "Клиенты"
+    btn_export_renewals: str = "Продления"
+    btn_export_debts: str = "Долги"
+    btn_export_item: str = "{name} · {format}"
     btn_owner_sync: str = "🔄 Синхронизация"
     btn_owner_refresh_agents: str = "🧹 Обновить профили"
     btn_owner_notify_preview: str = "👀 Кто получит уведомления"
@@ -363,8 +552,17 @@ class Settings(BaseSettings):
     btn_renew_same: str = "✅ Продлить как есть"
     btn_renew_confirm: str = "✅ Подтвердить"
     btn_renew_edit_amount: str = "← Изменить цену"
+    btn_renew_bulk: str = "☑️ Продлить несколько"
+    btn_client_search: str = "🔎 Найти клиента"
+    btn_renew_bulk_item_on: str = "✅ {label}"
+    btn_renew_bulk_item_off: str = "▫️ {label}"
+    btn_renew_bulk_page_all: str = "☑️ Вся страница"
+    btn_renew_bulk_next: str = "Далее · {count}"
+    btn_renew_bulk_confirm: str = "✅ Продлить всех"
     btn_new_client_confirm: str = "✅ Подтвердить"
     btn_new_client_edit_amount: str = "← Изменить цену"
+    btn_import_confirm: str = "✅ Импортировать"
+    btn_compensation_confirm: str = "🎁 Начать компенсацию"
     btn_amount_custom: str = "✍️ Своя сумма"
     btn_back: str = "← Назад"
     btn_cancel: str = "✕ Отмена"
@@ -477,6 +675,17 @@ class Settings(BaseSettings):
             return []
         return [value.strip() for value in self.remnawave_internal_squads.split(",") if value.strip()]
 
+    @property
+    def log_sample_rate_map(self) -> dict[str, float]:
+        rates: dict[str, float] = {}
+        for item in (self.log_sample_rates or "").split(","):
+            name, _, value = item.partition("=")
+            try:
+                rates[name.strip()] = float(value)
+            except ValueError:
+                continue
+        return rates
+
     @property
     def admin_id_set(self) -> set[int]:
         if not self.admin_ids:
@@ -484,6 +693,31 @@ class Settings(BaseSettings):
         return {int(value.strip()) for value in self.admin_ids.split(",") if value.strip()}
 
 
+def _read_texts_file(path: str) -> dict[str, str]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            raw = json.load(fh)
+    except (OSError, ValueError) as exc:
+        logging.error("TEXTS_FILE %s not loaded: %s", path, exc)
+        return {}
+    if not isinstance(raw, dict):
+        logging.error("TEXTS_FILE %s ignored: expected JSON object", path)
+        return {}
+    overrides: dict[str, str] = {}
+    for key, value in raw.items():
+        name = str(key).strip().lower()
+        if not name.startswith(("text_", "btn_")) or name not in Settings.model_fields:
+            continue
+        if isinstance(value, str):
+            overrides[name] = value
+    return overrides
+
+
 @lru_cache
 def get_settings() -> Settings:
-    return Settings()
+    settings = Settings()
+    if settings.texts_file:
+        overrides = _read_texts_file(settings.texts_file)
+        if overrides:
+            settings = settings.model_copy(update=overrides)
+    return settings
@@ -30,12 +30,21 @@ async def init_db(engine: AsyncEngine) -> None:
             await conn.execute(
                 text("ALTER TABLE clients ADD COLUMN IF NOT EXISTS expires_notified_for TIMESTAMP")
             )
+            await conn.execute(
+                text("ALTER TABLE clients ADD COLUMN IF NOT EXISTS remnawave_uuid VARCHAR(36)")
+            )
+            await conn.execute(
+                text("ALTER TABLE clients ADD COLUMN IF NOT EXISTS remnawave_expires_at TIMESTAMP")
+            )
         except Exception:
             pass
         try:
             await conn.execute(
                 text("ALTER TABLE renewals ADD COLUMN IF NOT EXISTS payment_amount INTEGER DEFAULT 0")
             )
+            await conn.execute(
+                text("ALTER TABLE renewals ADD COLUMN IF NOT EXISTS tariff_name VARCHAR(128)")
+            )
         except Exception:
             pass
         try:
@@ -49,4 +58,10 @@ async def init_db(engine: AsyncEngine) -> None:
                 text("ALTER TABLE agents ADD COLUMN IF NOT EXISTS telegram_username VARCHAR(64)")
             )
         except Exception:
-            pass
\ No newline at end of file
+            pass
+        try:
+            await conn.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_clients_agent_username ON clients (agent_id, username)")
+            )
+        except Exception:
+            pass
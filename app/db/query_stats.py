@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"(?:\$\d+|%\(\w+\)s|%s|:\w+|\?)")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Запрос без литералов и параметров: одинаковые по форме запросы дают одну строку."""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PARAM.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(...)", normalized)
+    return _SPACES.sub(" ", normalized).strip()[:300]
+
+
+@dataclass
+class QueryStats:
+    """Запросы в рамках одного апдейта (или другого блока ``track_queries``)."""
+
+    count: int = 0
+    seconds: float = 0.0
+    fingerprints: Counter[str] = field(default_factory=Counter)
+    parent: QueryStats | None = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        key = fingerprint(statement)
+        stats: QueryStats | None = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            stats.fingerprints[key] += 1
+            stats = stats.parent
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Запросы одной формы, выполненные ``threshold`` и более раз, — кандидаты в N+1."""
+        return [(key, count) for key, count in self.fingerprints.most_common() if count >= threshold]
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Считает запросы текущей задачи; вложенные блоки учитываются и во внешних."""
+    stats = QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def assert_query_budget(stats: QueryStats, budget: int, label: str = "") -> None:
+    if stats.count <= budget:
+        return
+    top = "\n".join(f"  {count}x {key}" for key, count in stats.fingerprints.most_common(5))
+    raise QueryBudgetExceeded(f"{label or 'block'}: {stats.count} queries > budget {budget}\n{top}")
+
+
+@contextmanager
+def query_budget(budget: int, label: str = "") -> Iterator[QueryStats]:
+    """Для тестов и бенчмарков: падает, если блок выполнил больше ``budget`` запросов."""
+    with track_queries() as stats:
+        yield stats
+    assert_query_budget(stats, budget, label)
+
+
+def instrument_query_stats(async_engine: AsyncEngine) -> None:
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info["query_started"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context) -> None:
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine, AsyncSession
 
+from app import metrics
 from app.config import get_settings
+from app.db.query_stats import instrument_query_stats
 
 
 def create_engine():
@@ -10,5 +13,25 @@ def create_engine():
     return create_async_engine(settings.database_url, pool_pre_ping=True)
 
 
+def instrument_engine(async_engine: AsyncEngine) -> None:
+    pool = async_engine.sync_engine.pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(*_args) -> None:
+        metrics.DB_CONNECTIONS.inc()
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(*_args) -> None:
+        metrics.DB_POOL_CHECKOUTS.inc()
+        metrics.DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(*_args) -> None:
+        metrics.DB_POOL_CHECKED_OUT.dec()
+
+    instrument_query_stats(async_engine)
+
+
 engine = create_engine()
+instrument_engine(engine)
 SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
@@ -0,0 +1,96 @@
+"""Сторож event loop.
+
+Весь бот живёт в одном asyncio loop: polling, хендлеры, синхронизация и
+уведомления. Любой синхронный участок (большой рендер списка, flush сотен
+строк ORM) задерживает всех остальных. Корутина-сторож раз в ``interval``
+меряет, насколько позже положенного она проснулась (лаг loop), а отдельный
+поток замечает, что loop не отвечает дольше ``stall_threshold``, и снимает
+стек основного потока прямо во время блокировки — по нему видно, кто виноват.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app import metrics
+
+
+def _task_label(task: asyncio.Task | None) -> str:
+    """Имя задачи для метки: фоновые циклы именованы, хендлеры апдейтов — нет."""
+    if task is None:
+        return "none"
+    name = task.get_name()
+    return "unnamed" if name.startswith("Task-") else name
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, stall_threshold: float, stack_limit: int = 40) -> None:
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stack_limit = stack_limit
+        self.heartbeat = time.monotonic()
+        self.stalls = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread_id: int | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        if self.stall_threshold > 0:
+            self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+            self._thread.start()
+        try:
+            while True:
+                before = self._loop.time()
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, self._loop.time() - before - self.interval)
+                metrics.LOOP_LAG.observe(lag)
+                self.heartbeat = time.monotonic()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _watch(self) -> None:
+        reported = None
+        period = min(self.interval, self.stall_threshold / 2)
+        while not self._stopped.wait(period):
+            beat = self.heartbeat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.stall_threshold or reported == beat:
+                continue
+            reported = beat
+            self._report_stall(blocked)
+
+    def _report_stall(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._thread_id)
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        label = _task_label(task)
+        self.stalls += 1
+        metrics.LOOP_STALLS.labels(label).inc()
+        stack = "".join(traceback.format_stack(frame, limit=-self.stack_limit)) if frame is not None else ""
+        del frame
+        logging.warning(
+            "Event loop blocked for %.0f ms (task %s)\n%s",
+            blocked * 1000,
+            task.get_name() if task is not None else label,
+            stack,
+        )
+
+
+def start_loop_monitor(interval: float, stall_threshold: float) -> LoopMonitor:
+    monitor = LoopMonitor(interval, stall_threshold)
+    asyncio.create_task(monitor.run(), name="loop-monitor")
+    return monitor
@@ -0,0 +1,327 @@
+"""Метрики процесса в текстовом формате Prometheus.
+
+Небольшой реестр без внешних зависимостей: счётчики, gauge и гистограммы с
+метками, плюс коллекторы, которые снимают значения в момент запроса /metrics
+(состояние предохранителей, кеш поиска панели).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Sequence
+
+from app.remnawave.breaker import breaker_metrics
+from app.remnawave.lookup_cache import lookup_cache_metrics
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LONG_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {key}")
+        child = self._children.get(key)
+        if child is None:
+            child = self._new_child()
+            self._children[key] = child
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Iterable[_Metric]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[_Metric]]) -> None:
+        """Коллектор вызывается при каждом рендере и возвращает свежие метрики."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        blocks = [metric.render() for metric in self._metrics.values()]
+        for collector in self._collectors:
+            try:
+                blocks.extend(metric.render() for metric in collector())
+            except Exception:
+                logging.exception("Metrics collector %s failed", collector)
+        return "\n".join(blocks) + "\n"
+
+
+registry = MetricsRegistry()
+
+# ─── Telegram ─────────────────────────────────────────────────────
+UPDATES_TOTAL = registry.counter(
+    "agenthub_updates_total", "Telegram updates processed by the dispatcher", ("type", "handled")
+)
+UPDATE_ERRORS = registry.counter("agenthub_update_errors_total", "Updates whose handler raised", ("type",))
+UPDATE_DURATION = registry.histogram(
+    "agenthub_update_duration_seconds", "Time spent handling one update", ("type",)
+)
+UPDATES_IN_FLIGHT = registry.gauge("agenthub_updates_in_flight", "Updates being handled right now")
+TELEGRAM_REQUESTS = registry.counter(
+    "agenthub_telegram_requests_total", "Bot API calls", ("method", "result")
+)
+TELEGRAM_DURATION = registry.histogram(
+    "agenthub_telegram_request_duration_seconds", "Bot API call latency", ("method",)
+)
+TELEGRAM_IN_FLIGHT = registry.gauge(
+    "agenthub_telegram_requests_in_flight", "Bot API calls waiting for a response (send queue depth)"
+)
+
+# ─── Remnawave ────────────────────────────────────────────────────
+REMNAWAVE_REQUESTS = registry.counter(
+    "agenthub_remnawave_requests_total", "Requests sent to the Remnawave panel", ("method", "route", "status")
+)
+REMNAWAVE_DURATION = registry.histogram(
+    "agenthub_remnawave_request_duration_seconds", "Remnawave request latency", ("method", "route")
+)
+
+# ─── Фоновые задачи ───────────────────────────────────────────────
+SYNC_RUNS = registry.counter("agenthub_sync_runs_total", "Panel sync cycles", ("result",))
+SYNC_DURATION = registry.histogram(
+    "agenthub_sync_duration_seconds", "Panel sync cycle duration", buckets=LONG_BUCKETS
+)
+SYNC_ROWS = registry.counter("agenthub_sync_rows_total", "Client rows changed by sync", ("change",))
+NOTIFY_RUNS = registry.counter("agenthub_notify_runs_total", "Expiry notification cycles", ("result",))
+NOTIFY_DURATION = registry.histogram(
+    "agenthub_notify_duration_seconds", "Expiry notification cycle duration", buckets=LONG_BUCKETS
+)
+NOTIFICATIONS = registry.counter(
+    "agenthub_notifications_total", "Expiry notifications to agents", ("result",)
+)
+
+# ─── База ─────────────────────────────────────────────────────────
+DB_CONNECTIONS = registry.counter("agenthub_db_connections_total", "New DB connections opened by the pool")
+DB_POOL_CHECKOUTS = registry.counter("agenthub_db_pool_checkouts_total", "Connections checked out of the pool")
+DB_POOL_CHECKED_OUT = registry.gauge("agenthub_db_pool_checked_out", "Connections currently checked out")
+UPDATE_SQL_QUERIES = registry.histogram(
+    "agenthub_update_sql_queries",
+    "SQL statements per Telegram update",
+    ("type",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250),
+)
+UPDATE_SQL_SECONDS = registry.histogram(
+    "agenthub_update_sql_seconds", "Total DB time per Telegram update", ("type",)
+)
+AGENT_STATS_FIXED = registry.counter(
+    "agenthub_agent_stats_fixed_total", "Agent stats rows created or corrected by the consistency check"
+)
+
+# ─── Event loop ───────────────────────────────────────────────────
+LOOP_LAG = registry.histogram(
+    "agenthub_event_loop_lag_seconds",
+    "How late the loop watchdog woke up; high values mean something blocked the loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = registry.counter(
+    "agenthub_event_loop_stalls_total", "Loop blocked longer than the stall threshold", ("task",)
+)
+
+
+def _remnawave_collector() -> Iterable[_Metric]:
+    state = Gauge("agenthub_remnawave_breaker_state", "Breaker state: 0 closed, 1 half-open, 2 open", ("name",))
+    rejected = Counter("agenthub_remnawave_breaker_rejected_total", "Requests rejected by open breaker", ("name",))
+    opened = Counter("agenthub_remnawave_breaker_opened_total", "Times the breaker opened", ("name",))
+    failures = Counter("agenthub_remnawave_breaker_failures_total", "Failures seen by the breaker", ("name",))
+    for item in breaker_metrics():
+        state.labels(item["name"]).set(item["state_value"])
+        rejected.labels(item["name"]).inc(item["rejected_total"])
+        opened.labels(item["name"]).inc(item["opened_total"])
+        failures.labels(item["name"]).inc(item["failures_total"])
+    lookups = Counter(
+        "agenthub_remnawave_lookup_cache_total", "Panel lookup cache outcomes", ("name", "outcome")
+    )
+    for name, item in lookup_cache_metrics().items():
+        for outcome in ("hits", "misses", "coalesced"):
+            lookups.labels(name, outcome).inc(item[outcome])
+    return (state, rejected, opened, failures, lookups)
+
+
+registry.register_collector(_remnawave_collector)
+
+
+async def start_metrics_server(host: str, port: int):
+    """Поднимает HTTP-эндпоинт /metrics; возвращает runner для остановки."""
+    from aiohttp import web
+
+    async def handle(_request) -> web.Response:
+        return web.Response(
+            body=registry.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info("Metrics endpoint listening on %s:%s/metrics", host, port)
+    return runner
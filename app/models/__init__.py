@@ -1,7 +1,11 @@
 from app.models.agent import Agent
+from app.models.agent_stats import AgentStats
 from app.models.client import Client
+from app.models.compensation import Compensation
 from app.models.debt_event import DebtEvent
+from app.models.panel_job import PanelJob
 from app.models.renewal import Renewal
+from app.models.revenue_daily import RevenueDaily
 from app.models.transfer_request import TransferRequest
 
-__all__ = ["Agent", "Client", "DebtEvent", "Renewal", "TransferRequest"]
+__all__ = ["Agent", "AgentStats", "Client", "Compensation", "DebtEvent", "PanelJob", "Renewal", "RevenueDaily", "TransferRequest"]
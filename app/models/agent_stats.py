@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class AgentStats(Base):
+    """Сводка по агенту, обновляемая инкрементально сервисами (см. stats_service)."""
+
+    __tablename__ = "agent_stats"
+
+    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"), primary_key=True)
+    clients_count: Mapped[int] = mapped_column(Integer, default=0)
+    renewals_count: Mapped[int] = mapped_column(Integer, default=0)
+    revenue_total: Mapped[int] = mapped_column(Integer, default=0)
+    # Сумма начислений долга (положительные DebtEvent) и погашений (модуль отрицательных).
+    debt_charged_total: Mapped[int] = mapped_column(Integer, default=0)
+    debt_paid_total: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -10,6 +10,8 @@ from app.db.base import Base
 
 class Client(Base):
     __tablename__ = "clients"
+    # Списки клиентов агента по алфавиту и постраничный inline-поиск по курсору.
+    __table_args__ = (Index("ix_clients_agent_username", "agent_id", "username"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     telegram_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
@@ -24,6 +26,10 @@ class Client(Base):
     tariff_name: Mapped[str | None] = mapped_column(String(128), nullable=True)
     tariff_base_price: Mapped[int | None] = mapped_column(Integer, nullable=True)
     expires_notified_for: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Кеш данных панели: uuid пользователя и последний известный expireAt,
+    # чтобы продлевать без предварительного запроса by-username.
+    remnawave_uuid: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    remnawave_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
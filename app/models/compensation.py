@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class Compensation(Base):
+    """Массовое продление без начисления долга (компенсация за простой)."""
+
+    __tablename__ = "compensations"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    days: Mapped[int] = mapped_column(Integer)
+    status: Mapped[str] = mapped_column(String(16), default="running", index=True)
+
+    # Отбор клиентов; пустое поле — без ограничения.
+    agent_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    tariff_name: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    expires_from: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    expires_to: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Клиенты, подключённые после запуска, в компенсацию не попадают.
+    max_client_id: Mapped[int] = mapped_column(Integer, default=0)
+
+    # Чекпоинт: клиенты с id <= last_client_id уже обработаны.
+    last_client_id: Mapped[int] = mapped_column(Integer, default=0)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    extended: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    failed_usernames: Mapped[list] = mapped_column(JSON, default=list)
+
+    # Куда выводить прогресс: чат и сообщение, в котором он показывается.
+    chat_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    message_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    user_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
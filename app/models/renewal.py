@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy import DateTime, ForeignKey, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -18,6 +18,7 @@ class Renewal(Base):
     days: Mapped[int] = mapped_column(Integer)
     debt_amount: Mapped[int] = mapped_column(Integer)
     payment_amount: Mapped[int] = mapped_column(Integer, default=0)
+    tariff_name: Mapped[str | None] = mapped_column(String(128), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     client = relationship("Client", back_populates="renewals")
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import Date, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class RevenueDaily(Base):
+    """Дневная сводка продлений по агенту и тарифу (см. revenue_service)."""
+
+    __tablename__ = "revenue_daily"
+    __table_args__ = (UniqueConstraint("day", "agent_id", "tariff_name", name="uq_revenue_daily_key"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, index=True)
+    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"))
+    tariff_name: Mapped[str] = mapped_column(String(128), default="")
+
+    renewals: Mapped[int] = mapped_column(Integer, default=0)
+    new_clients: Mapped[int] = mapped_column(Integer, default=0)
+    revenue: Mapped[int] = mapped_column(Integer, default=0)
+    owner_share: Mapped[int] = mapped_column(Integer, default=0)
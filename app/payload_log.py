@@ -0,0 +1,74 @@
+"""Логирование payload'ов на горячих путях.
+
+Полные payload'ы панели и списки клиентов пишутся только на уровне
+LOG_PAYLOAD_LEVEL (по умолчанию DEBUG), только для доли вызовов по категории
+(LOG_SAMPLE_RATES) и только в виде ограниченной сводки. Сводка строится лениво —
+в момент форматирования записи, а не при вызове.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+from typing import Any, Callable, Sequence
+
+from app.config import get_settings
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else f"{text[:limit]}…(+{len(text) - limit})"
+
+
+def summarize(value: Any, max_chars: int, max_items: int, key: Callable[[Any], Any] | None = None) -> str:
+    """Короткое представление: у длинных списков — первые ``max_items`` элементов и счётчик остальных."""
+    if isinstance(value, dict):
+        items = list(value.items())
+        parts = [f"{name}={_clip(repr(item), 80)}" for name, item in items[:max_items]]
+        if len(items) > max_items:
+            parts.append(f"…(+{len(items) - max_items} keys)")
+        return _clip("{" + ", ".join(parts) + "}", max_chars)
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        head = value[:max_items]
+        parts = [repr(key(item) if key else item) for item in head]
+        if len(value) > max_items:
+            parts.append(f"…(+{len(value) - max_items})")
+        return _clip(f"[{', '.join(parts)}] n={len(value)}", max_chars)
+    return _clip(repr(value), max_chars)
+
+
+class Summary:
+    """Аргумент лога: сводка считается только если запись действительно форматируется."""
+
+    __slots__ = ("value", "key")
+
+    def __init__(self, value: Any, key: Callable[[Any], Any] | None = None) -> None:
+        self.value = value
+        self.key = key
+
+    def __str__(self) -> str:
+        settings = get_settings()
+        return summarize(self.value, settings.log_payload_max_chars, settings.log_payload_max_items, self.key)
+
+
+def _payload_level() -> int | None:
+    level = logging.getLevelName(get_settings().log_payload_level.upper())
+    if not isinstance(level, int) or not logging.getLogger().isEnabledFor(level):
+        return None
+    return level
+
+
+class PayloadLog:
+    """Логгер одной категории: уровень и доля записей берутся из настроек."""
+
+    def __init__(self, category: str) -> None:
+        self.category = category
+
+    def _sampled(self) -> bool:
+        settings = get_settings()
+        rate = settings.log_sample_rate_map.get(self.category, settings.log_payload_sample_rate)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def log(self, msg: str, *args: Any) -> None:
+        level = _payload_level()
+        if level is not None and self._sampled():
+            logging.log(level, msg, *args)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Callable
+
+
+STATE_CLOSED = "closed"
+STATE_HALF_OPEN = "half_open"
+STATE_OPEN = "open"
+
+# Числовое значение состояния для метрик: 0 — норма, 2 — запросы отклоняются.
+STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+
+class CircuitBreaker:
+    """Предохранитель: после серии сбоев подряд отклоняет запросы, затем пропускает одну пробу.
+
+    closed → open после ``failure_threshold`` сбоев подряд; через ``reset_timeout``
+    секунд один запрос проходит как проба (half_open): успех замыкает цепь,
+    сбой снова размыкает.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.calls_total = 0
+        self.failures_total = 0
+        self.rejected_total = 0
+        self.opened_total = 0
+
+    def allow(self) -> bool:
+        if self.state == STATE_OPEN:
+            if self._clock() - self.opened_at < self.reset_timeout:
+                self.rejected_total += 1
+                return False
+            self._set_state(STATE_HALF_OPEN)
+        if self.state == STATE_HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected_total += 1
+                return False
+            self._probe_in_flight = True
+        self.calls_total += 1
+        return True
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        if self.state != STATE_CLOSED:
+            self._set_state(STATE_CLOSED)
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.failures_total += 1
+        self.consecutive_failures += 1
+        if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+            if self.state != STATE_OPEN:
+                self.opened_total += 1
+                self._set_state(STATE_OPEN)
+
+    def release(self) -> None:
+        """Проба прервана без результата (отмена задачи): отдаём слот следующему запросу."""
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        logging.warning("Remnawave breaker %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+
+    def metrics(self) -> dict[str, int | str]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "state_value": STATE_VALUES[self.state],
+            "consecutive_failures": self.consecutive_failures,
+            "calls_total": self.calls_total,
+            "failures_total": self.failures_total,
+            "rejected_total": self.rejected_total,
+            "opened_total": self.opened_total,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> CircuitBreaker:
+    """Один предохранитель на панель: клиенты создаются на каждый вызов, а состояние общее."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        _breakers[name] = breaker
+    else:
+        breaker.failure_threshold = max(1, failure_threshold)
+        breaker.reset_timeout = reset_timeout
+    return breaker
+
+
+def breaker_metrics() -> list[dict[str, int | str]]:
+    return [breaker.metrics() for breaker in _breakers.values()]
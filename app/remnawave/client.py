@@ -1,11 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import random
+import re
+import time
 from typing import Any
 
 import logging
 
 import httpx
 
+from app import metrics
+from app.remnawave.breaker import CircuitBreaker, get_breaker
+from app.remnawave.errors import (
+    RemnawaveCircuitOpen,
+    RemnawaveError,
+    RemnawaveNotFound,
+    RemnawaveUnavailable,
+    error_for_status,
+)
+from app.remnawave.lookup_cache import LookupCache, get_lookup_cache
+
+
+_ROUTE_PARAM = re.compile(r"^(/api/users/by-[a-z-]+)/[^/]+$")
+
+
+def _route(path: str) -> str:
+    # Метка метрик без username/id, чтобы не плодить ряды.
+    return _ROUTE_PARAM.sub(r"\1/{value}", path)
+
 
 class RemnawaveClient:
     def __init__(
@@ -14,11 +37,48 @@ class RemnawaveClient:
         api_key: str,
         mode: str = "remote",
         caddy_token: str | None = None,
+        *,
+        timeout: float = 10.0,
+        retry_attempts: int = 3,
+        retry_base_delay: float = 0.3,
+        retry_max_delay: float = 3.0,
+        breaker: CircuitBreaker | None = None,
+        lookup_cache: LookupCache | None = None,
     ) -> None:
         self.base_url = base_url.rstrip("/.")
         self.api_key = api_key
         self.mode = mode
         self.caddy_token = caddy_token
+        self.timeout = timeout
+        self.retry_attempts = max(1, retry_attempts)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = breaker or get_breaker(self.base_url)
+        self.lookup_cache = lookup_cache or get_lookup_cache(self.base_url)
+
+    @classmethod
+    def from_settings(cls, settings) -> RemnawaveClient:
+        return cls(
+            settings.remnawave_api_url,
+            settings.remnawave_api_key,
+            settings.remnawave_mode,
+            settings.remnawave_caddy_token,
+            timeout=settings.remnawave_timeout_seconds,
+            retry_attempts=settings.remnawave_retry_attempts,
+            retry_base_delay=settings.remnawave_retry_base_delay,
+            retry_max_delay=settings.remnawave_retry_max_delay,
+            breaker=get_breaker(
+                settings.remnawave_api_url.rstrip("/."),
+                settings.remnawave_breaker_failure_threshold,
+                settings.remnawave_breaker_reset_seconds,
+            ),
+            lookup_cache=get_lookup_cache(
+                settings.remnawave_api_url.rstrip("/."),
+                settings.remnawave_lookup_cache_ttl_seconds,
+                settings.remnawave_lookup_negative_ttl_seconds,
+                settings.remnawave_lookup_cache_size,
+            ),
+        )
 
     def _headers(self) -> dict[str, str]:
         headers = {"Authorization": f"Bearer {self.api_key}"}
@@ -37,27 +97,32 @@ class RemnawaveClient:
         return await self._raw_get("/api/users", params={"size": 1, "start": 0})
 
     async def get_user_by_telegram_id(self, telegram_id: int):
-        try:
-            return await self._raw_get(f"/api/users/by-telegram-id/{telegram_id}")
-        except RuntimeError as exc:
-            if " 404 " in str(exc):
-                return {"response": []}
-            raise
+        return await self._cached_lookup(f"/api/users/by-telegram-id/{telegram_id}")
 
     async def get_user_by_username(self, username: str):
-        try:
-            return await self._raw_get(f"/api/users/by-username/{username}")
-        except RuntimeError as exc:
-            if " 404 " in str(exc):
-                logging.info("Remnawave get_user_by_username: not found username=%s", username)
+        result = await self._cached_lookup(f"/api/users/by-username/{username}")
+        if not result.get("response"):
+            logging.info("Remnawave get_user_by_username: not found username=%s", username)
+        return result
+
+    async def _cached_lookup(self, path: str):
+        # Проверки в рамках одного сценария часто повторяются: 404 тоже кешируем, но короче.
+        async def fetch():
+            try:
+                return await self._request("GET", path, retry=True)
+            except RemnawaveNotFound:
                 return {"response": []}
-            raise
+
+        return await self.lookup_cache.get(
+            ("GET", path, ()), fetch, is_negative=lambda result: not result.get("response")
+        )
 
     async def _raw_get(self, path: str, params: dict[str, Any] | None = None):
-        async with httpx.AsyncClient(headers=self._headers()) as client:
-            resp = await client.get(f"{self.base_url}{path}", params=params)
-            logging.info("Remnawave GET %s -> %s", path, resp.status_code)
-            return await self._handle_response(resp, "GET", path)
+        # GET идемпотентен: повторяем при сбоях панели, одинаковые параллельные запросы объединяем.
+        key = ("GET", path, tuple(sorted((params or {}).items())))
+        return await self.lookup_cache.get(
+            key, lambda: self._request("GET", path, params=params, retry=True), cacheable=False
+        )
 
     async def create_user(self, payload: dict[str, Any]):
         return await self._raw_post("/api/users", payload)
@@ -66,16 +131,84 @@ class RemnawaveClient:
         return await self._raw_patch("/api/users", payload)
 
     async def _raw_post(self, path: str, payload: dict[str, Any]):
-        async with httpx.AsyncClient(headers=self._headers()) as client:
-            resp = await client.post(f"{self.base_url}{path}", json=payload)
-            logging.info("Remnawave POST %s -> %s", path, resp.status_code)
-            return await self._handle_response(resp, "POST", path)
+        return await self._write("POST", path, payload)
 
     async def _raw_patch(self, path: str, payload: dict[str, Any]):
-        async with httpx.AsyncClient(headers=self._headers()) as client:
-            resp = await client.patch(f"{self.base_url}{path}", json=payload)
-            logging.info("Remnawave PATCH %s -> %s", path, resp.status_code)
-            return await self._handle_response(resp, "PATCH", path)
+        return await self._write("PATCH", path, payload)
+
+    async def _write(self, method: str, path: str, payload: dict[str, Any]):
+        # После записи прежние ответы поиска устарели, в том числе закешированные «не найдено».
+        self.lookup_cache.invalidate()
+        try:
+            return await self._request(method, path, json=payload)
+        finally:
+            self.lookup_cache.invalidate()
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Полный джиттер: случайная пауза до экспоненциальной границы.
+        ceiling = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+        retry: bool = False,
+    ):
+        attempts = self.retry_attempts if retry else 1
+        for attempt in range(1, attempts + 1):
+            try:
+                return await self._send(method, path, params=params, json=json)
+            except RemnawaveError as exc:
+                if not exc.retryable or isinstance(exc, RemnawaveCircuitOpen) or attempt >= attempts:
+                    raise
+                delay = self._retry_delay(attempt)
+                logging.warning(
+                    "Remnawave %s %s retry %s/%s in %.2fs: %s", method, path, attempt, attempts - 1, delay, exc
+                )
+                await asyncio.sleep(delay)
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+    ):
+        route = _route(path)
+        if not self.breaker.allow():
+            metrics.REMNAWAVE_REQUESTS.labels(method, route, "circuit_open").inc()
+            raise RemnawaveCircuitOpen(method, path, "circuit open")
+        started = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(headers=self._headers(), timeout=self.timeout) as client:
+                resp = await client.request(method, f"{self.base_url}{path}", params=params, json=json)
+        except httpx.HTTPError as exc:
+            self.breaker.record_failure()
+            metrics.REMNAWAVE_REQUESTS.labels(method, route, "unavailable").inc()
+            raise RemnawaveUnavailable(method, path, repr(exc)) from exc
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            metrics.REMNAWAVE_DURATION.labels(method, route).observe(time.perf_counter() - started)
+        metrics.REMNAWAVE_REQUESTS.labels(method, route, resp.status_code).inc()
+        logging.info("Remnawave %s %s -> %s", method, path, resp.status_code)
+        try:
+            result = await self._handle_response(resp, method, path)
+        except RemnawaveError as exc:
+            # 4xx значит, что панель жива и отвечает; сбоем считаются только 5xx/429.
+            if exc.retryable:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
 
     async def _handle_response(self, resp: httpx.Response, method: str, path: str):
         if resp.status_code >= 400:
@@ -83,7 +216,7 @@ class RemnawaveClient:
                 payload = resp.json()
             except ValueError:
                 payload = resp.text
-            raise RuntimeError(f"Remnawave {method} {path} failed: {resp.status_code} {payload}")
+            raise error_for_status(method, path, resp.status_code, payload)
         try:
             return resp.json()
         except ValueError:
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+class RemnawaveError(RuntimeError):
+    """Базовая ошибка обращения к панели. ``retryable`` — имеет ли смысл повтор."""
+
+    retryable = False
+
+    def __init__(self, method: str, path: str, message: str) -> None:
+        super().__init__(f"Remnawave {method} {path} failed: {message}")
+        self.method = method
+        self.path = path
+
+
+class RemnawaveHTTPError(RemnawaveError):
+    def __init__(self, method: str, path: str, status_code: int, payload: Any) -> None:
+        super().__init__(method, path, f"{status_code} {payload}")
+        self.status_code = status_code
+        self.payload = payload
+
+
+class RemnawaveBadRequest(RemnawaveHTTPError):
+    pass
+
+
+class RemnawaveAuthError(RemnawaveHTTPError):
+    pass
+
+
+class RemnawaveNotFound(RemnawaveHTTPError):
+    pass
+
+
+class RemnawaveConflict(RemnawaveHTTPError):
+    pass
+
+
+class RemnawaveRateLimited(RemnawaveHTTPError):
+    retryable = True
+
+
+class RemnawaveServerError(RemnawaveHTTPError):
+    retryable = True
+
+
+class RemnawaveUnavailable(RemnawaveError):
+    """Панель не ответила: таймаут, обрыв соединения, DNS и т.п."""
+
+    retryable = True
+
+
+class RemnawaveCircuitOpen(RemnawaveUnavailable):
+    """Запрос не отправлялся: предохранитель разомкнут после серии сбоев."""
+
+
+_STATUS_ERRORS: dict[int, type[RemnawaveHTTPError]] = {
+    401: RemnawaveAuthError,
+    403: RemnawaveAuthError,
+    404: RemnawaveNotFound,
+    409: RemnawaveConflict,
+    429: RemnawaveRateLimited,
+}
+
+
+def error_for_status(method: str, path: str, status_code: int, payload: Any) -> RemnawaveHTTPError:
+    error_class = _STATUS_ERRORS.get(status_code)
+    if error_class is None:
+        error_class = RemnawaveServerError if status_code >= 500 else RemnawaveBadRequest
+    return error_class(method, path, status_code, payload)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class LookupCache:
+    """Single-flight и короткий кеш для одинаковых GET-запросов к панели.
+
+    Одновременные запросы с одним ключом ждут один общий запрос. Результат
+    хранится ``ttl`` секунд, «не найдено» — ``negative_ttl`` секунд
+    (``cacheable=False`` — только объединение). Отдаваемые объекты общие
+    для всех вызывающих и не должны изменяться.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 5.0,
+        negative_ttl: float = 3.0,
+        max_size: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        is_negative: Callable[[Any], bool] = lambda value: False,
+        cacheable: bool = True,
+    ) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > self._clock():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            generation = self._generation if cacheable else None
+            task = asyncio.ensure_future(self._load(key, fetch, is_negative, generation))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _done, key=key, task=task: self._forget(key, task))
+        # shield: отмена одного ожидающего не отменяет общий запрос для остальных.
+        return await asyncio.shield(task)
+
+    async def _load(self, key, fetch, is_negative, generation: int | None) -> Any:
+        value = await fetch()
+        # Между стартом запроса и ответом могла пройти запись: такой ответ не кешируем.
+        if generation is not None and generation == self._generation:
+            ttl = self.negative_ttl if is_negative(value) else self.ttl
+            if ttl > 0 and self.max_size > 0:
+                self._entries[key] = (self._clock() + ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Ошибку получили ожидающие; помечаем как прочитанную, чтобы не было предупреждения.
+            task.exception()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        # Запросы, начатые до записи, дойдут до своих ожидающих, но новые к ним не присоединятся.
+        self._in_flight.clear()
+
+    def metrics(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+_caches: dict[str, LookupCache] = {}
+
+
+def get_lookup_cache(
+    name: str,
+    ttl: float = 5.0,
+    negative_ttl: float = 3.0,
+    max_size: int = 1024,
+) -> LookupCache:
+    """Один кеш на панель: клиенты создаются на каждый вызов, а кеш общий."""
+    cache = _caches.get(name)
+    if cache is None:
+        cache = LookupCache(ttl, negative_ttl, max_size)
+        _caches[name] = cache
+    else:
+        cache.ttl = ttl
+        cache.negative_ttl = negative_ttl
+        cache.max_size = max_size
+    return cache
+
+
+def lookup_cache_metrics() -> dict[str, dict[str, int]]:
+    return {name: cache.metrics() for name, cache in _caches.items()}
@@ -4,7 +4,8 @@ from sqlalchemy import select, func, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.models import Agent, Client, DebtEvent, Renewal, TransferRequest
+from app.models import Agent, AgentStats, Client, DebtEvent, Renewal, RevenueDaily, TransferRequest
+from app.services.data_version import bump_agents_version, bump_clients_version
 
 
 async def get_or_create_agent(
@@ -26,6 +27,8 @@ async def get_or_create_agent(
         if normalized_username and agent.telegram_username != normalized_username:
             agent.telegram_username = normalized_username
             await session.commit()
+            # Имя агента видно в списках клиентов у владельца.
+            bump_clients_version(agent.id)
         return agent
 
     agent = Agent(
@@ -36,7 +39,10 @@ async def get_or_create_agent(
         owner_share_percent=settings.default_owner_share_percent,
     )
     session.add(agent)
+    await session.flush()
+    session.add(AgentStats(agent_id=agent.id))
     await session.commit()
+    bump_agents_version()
     await session.refresh(agent)
     return agent
 
@@ -60,16 +66,12 @@ async def get_agent_by_id(session: AsyncSession, agent_id: int) -> Agent | None:
 
 
 async def list_agents(session: AsyncSession) -> list[tuple[Agent, int]]:
-    result = await session.execute(select(Agent).order_by(Agent.created_at))
-    agents = list(result.scalars().all())
-    output: list[tuple[Agent, int]] = []
-    for agent in agents:
-        count_result = await session.execute(
-            select(Client.id).where(Client.agent_id == agent.id)
-        )
-        client_count = len(count_result.scalars().all())
-        output.append((agent, client_count))
-    return output
+    result = await session.execute(
+        select(Agent, func.coalesce(AgentStats.clients_count, 0))
+        .outerjoin(AgentStats, AgentStats.agent_id == Agent.id)
+        .order_by(Agent.created_at)
+    )
+    return [(agent, client_count) for agent, client_count in result.all()]
 
 
 async def delete_agent_by_id(session: AsyncSession, agent_id: int) -> tuple[Agent | None, int]:
@@ -84,6 +86,9 @@ async def delete_agent_by_id(session: AsyncSession, agent_id: int) -> tuple[Agen
     await session.execute(delete(Renewal).where(Renewal.agent_id == agent_id))
     await session.execute(delete(TransferRequest).where(TransferRequest.agent_id == agent_id))
     await session.execute(delete(DebtEvent).where(DebtEvent.agent_id == agent_id))
+    await session.execute(delete(AgentStats).where(AgentStats.agent_id == agent_id))
+    await session.execute(delete(RevenueDaily).where(RevenueDaily.agent_id == agent_id))
     await session.execute(delete(Agent).where(Agent.id == agent_id))
     await session.commit()
+    bump_clients_version(agent_id)
     return agent, len(client_ids)
@@ -10,6 +10,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Client, Agent
 from app.models import Renewal
+from app.services.data_version import bump_clients_version
+from app.services.revenue_service import add_revenue
+from app.services.stats_service import bump_agent_stats, refresh_agent_stats
 
 
 async def get_client_by_tg(session: AsyncSession, agent_id: int, telegram_id: int) -> Client | None:
@@ -55,6 +58,8 @@ async def create_client(
     last_payment_at: datetime | None = None,
     tariff_name: str | None = None,
     tariff_base_price: int | None = None,
+    remnawave_uuid: str | None = None,
+    remnawave_expires_at: datetime | None = None,
 ) -> Client:
     client = Client(
         agent_id=agent_id,
@@ -67,9 +72,14 @@ async def create_client(
         last_payment_at=last_payment_at,
         tariff_name=tariff_name,
         tariff_base_price=tariff_base_price,
+        remnawave_uuid=remnawave_uuid,
+        remnawave_expires_at=remnawave_expires_at,
     )
     session.add(client)
+    await bump_agent_stats(session, agent_id, clients_count=1)
+    await add_revenue(session, agent_id, tariff_name, new_clients=1)
     await session.commit()
+    bump_clients_version(agent_id)
     await session.refresh(client)
     logging.info("Client saved in DB: agent_id=%s username=%s id=%s", agent_id, username, client.id)
     return client
@@ -95,7 +105,9 @@ async def delete_client_by_id(session: AsyncSession, client_id: int) -> bool:
         return False
     await session.execute(delete(Renewal).where(Renewal.client_id == client_id))
     await session.execute(delete(Client).where(Client.id == client_id))
+    await refresh_agent_stats(session, client.agent_id)
     await session.commit()
+    bump_clients_version(client.agent_id)
     return True
 
 
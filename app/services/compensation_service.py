@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import Select, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import SessionLocal
+from app.models import Client, Compensation
+from app.services.client_service import add_days
+from app.services.data_version import bump_clients_version
+from app.services.remnawave_service import extend_user_expire
+
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_CANCELLED = "cancelled"
+
+# Сколько неудачных username хранить в записи: для отчёта хватает, строка не разрастается.
+FAILED_USERNAMES_LIMIT = 50
+
+ProgressCallback = Callable[[Compensation], Awaitable[None]]
+
+
+class _RateLimiter:
+    """Не больше ``rate`` запросов в секунду: старты разносятся равномерно, без всплесков."""
+
+    def __init__(self, rate: float) -> None:
+        self._interval = 1 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self._interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+
+def _targets_query(
+    columns,
+    agent_id: int | None,
+    tariff_name: str | None,
+    expires_from: datetime | None,
+    expires_to: datetime | None,
+) -> Select:
+    stmt = select(*columns)
+    if agent_id is not None:
+        stmt = stmt.where(Client.agent_id == agent_id)
+    if tariff_name:
+        stmt = stmt.where(func.lower(Client.tariff_name) == tariff_name.lower())
+    if expires_from is not None:
+        stmt = stmt.where(Client.expires_at >= expires_from)
+    if expires_to is not None:
+        stmt = stmt.where(Client.expires_at < expires_to)
+    return stmt
+
+
+async def count_targets(
+    session: AsyncSession,
+    *,
+    agent_id: int | None = None,
+    tariff_name: str | None = None,
+    expires_from: datetime | None = None,
+    expires_to: datetime | None = None,
+) -> int:
+    """Сколько клиентов попадёт под компенсацию — для предпросмотра."""
+    stmt = _targets_query([func.count(Client.id)], agent_id, tariff_name, expires_from, expires_to)
+    return int((await session.execute(stmt)).scalar_one())
+
+
+async def create_compensation(
+    session: AsyncSession,
+    days: int,
+    *,
+    agent_id: int | None = None,
+    tariff_name: str | None = None,
+    expires_from: datetime | None = None,
+    expires_to: datetime | None = None,
+    chat_id: int | None = None,
+    user_id: int | None = None,
+) -> Compensation:
+    """Фиксирует отбор и верхнюю границу id клиентов; сам проход делает ``run_compensation``."""
+    filters = {
+        "agent_id": agent_id,
+        "tariff_name": tariff_name,
+        "expires_from": expires_from,
+        "expires_to": expires_to,
+    }
+    max_id = await session.execute(
+        _targets_query([func.max(Client.id)], agent_id, tariff_name, expires_from, expires_to)
+    )
+    compensation = Compensation(
+        days=days,
+        max_client_id=max_id.scalar_one() or 0,
+        total=await count_targets(session, **filters),
+        chat_id=chat_id,
+        user_id=user_id,
+        **filters,
+    )
+    session.add(compensation)
+    await session.commit()
+    await session.refresh(compensation)
+    return compensation
+
+
+async def set_progress_message(session: AsyncSession, compensation_id: int, message_id: int) -> None:
+    await session.execute(
+        update(Compensation).where(Compensation.id == compensation_id).values(message_id=message_id)
+    )
+    await session.commit()
+
+
+async def list_running_compensations(session: AsyncSession) -> list[Compensation]:
+    result = await session.execute(
+        select(Compensation).where(Compensation.status == STATUS_RUNNING).order_by(Compensation.id)
+    )
+    return list(result.scalars().all())
+
+
+async def cancel_compensations(session: AsyncSession) -> int:
+    """Останавливает идущие компенсации: проход завершит текущую пачку и выйдет."""
+    result = await session.execute(
+        update(Compensation)
+        .where(Compensation.status == STATUS_RUNNING)
+        .values(status=STATUS_CANCELLED, finished_at=datetime.utcnow())
+    )
+    await session.commit()
+    return result.rowcount or 0
+
+
+async def _next_chunk(session: AsyncSession, compensation: Compensation, chunk_size: int) -> list[Any]:
+    stmt = (
+        _targets_query(
+            [
+                Client.id,
+                Client.agent_id,
+                Client.username,
+                Client.expires_at,
+                Client.subscription_link,
+                Client.remnawave_uuid,
+                Client.remnawave_expires_at,
+            ],
+            compensation.agent_id,
+            compensation.tariff_name,
+            compensation.expires_from,
+            compensation.expires_to,
+        )
+        .where(Client.id > compensation.last_client_id, Client.id <= compensation.max_client_id)
+        .order_by(Client.id)
+        .limit(chunk_size)
+    )
+    return list((await session.execute(stmt)).all())
+
+
+async def _store_chunk(
+    compensation_id: int,
+    last_client_id: int,
+    extended: list[dict[str, Any]],
+    failed: list[str],
+    agent_ids: set[int],
+) -> Compensation | None:
+    """Одна транзакция на пачку: сроки клиентов и чекпоинт. Долг, продления и выручка не трогаются."""
+    async with SessionLocal() as session:
+        if extended:
+            # ORM bulk UPDATE по первичному ключу: один executemany на пачку.
+            await session.execute(update(Client), extended)
+        compensation = await session.get(Compensation, compensation_id)
+        if compensation is None:
+            return None
+        compensation.last_client_id = last_client_id
+        compensation.extended += len(extended)
+        compensation.failed += len(failed)
+        if failed and len(compensation.failed_usernames) < FAILED_USERNAMES_LIMIT:
+            compensation.failed_usernames = [*compensation.failed_usernames, *failed][:FAILED_USERNAMES_LIMIT]
+        compensation.updated_at = datetime.utcnow()
+        await session.commit()
+        if extended:
+            bump_clients_version(*agent_ids)
+        await session.refresh(compensation)
+        return compensation
+
+
+async def _finish(compensation_id: int) -> Compensation | None:
+    async with SessionLocal() as session:
+        compensation = await session.get(Compensation, compensation_id)
+        if compensation is None:
+            return None
+        if compensation.status == STATUS_RUNNING:
+            compensation.status = STATUS_DONE
+            compensation.finished_at = datetime.utcnow()
+            await session.commit()
+            await session.refresh(compensation)
+        return compensation
+
+
+async def run_compensation(
+    compensation_id: int,
+    *,
+    concurrency: int,
+    rate_per_second: float,
+    chunk_size: int,
+    progress: ProgressCallback | None = None,
+) -> Compensation | None:
+    """Продлевает отобранных клиентов в панели пачками, сохраняя чекпоинт после каждой.
+
+    Запросы к панели идут параллельно (не больше ``concurrency``) и не чаще ``rate_per_second``.
+    В панели меняется только expireAt; пользователи, которых там нет, считаются ошибкой
+    и не создаются. После перезапуска проход продолжается с ``last_client_id``. Клиентов
+    с сохранённым uuid панель продлевает до абсолютной даты от известного срока, поэтому
+    повтор пачки, прерванной до записи чекпоинта, не добавляет дни второй раз.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = _RateLimiter(rate_per_second)
+    while True:
+        async with SessionLocal() as session:
+            compensation = await session.get(Compensation, compensation_id)
+            if compensation is None or compensation.status != STATUS_RUNNING:
+                if compensation is not None and progress is not None:
+                    await progress(compensation)
+                return compensation
+            days = compensation.days
+            chunk = await _next_chunk(session, compensation, chunk_size)
+        if not chunk:
+            compensation = await _finish(compensation_id)
+            if compensation is not None and progress is not None:
+                await progress(compensation)
+            return compensation
+
+        extended: list[dict[str, Any]] = []
+        failed: list[str] = []
+        agent_ids: set[int] = set()
+
+        async def extend(row) -> None:
+            async with semaphore:
+                await limiter.wait()
+                try:
+                    # Только срок: тариф, лимиты и статус клиента в панели остаются как есть.
+                    panel = await extend_user_expire(
+                        username=row.username,
+                        days=days,
+                        uuid=row.remnawave_uuid,
+                        known_expire=row.remnawave_expires_at,
+                    )
+                except Exception as exc:
+                    logging.warning("Compensation extend failed: username=%s error=%s", row.username, exc)
+                    failed.append(row.username)
+                    return
+            expires_at = panel.get("expires_at") or add_days(row.expires_at, days)
+            agent_ids.add(row.agent_id)
+            extended.append(
+                {
+                    "id": row.id,
+                    "expires_at": expires_at,
+                    "remnawave_expires_at": expires_at,
+                    "subscription_link": panel.get("subscription_url") or row.subscription_link,
+                    "remnawave_uuid": panel.get("uuid") or row.remnawave_uuid,
+                }
+            )
+
+        await asyncio.gather(*(extend(row) for row in chunk))
+        compensation = await _store_chunk(compensation_id, chunk[-1].id, extended, failed, agent_ids)
+        if compensation is None:
+            return None
+        if progress is not None:
+            await progress(compensation)
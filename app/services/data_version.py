@@ -0,0 +1,44 @@
+"""Версии данных о клиентах и агентах для кешей отображения и поиска.
+
+Версия агента растёт при каждом изменении его клиентов: подключение, продление,
+удаление, синхронизация с панелью. Общая версия (вид владельца по всем агентам)
+растёт при любом изменении. Версия агентов (долг, лимиты, новые агенты) нужна
+экранам владельца со сводкой по агентам. Кеш запоминает версию, с которой собран,
+и считается устаревшим, как только она изменилась. Версии живут в памяти: бот
+работает одним процессом, после перезапуска кеши всё равно пусты.
+"""
+
+from __future__ import annotations
+
+_agent_versions: dict[int, int] = {}
+_global_version = 0
+# Растёт, когда изменились данные всех агентов сразу: устаревают и их собственные версии.
+_epoch = 0
+_agents_version = 0
+
+
+def bump_clients_version(*agent_ids: int) -> None:
+    """Отмечает изменение клиентов агентов; без аргументов — всех агентов."""
+    global _global_version, _epoch
+    _global_version += 1
+    if not agent_ids:
+        _epoch += 1
+    for agent_id in agent_ids:
+        _agent_versions[agent_id] = _agent_versions.get(agent_id, 0) + 1
+
+
+def clients_version(agent_id: int | None) -> tuple[int, int]:
+    """Текущая версия клиентов агента; ``None`` — всех агентов."""
+    if agent_id is None:
+        return _global_version, 0
+    return _epoch, _agent_versions.get(agent_id, 0)
+
+
+def bump_agents_version() -> None:
+    """Отмечает изменение агентов: долг, лимит, новый агент."""
+    global _agents_version
+    _agents_version += 1
+
+
+def agents_version() -> int:
+    return _agents_version
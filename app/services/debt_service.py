@@ -3,15 +3,21 @@ from __future__ import annotations
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Agent, DebtEvent
+from app.services.data_version import bump_agents_version
+from app.services.stats_service import bump_agent_stats
 
 
 async def increase_debt(session: AsyncSession, agent: Agent, amount: int, reason: str) -> None:
     agent.current_debt += amount
     session.add(DebtEvent(agent_id=agent.id, amount=amount, reason=reason))
+    await bump_agent_stats(session, agent.id, debt_charged_total=amount)
     await session.commit()
+    bump_agents_version()
 
 
 async def decrease_debt(session: AsyncSession, agent: Agent, amount: int, reason: str) -> None:
     agent.current_debt = max(0, agent.current_debt - amount)
     session.add(DebtEvent(agent_id=agent.id, amount=-amount, reason=reason))
+    await bump_agent_stats(session, agent.id, debt_paid_total=amount)
     await session.commit()
+    bump_agents_version()
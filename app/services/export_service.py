@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import csv
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Agent, Client, DebtEvent, Renewal
+from app.xlsx import XlsxStreamWriter
+
+
+DATASET_CLIENTS = "clients"
+DATASET_RENEWALS = "renewals"
+DATASET_DEBTS = "debts"
+DATASETS = (DATASET_CLIENTS, DATASET_RENEWALS, DATASET_DEBTS)
+
+FORMAT_CSV = "csv"
+FORMAT_XLSX = "xlsx"
+FORMATS = (FORMAT_CSV, FORMAT_XLSX)
+
+
+def _clients_query() -> Select:
+    return (
+        select(
+            Client.id,
+            Client.username,
+            Agent.name,
+            Agent.telegram_id,
+            Client.telegram_id,
+            Client.tariff_name,
+            Client.monthly_price,
+            Client.expires_at,
+            Client.last_payment_amount,
+            Client.last_payment_at,
+            Client.created_at,
+        )
+        .join(Agent, Agent.id == Client.agent_id)
+        .order_by(Client.id)
+    )
+
+
+def _renewals_query() -> Select:
+    return (
+        select(
+            Renewal.id,
+            Renewal.created_at,
+            Agent.name,
+            Agent.telegram_id,
+            Client.username,
+            Renewal.tariff_name,
+            Renewal.days,
+            Renewal.payment_amount,
+            Renewal.debt_amount,
+        )
+        .join(Agent, Agent.id == Renewal.agent_id)
+        .outerjoin(Client, Client.id == Renewal.client_id)
+        .order_by(Renewal.id)
+    )
+
+
+def _debts_query() -> Select:
+    return (
+        select(DebtEvent.id, DebtEvent.created_at, Agent.name, Agent.telegram_id, DebtEvent.amount, DebtEvent.reason)
+        .join(Agent, Agent.id == DebtEvent.agent_id)
+        .order_by(DebtEvent.id)
+    )
+
+
+# Заголовки колонок и запрос: выбираются только нужные колонки, без ORM-объектов.
+EXPORTS: dict[str, tuple[tuple[str, ...], Callable[[], Select]]] = {
+    DATASET_CLIENTS: (
+        (
+            "id",
+            "username",
+            "agent",
+            "agent_telegram_id",
+            "telegram_id",
+            "tariff",
+            "monthly_price",
+            "expires_at",
+            "last_payment_amount",
+            "last_payment_at",
+            "created_at",
+        ),
+        _clients_query,
+    ),
+    DATASET_RENEWALS: (
+        (
+            "id",
+            "created_at",
+            "agent",
+            "agent_telegram_id",
+            "client",
+            "tariff",
+            "days",
+            "payment_amount",
+            "owner_share",
+        ),
+        _renewals_query,
+    ),
+    DATASET_DEBTS: (
+        ("id", "created_at", "agent", "agent_telegram_id", "amount", "reason"),
+        _debts_query,
+    ),
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    return value
+
+
+class _CsvWriter:
+    def __init__(self, path: str) -> None:
+        # utf-8-sig: Excel иначе открывает кириллицу кракозябрами.
+        self._file = open(path, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._file)
+
+    def write_rows(self, rows) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def export_filename(dataset: str, fmt: str) -> str:
+    return f"{dataset}-{datetime.utcnow():%Y%m%d-%H%M}.{fmt}"
+
+
+async def export_to_file(session: AsyncSession, dataset: str, fmt: str, chunk_size: int = 1000) -> tuple[str, int]:
+    """Потоково выгружает набор во временный файл; возвращает (путь, число строк). Файл удаляет вызывающий."""
+    headers, build_query = EXPORTS[dataset]
+    fd, path = tempfile.mkstemp(prefix=f"export-{dataset}-", suffix=f".{fmt}")
+    os.close(fd)
+    writer = XlsxStreamWriter(path, sheet_name=dataset) if fmt == FORMAT_XLSX else _CsvWriter(path)
+    rows = 0
+    try:
+        writer.write_rows([headers])
+        result = await session.stream(build_query().execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            writer.write_rows([tuple(_plain(value) for value in row) for row in partition])
+            rows += len(partition)
+    except BaseException:
+        writer.close()
+        os.unlink(path)
+        raise
+    writer.close()
+    return path, rows
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import SessionLocal
+from app.models import Agent, Client, DebtEvent, Renewal
+from app.services.client_service import add_days
+from app.services.data_version import bump_agents_version, bump_clients_version
+from app.services.remnawave_service import create_user_only, username_exists
+from app.services.revenue_service import add_revenue
+from app.services.stats_service import bump_agent_stats
+
+
+IMPORT_COLUMNS = ("username", "days", "price", "telegram_id", "tariff")
+
+_DELIMITERS = ",;\t"
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+@dataclass
+class ImportResult:
+    created: list[str] = field(default_factory=list)
+    taken: list[str] = field(default_factory=list)
+    failed: list[tuple[str, str]] = field(default_factory=list)
+    # Созданы в панели, но не сохранены в базу: повторный импорт покажет их занятыми.
+    unsaved: list[str] = field(default_factory=list)
+
+
+def _decode(data: bytes) -> str:
+    # Excel сохраняет CSV в utf-8-sig или cp1251 — пробуем по очереди.
+    for encoding in ("utf-8-sig", "cp1251"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("unsupported encoding")
+
+
+def _positive_int(value: str) -> int | None:
+    try:
+        number = int(value.strip())
+    except ValueError:
+        return None
+    return number if number > 0 else None
+
+
+def parse_import_csv(
+    data: bytes, max_rows: int, username_pattern: re.Pattern[str]
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """Разбирает CSV ``username,days,price[,telegram_id][,tariff]``; возвращает (строки, ошибки).
+
+    Заголовок необязателен, разделитель — запятая, точка с запятой или табуляция.
+    Ошибка формата в строке не останавливает разбор: вызывающий показывает все ошибки сразу.
+    """
+    text = _decode(data)
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=_DELIMITERS)
+    except csv.Error:
+        dialect = csv.excel
+    rows: list[dict[str, Any]] = []
+    errors: list[str] = []
+    seen: set[str] = set()
+    for line_no, cells in enumerate(csv.reader(io.StringIO(text), dialect), start=1):
+        cells = [cell.strip() for cell in cells]
+        if not any(cells):
+            continue
+        if line_no == 1 and cells[0].lower() == IMPORT_COLUMNS[0]:
+            continue
+        if len(rows) >= max_rows:
+            errors.append(f"строка {line_no}: больше {max_rows} строк")
+            break
+        if len(cells) < 3:
+            errors.append(f"строка {line_no}: нужно минимум 3 колонки")
+            continue
+        username, days_raw, price_raw = cells[:3]
+        tg_raw = cells[3] if len(cells) > 3 else ""
+        tariff = cells[4] if len(cells) > 4 else ""
+        if not username_pattern.match(username):
+            errors.append(f"строка {line_no}: неверный username {username!r}")
+            continue
+        if username.lower() in seen:
+            errors.append(f"строка {line_no}: {username} повторяется")
+            continue
+        days = _positive_int(days_raw)
+        if days is None:
+            errors.append(f"строка {line_no}: неверный срок {days_raw!r}")
+            continue
+        price = _positive_int(price_raw)
+        if price is None:
+            errors.append(f"строка {line_no}: неверная цена {price_raw!r}")
+            continue
+        telegram_id = None
+        if tg_raw:
+            telegram_id = _positive_int(tg_raw)
+            if telegram_id is None:
+                errors.append(f"строка {line_no}: неверный telegram_id {tg_raw!r}")
+                continue
+        seen.add(username.lower())
+        rows.append(
+            {
+                "line": line_no,
+                "username": username,
+                "days": days,
+                "monthly_price": price,
+                "telegram_id": telegram_id,
+                "tariff": tariff,
+            }
+        )
+    return rows, errors
+
+
+async def find_taken_usernames(session: AsyncSession, usernames: list[str], concurrency: int) -> set[str]:
+    """Занятые username: одним запросом по базе, остальные — по панели с ограничением параллельности.
+
+    Пакетного поиска по username у панели нет, поэтому запросы идут по одному,
+    но не больше ``concurrency`` одновременно (и через общий кеш поиска клиента).
+    """
+    if not usernames:
+        return set()
+    result = await session.execute(select(Client.username).where(Client.username.in_(usernames)))
+    taken = set(result.scalars().all())
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def check(username: str) -> str | None:
+        async with semaphore:
+            return username if await username_exists(username) else None
+
+    found = await asyncio.gather(*(check(username) for username in usernames if username not in taken))
+    taken.update(username for username in found if username)
+    return taken
+
+
+async def _store_batch(agent_id: int, batch: list[tuple[dict[str, Any], dict[str, Any]]]) -> None:
+    """Одна транзакция на пачку: клиенты, продления, события долга, долг агента и сводки."""
+    now = datetime.utcnow()
+    async with SessionLocal() as session:
+        # render_nulls: иначе ORM делит пачку на группы по набору непустых колонок (telegram_id).
+        await session.execute(
+            insert(Client).execution_options(render_nulls=True),
+            [
+                {
+                    "agent_id": agent_id,
+                    "username": row["username"],
+                    "telegram_id": row["telegram_id"],
+                    "expires_at": panel["expires_at"],
+                    "subscription_link": panel.get("subscription_url"),
+                    "monthly_price": row["monthly_price"],
+                    "last_payment_amount": row["amount_total"],
+                    "last_payment_at": now,
+                    "tariff_name": row["tariff_name"],
+                    "tariff_base_price": row["base_price"],
+                    "remnawave_uuid": panel.get("uuid"),
+                    "remnawave_expires_at": panel["expires_at"],
+                    "created_at": now,
+                }
+                for row, panel in batch
+            ],
+        )
+        # id новых клиентов одним запросом: RETURNING при executemany есть не во всех драйверах.
+        ids = await session.execute(
+            select(Client.username, Client.id).where(
+                Client.agent_id == agent_id, Client.username.in_([row["username"] for row, _ in batch])
+            )
+        )
+        client_ids = dict(ids.all())
+        await session.execute(
+            insert(Renewal),
+            [
+                {
+                    "agent_id": agent_id,
+                    "client_id": client_ids[row["username"]],
+                    "days": row["days"],
+                    "debt_amount": row["owner_share"],
+                    "payment_amount": row["amount_total"],
+                    "tariff_name": row["tariff_name"],
+                    "created_at": now,
+                }
+                for row, _ in batch
+            ],
+        )
+        await session.execute(
+            insert(DebtEvent),
+            [
+                {
+                    "agent_id": agent_id,
+                    "amount": row["owner_share"],
+                    "reason": f"Импорт клиента {row['username']}",
+                    "created_at": now,
+                }
+                for row, _ in batch
+            ],
+        )
+        debt = sum(row["owner_share"] for row, _ in batch)
+        revenue = sum(row["amount_total"] for row, _ in batch)
+        await session.execute(
+            update(Agent)
+            .where(Agent.id == agent_id)
+            .values(current_debt=Agent.current_debt + debt)
+            .execution_options(synchronize_session=False)
+        )
+        await bump_agent_stats(
+            session,
+            agent_id,
+            clients_count=len(batch),
+            renewals_count=len(batch),
+            revenue_total=revenue,
+            debt_charged_total=debt,
+        )
+        per_tariff: dict[str, Counter] = {}
+        for row, _ in batch:
+            totals = per_tariff.setdefault(row["tariff_name"], Counter())
+            totals.update(
+                new_clients=1, renewals=1, revenue=row["amount_total"], owner_share=row["owner_share"]
+            )
+        for tariff_name, totals in per_tariff.items():
+            await add_revenue(session, agent_id, tariff_name, **totals)
+        await session.commit()
+    bump_clients_version(agent_id)
+    bump_agents_version()
+
+
+async def import_clients(
+    agent_id: int,
+    rows: list[dict[str, Any]],
+    *,
+    description: str,
+    concurrency: int,
+    batch_size: int,
+    progress: ProgressCallback | None = None,
+) -> ImportResult:
+    """Создаёт пользователей панели параллельно (не больше ``concurrency``) и пишет их в базу пачками.
+
+    Строка — словарь как в payload JOB_CREATE. Пачка сохраняется, как только набралась,
+    так что сбой на середине не теряет уже созданных в панели пользователей.
+    """
+    result = ImportResult()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    store_lock = asyncio.Lock()
+    pending: list[tuple[dict[str, Any], dict[str, Any]]] = []
+    done = 0
+
+    async def flush() -> None:
+        async with store_lock:
+            if not pending:
+                return
+            batch = pending[:]
+            pending.clear()
+            try:
+                await _store_batch(agent_id, batch)
+            except Exception:
+                logging.exception("Import batch failed: agent_id=%s size=%s", agent_id, len(batch))
+            else:
+                result.created.extend(row["username"] for row, _ in batch)
+                return
+            # Пользователи уже созданы в панели: сохраняем по одному, чтобы одна плохая строка не потеряла пачку.
+            for item in batch:
+                row = item[0]
+                try:
+                    await _store_batch(agent_id, [item])
+                except Exception:
+                    logging.exception(
+                        "Import row created in panel but not saved: agent_id=%s username=%s", agent_id, row["username"]
+                    )
+                    result.unsaved.append(row["username"])
+                else:
+                    result.created.append(row["username"])
+
+    async def create(row: dict[str, Any]) -> None:
+        nonlocal done
+        async with semaphore:
+            try:
+                panel = await create_user_only(
+                    username=row["username"],
+                    days=row["days"],
+                    description=description,
+                    telegram_id=row["telegram_id"],
+                    overrides=row["overrides"],
+                    username_checked=True,
+                )
+            except Exception as exc:
+                logging.warning("Import create failed: username=%s error=%s", row["username"], exc)
+                result.failed.append((row["username"], str(exc)))
+                panel = None
+        if panel is not None and panel.get("exists"):
+            result.taken.append(row["username"])
+        elif panel is not None:
+            pending.append((row, {**panel, "expires_at": panel.get("expires_at") or add_days(None, row["days"])}))
+            if len(pending) >= batch_size:
+                await flush()
+        done += 1
+        if progress is not None:
+            await progress(done, len(rows))
+
+    await asyncio.gather(*(create(row) for row in rows))
+    await flush()
+    logging.info(
+        "Import finished: agent_id=%s created=%s taken=%s failed=%s unsaved=%s",
+        agent_id,
+        len(result.created),
+        len(result.taken),
+        len(result.failed),
+        len(result.unsaved),
+    )
+    return result
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db.session import SessionLocal
+from app.models import PanelJob, Renewal
+from app.remnawave.errors import RemnawaveError
+from app.services.agent_service import get_agent_by_id
+from app.services.client_service import add_days, create_client, get_client_by_id, get_client_by_username
+from app.services.data_version import bump_clients_version
+from app.services.debt_service import increase_debt
+from app.services.remnawave_service import create_or_extend_user, create_user_only, update_user_fields
+from app.services.revenue_service import add_revenue
+from app.services.stats_service import bump_agent_stats
+
+
+JOB_CREATE = "create"
+JOB_EXTEND = "extend"
+JOB_UPDATE = "update"
+
+# Коды постоянных ошибок: сохраняются в PanelJob.error как есть.
+ERROR_USERNAME_TAKEN = "username_taken"
+ERROR_CLIENT_NOT_FOUND = "client_not_found"
+ERROR_AGENT_NOT_FOUND = "agent_not_found"
+
+JobCallback = Callable[[PanelJob], Awaitable[None]]
+
+_wakeup = asyncio.Event()
+
+
+class PermanentJobError(Exception):
+    """Ошибка, которую бессмысленно повторять: задача сразу завершается как failed."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+async def get_job_by_key(session: AsyncSession, idempotency_key: str) -> PanelJob | None:
+    result = await session.execute(select(PanelJob).where(PanelJob.idempotency_key == idempotency_key))
+    return result.scalar_one_or_none()
+
+
+async def enqueue_job(
+    session: AsyncSession,
+    kind: str,
+    idempotency_key: str,
+    payload: dict[str, Any],
+    *,
+    chat_id: int | None = None,
+    user_id: int | None = None,
+) -> PanelJob:
+    """Ставит задачу в очередь (коммитит сессию). Повтор с тем же ключом вернёт уже созданную."""
+    existing = await get_job_by_key(session, idempotency_key)
+    if existing:
+        logging.info("Panel job deduplicated: key=%s id=%s status=%s", idempotency_key, existing.id, existing.status)
+        return existing
+    job = PanelJob(
+        kind=kind,
+        idempotency_key=idempotency_key,
+        payload=payload,
+        max_attempts=get_settings().job_max_attempts,
+        chat_id=chat_id,
+        user_id=user_id,
+        run_after=datetime.utcnow(),
+    )
+    session.add(job)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        existing = await get_job_by_key(session, idempotency_key)
+        if existing is None:
+            raise
+        return existing
+    logging.info("Panel job queued: id=%s kind=%s key=%s", job.id, kind, idempotency_key)
+    _wakeup.set()
+    return job
+
+
+async def claim_jobs(session: AsyncSession, limit: int) -> list[PanelJob]:
+    """Забирает готовые к запуску задачи; FOR UPDATE SKIP LOCKED не даёт двум воркерам взять одну."""
+    settings = get_settings()
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=settings.job_lock_timeout_seconds)
+    result = await session.execute(
+        select(PanelJob)
+        .where(
+            or_(
+                (PanelJob.status == "pending") & (PanelJob.run_after <= now),
+                # Воркер упал посреди задачи: блокировка протухла, пробуем снова.
+                (PanelJob.status == "running") & (PanelJob.locked_at < stale_before),
+            )
+        )
+        .order_by(PanelJob.run_after, PanelJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    jobs = list(result.scalars().all())
+    for job in jobs:
+        job.status = "running"
+        job.attempts += 1
+        job.locked_at = now
+    if jobs:
+        await session.commit()
+    return jobs
+
+
+async def process_due_jobs(on_finished: JobCallback | None = None, limit: int | None = None) -> int:
+    settings = get_settings()
+    async with SessionLocal() as session:
+        jobs = await claim_jobs(session, limit or settings.job_worker_concurrency)
+    if jobs:
+        await asyncio.gather(*(_run_job(job, on_finished) for job in jobs))
+    return len(jobs)
+
+
+async def wait_for_jobs(timeout: float) -> None:
+    """Ждёт новую задачу из этого процесса или истечения интервала опроса."""
+    _wakeup.clear()
+    try:
+        await asyncio.wait_for(_wakeup.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    settings = get_settings()
+    seconds = settings.job_retry_base_seconds * 2 ** max(0, attempts - 1)
+    return timedelta(seconds=min(seconds, settings.job_retry_max_seconds))
+
+
+async def _run_job(job: PanelJob, on_finished: JobCallback | None) -> None:
+    executor = _EXECUTORS.get(job.kind)
+    try:
+        if executor is None:
+            raise PermanentJobError(f"unknown job kind {job.kind}")
+        await executor(job)
+        logging.info("Panel job done: id=%s kind=%s attempts=%s", job.id, job.kind, job.attempts)
+    except Exception as exc:
+        # 4xx от панели (кроме 429) не исправится повтором.
+        permanent = isinstance(exc, PermanentJobError) or (isinstance(exc, RemnawaveError) and not exc.retryable)
+        error = exc.reason if isinstance(exc, PermanentJobError) else repr(exc)
+        final = permanent or job.attempts >= job.max_attempts
+        now = datetime.utcnow()
+        values: dict[str, Any] = {"error": error, "locked_at": None}
+        if final:
+            values.update(status="failed", finished_at=now)
+        else:
+            values.update(status="pending", run_after=now + _retry_delay(job.attempts))
+        async with SessionLocal() as session:
+            await session.execute(update(PanelJob).where(PanelJob.id == job.id).values(**values))
+            await session.commit()
+        if not final:
+            logging.warning(
+                "Panel job retry: id=%s kind=%s attempt=%s/%s error=%s",
+                job.id,
+                job.kind,
+                job.attempts,
+                job.max_attempts,
+                error,
+            )
+            return
+        logging.error("Panel job failed: id=%s kind=%s attempts=%s error=%s", job.id, job.kind, job.attempts, error)
+        job.status = "failed"
+        job.error = error
+        job.finished_at = now
+    if on_finished is not None:
+        try:
+            await on_finished(job)
+        except Exception:
+            logging.exception("Panel job callback failed: id=%s", job.id)
+
+
+async def _mark_done(session: AsyncSession, job: PanelJob, result: dict[str, Any]) -> None:
+    """Помечает задачу выполненной в той же транзакции, что и её изменения в БД."""
+    job.status = "done"
+    job.result = result
+    job.error = None
+    job.finished_at = datetime.utcnow()
+    await session.execute(
+        update(PanelJob)
+        .where(PanelJob.id == job.id)
+        .values(status="done", result=result, error=None, locked_at=None, finished_at=job.finished_at)
+    )
+
+
+async def _save_checkpoint(job: PanelJob, panel: dict[str, Any]) -> None:
+    # Панель уже изменена: при повторе этот шаг пропускается, чтобы не продлить дважды.
+    job.result = {"panel": panel}
+    async with SessionLocal() as session:
+        await session.execute(update(PanelJob).where(PanelJob.id == job.id).values(result=job.result))
+        await session.commit()
+
+
+def _panel_snapshot(result: dict[str, Any]) -> dict[str, Any]:
+    expires_at = result.get("expires_at")
+    return {
+        "uuid": result.get("uuid"),
+        "expires_at": expires_at.isoformat() if expires_at else None,
+        "subscription_url": result.get("subscription_url"),
+    }
+
+
+def _snapshot_expire(panel: dict[str, Any]) -> datetime | None:
+    value = panel.get("expires_at")
+    return datetime.fromisoformat(value) if value else None
+
+
+async def _run_create(job: PanelJob) -> None:
+    payload = job.payload
+    panel = (job.result or {}).get("panel")
+    if panel is None:
+        result = await create_user_only(
+            username=payload["username"],
+            days=payload["days"],
+            description=payload.get("description"),
+            telegram_id=payload.get("telegram_id"),
+            overrides=payload.get("overrides") or {},
+        )
+        if result.get("exists"):
+            if job.attempts <= 1:
+                raise PermanentJobError(ERROR_USERNAME_TAKEN)
+            # Прошлая попытка создала пользователя, но ответ потерялся; uuid и ссылку подтянет синхронизация.
+            result = {"expires_at": add_days(None, payload["days"])}
+        panel = _panel_snapshot(result)
+        await _save_checkpoint(job, panel)
+
+    async with SessionLocal() as session:
+        agent = await get_agent_by_id(session, payload["agent_id"])
+        if not agent:
+            raise PermanentJobError(ERROR_AGENT_NOT_FOUND)
+        client = await get_client_by_username(session, agent.id, payload["username"])
+        if client is None:
+            expires_at = _snapshot_expire(panel)
+            client = await create_client(
+                session,
+                agent_id=agent.id,
+                username=payload["username"],
+                telegram_id=payload.get("telegram_id"),
+                expires_at=expires_at,
+                subscription_link=panel.get("subscription_url"),
+                monthly_price=payload["monthly_price"],
+                last_payment_amount=payload["amount_total"],
+                last_payment_at=datetime.utcnow(),
+                tariff_name=payload.get("tariff_name"),
+                tariff_base_price=payload.get("base_price"),
+                remnawave_uuid=panel.get("uuid"),
+                remnawave_expires_at=expires_at,
+            )
+        owner_share = payload["owner_share"]
+        await _mark_done(
+            session,
+            job,
+            {"panel": panel, "client_id": client.id, "payable": agent.current_debt + owner_share},
+        )
+        await increase_debt(session, agent, owner_share, f"Создание клиента {payload['username']}")
+
+
+async def _run_extend(job: PanelJob) -> None:
+    payload = job.payload
+    days = payload["days"]
+    panel = (job.result or {}).get("panel")
+    if panel is None:
+        async with SessionLocal() as session:
+            client = await get_client_by_id(session, payload["client_id"])
+        if not client:
+            raise PermanentJobError(ERROR_CLIENT_NOT_FOUND)
+        result = await create_or_extend_user(
+            username=client.username,
+            days=days,
+            description=payload.get("description"),
+            telegram_id=client.telegram_id,
+            overrides=payload.get("overrides") or {},
+            uuid=client.remnawave_uuid,
+            known_expire=client.remnawave_expires_at,
+        )
+        panel = _panel_snapshot(result)
+        await _save_checkpoint(job, panel)
+
+    async with SessionLocal() as session:
+        client = await get_client_by_id(session, payload["client_id"])
+        if not client:
+            raise PermanentJobError(ERROR_CLIENT_NOT_FOUND)
+        agent = await get_agent_by_id(session, payload["agent_id"])
+        if not agent:
+            raise PermanentJobError(ERROR_AGENT_NOT_FOUND)
+        expires_at = _snapshot_expire(panel)
+        client.expires_at = expires_at or add_days(client.expires_at, days)
+        client.subscription_link = panel.get("subscription_url") or client.subscription_link
+        client.remnawave_uuid = panel.get("uuid") or client.remnawave_uuid
+        client.remnawave_expires_at = expires_at
+        client.monthly_price = payload["amount_monthly"]
+        client.last_payment_amount = payload["amount_total"]
+        client.last_payment_at = datetime.utcnow()
+        client.tariff_base_price = payload["base_price"]
+        client.tariff_name = payload["tariff_name"]
+        owner_share = payload["owner_share"]
+        session.add(
+            Renewal(
+                agent_id=agent.id,
+                client_id=client.id,
+                days=days,
+                debt_amount=owner_share,
+                payment_amount=payload["amount_total"],
+                tariff_name=payload["tariff_name"],
+            )
+        )
+        await bump_agent_stats(session, agent.id, renewals_count=1, revenue_total=payload["amount_total"])
+        await add_revenue(
+            session,
+            agent.id,
+            payload["tariff_name"],
+            renewals=1,
+            revenue=payload["amount_total"],
+            owner_share=owner_share,
+        )
+        await _mark_done(session, job, {"panel": panel, "payable": agent.current_debt + owner_share})
+        await increase_debt(session, agent, owner_share, f"Продление {days} дней для {client.username}")
+        bump_clients_version(agent.id)
+
+
+async def _run_update(job: PanelJob) -> None:
+    payload = job.payload
+    async with SessionLocal() as session:
+        client = await get_client_by_id(session, payload["client_id"])
+    if not client:
+        raise PermanentJobError(ERROR_CLIENT_NOT_FOUND)
+    username = client.username
+    try:
+        result = await update_user_fields(username, payload["fields"], uuid=client.remnawave_uuid)
+    except LookupError as exc:
+        raise PermanentJobError(ERROR_CLIENT_NOT_FOUND) from exc
+    panel = _panel_snapshot(result)
+
+    async with SessionLocal() as session:
+        client = await get_client_by_id(session, payload["client_id"])
+        if client:
+            expires_at = _snapshot_expire(panel)
+            client.remnawave_uuid = panel.get("uuid") or client.remnawave_uuid
+            if expires_at:
+                client.remnawave_expires_at = expires_at
+            client.subscription_link = panel.get("subscription_url") or client.subscription_link
+        await _mark_done(session, job, {"panel": panel, "username": username})
+        await session.commit()
+
+
+_EXECUTORS: dict[str, Callable[[PanelJob], Awaitable[None]]] = {
+    JOB_CREATE: _run_create,
+    JOB_EXTEND: _run_extend,
+    JOB_UPDATE: _run_update,
+}
@@ -1,21 +1,32 @@
 import logging
 import math
+import time
 from datetime import datetime, timedelta
 
 from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import metrics
 from app.bot.keyboards import back_to_menu_keyboard
 from app.config import get_settings
 from app.models import Agent, Client
+from app.texts import get_texts
 
 
-def _t(value: str, **kwargs) -> str:
-    text = value.replace("\\n", "\n")
-    return text.format(**kwargs) if kwargs else text
+async def notify_expiring_clients(session: AsyncSession, bot) -> int:
+    started = time.perf_counter()
+    try:
+        notified = await _notify_expiring_clients(session, bot)
+    except Exception:
+        metrics.NOTIFY_RUNS.labels("error").inc()
+        raise
+    finally:
+        metrics.NOTIFY_DURATION.observe(time.perf_counter() - started)
+    metrics.NOTIFY_RUNS.labels("ok").inc()
+    return notified
 
 
-async def notify_expiring_clients(session: AsyncSession, bot) -> int:
+async def _notify_expiring_clients(session: AsyncSession, bot) -> int:
     settings = get_settings()
     now = datetime.utcnow()
     notify_until = now + timedelta(days=settings.expiry_notify_days)
@@ -35,6 +46,7 @@ async def notify_expiring_clients(session: AsyncSession, bot) -> int:
     )
     rows = (await session.execute(stmt)).all()
     notified = 0
+    template = get_texts().get("text_subscription_expiring")
 
     for client, agent in rows:
         if not agent.is_active:
@@ -43,8 +55,7 @@ async def notify_expiring_clients(session: AsyncSession, bot) -> int:
             0, math.ceil((client.expires_at - now).total_seconds() / 86400)
         )
         expires_at = client.expires_at.strftime("%d.%m.%Y")
-        text = _t(
-            settings.text_subscription_expiring,
+        text = template.render(
             username=client.username,
             days_left=days_left,
             expires_at=expires_at,
@@ -53,7 +64,9 @@ async def notify_expiring_clients(session: AsyncSession, bot) -> int:
             await bot.send_message(agent.telegram_id, text, reply_markup=back_to_menu_keyboard())
         except Exception as exc:
             logging.warning("Expiry notify failed for agent %s: %s", agent.telegram_id, exc)
+            metrics.NOTIFICATIONS.labels("failed").inc()
             continue
+        metrics.NOTIFICATIONS.labels("sent").inc()
 
         client.expires_notified_for = client.expires_at
         await session.commit()
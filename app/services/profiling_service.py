@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+
+MODE_SAMPLE = "sample"
+MODE_UPDATES = "updates"
+MODE_SYNC = "sync"
+
+# Получатель результата: (имя файла, содержимое, подпись).
+Deliver = Callable[[str, bytes, str], Awaitable[None]]
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    marker = f"{os.sep}site-packages{os.sep}"
+    if marker in path:
+        path = path.split(marker, 1)[1]
+    else:
+        path = os.path.relpath(path) if os.path.isabs(path) else path
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _fold(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def sample_thread(
+    thread_id: int, seconds: float, interval: float, stop: threading.Event | None = None
+) -> Counter[str]:
+    """Снимает стек потока каждые ``interval`` секунд; результат — свёрнутые стеки для flamegraph.
+
+    ``stop`` прерывает сэмплирование раньше срока.
+    """
+    stop = stop or threading.Event()
+    stacks: Counter[str] = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline and not stop.is_set():
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[_fold(frame)] += 1
+        del frame
+        stop.wait(interval)
+    return stacks
+
+
+def render_folded(stacks: Counter[str]) -> bytes:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()).encode("utf-8")
+
+
+def render_pstats(profile: cProfile.Profile) -> bytes:
+    """Бинарный дамп pstats: открывается snakeviz, flameprof, ``python -m pstats``."""
+    profile.create_stats()
+    return marshal.dumps(profile.stats)
+
+
+def _top_functions(profile: cProfile.Profile, limit: int = 5) -> str:
+    buffer = io.StringIO()
+    stats = pstats.Stats(profile, stream=buffer)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return buffer.getvalue()
+
+
+class _ProfileSession:
+    def __init__(self, mode: str, deliver: Deliver, limit: int) -> None:
+        self.mode = mode
+        self.deliver = deliver
+        self.limit = limit
+        self.started_at = time.monotonic()
+        self.profile: cProfile.Profile | None = None
+        self.updates_started = 0
+        self.updates_finished = 0
+        # threading.Event: его проверяет и поток сэмплирования.
+        self.cancelled = threading.Event()
+
+
+_session: _ProfileSession | None = None
+_background: set[asyncio.Task] = set()
+
+
+def current_mode() -> str | None:
+    return _session.mode if _session else None
+
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _finish(session: _ProfileSession, filename: str, data: bytes, caption: str) -> None:
+    global _session
+    if _session is session:
+        _session = None
+    if session.cancelled.is_set():
+        return
+    try:
+        await session.deliver(filename, data, caption)
+    except Exception:
+        logging.exception("Profile delivery failed")
+
+
+def start_sampling(seconds: float, interval: float, deliver: Deliver) -> bool:
+    """Сэмплирует поток event loop ``seconds`` секунд в отдельном потоке. False, если уже идёт профиль."""
+    global _session
+    if _session is not None:
+        return False
+    session = _ProfileSession(MODE_SAMPLE, deliver, 0)
+    _session = session
+    thread_id = threading.get_ident()
+
+    async def run() -> None:
+        try:
+            stacks = await asyncio.to_thread(sample_thread, thread_id, seconds, interval, session.cancelled)
+        except Exception:
+            logging.exception("Sampling profile failed")
+            stacks = Counter()
+        samples = sum(stacks.values())
+        await _finish(
+            session,
+            f"profile-{int(time.time())}.folded",
+            render_folded(stacks),
+            f"sample {seconds:.0f}s, {samples} samples, {len(stacks)} stacks",
+        )
+
+    _spawn(run())
+    return True
+
+
+def start_updates_profile(count: int, deliver: Deliver) -> bool:
+    """cProfile следующих ``count`` апдейтов (профилируется весь поток, пока они идут)."""
+    global _session
+    if _session is not None:
+        return False
+    _session = _ProfileSession(MODE_UPDATES, deliver, count)
+    return True
+
+
+def start_sync_profile(deliver: Deliver) -> bool:
+    global _session
+    if _session is not None:
+        return False
+    _session = _ProfileSession(MODE_SYNC, deliver, 1)
+    return True
+
+
+def cancel() -> bool:
+    """Останавливает текущий профиль; его результат владельцу уже не отправляется."""
+    global _session
+    if _session is None:
+        return False
+    _session.cancelled.set()
+    if _session.profile is not None:
+        _session.profile.disable()
+    _session = None
+    return True
+
+
+def on_update_start() -> bool:
+    """Вызывается middleware до обработки апдейта; True — апдейт входит в профиль."""
+    session = _session
+    if session is None or session.mode != MODE_UPDATES or session.updates_started >= session.limit:
+        return False
+    if session.profile is None:
+        session.profile = cProfile.Profile()
+        session.profile.enable()
+    session.updates_started += 1
+    return True
+
+
+def on_update_end() -> None:
+    session = _session
+    if session is None or session.mode != MODE_UPDATES or session.profile is None:
+        return
+    session.updates_finished += 1
+    if session.updates_finished < session.limit:
+        return
+    session.profile.disable()
+    elapsed = time.monotonic() - session.started_at
+    logging.info("Update profile finished:\n%s", _top_functions(session.profile))
+    _spawn(
+        _finish(
+            session,
+            f"profile-updates-{int(time.time())}.pstats",
+            render_pstats(session.profile),
+            f"cProfile: {session.updates_finished} updates, {elapsed:.0f}s",
+        )
+    )
+
+
+@asynccontextmanager
+async def sync_cycle_profile() -> AsyncIterator[None]:
+    """Оборачивает цикл синхронизации; профилирует его, если владелец запросил профиль sync."""
+    session = _session
+    if session is None or session.mode != MODE_SYNC:
+        yield
+        return
+    profile = cProfile.Profile()
+    session.profile = profile
+    started = time.monotonic()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        if not session.cancelled.is_set():
+            logging.info("Sync profile finished:\n%s", _top_functions(profile))
+            await _finish(
+                session,
+                f"profile-sync-{int(time.time())}.pstats",
+                render_pstats(profile),
+                f"cProfile: sync cycle, {time.monotonic() - started:.1f}s",
+            )
@@ -6,7 +6,9 @@ import re
 from typing import Any
 
 from app.config import get_settings
+from app.payload_log import PayloadLog, Summary
 from app.remnawave.client import RemnawaveClient
+from app.remnawave.errors import RemnawaveConflict, RemnawaveError, RemnawaveNotFound
 
 
 def _to_iso(dt: datetime) -> str:
@@ -29,6 +31,10 @@ def _unwrap_response(payload: Any) -> Any:
     return payload
 
 
+_PAYLOAD_LOG = PayloadLog("remnawave_payload")
+_RESPONSE_LOG = PayloadLog("remnawave_response")
+
+
 def _normalize_users(payload: Any) -> list[dict[str, Any]]:
     users = _unwrap_response(payload) or []
     if isinstance(users, dict):
@@ -68,6 +74,19 @@ def _to_naive_utc(dt: datetime | None) -> datetime | None:
     return dt.astimezone(timezone.utc).replace(tzinfo=None)
 
 
+def _from_naive_utc(dt: datetime | None) -> datetime | None:
+    if not dt:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _is_stale_uuid_error(exc: Exception) -> bool:
+    # Пользователь удалён или пересоздан в панели: сохранённый uuid больше не годится.
+    return isinstance(exc, (RemnawaveNotFound, RemnawaveConflict))
+
+
 def _clean_payload(payload: dict[str, Any]) -> dict[str, Any]:
     cleaned: dict[str, Any] = {}
     for key, value in payload.items():
@@ -149,12 +168,7 @@ def _build_base_payload(
 
 async def username_exists(username: str) -> bool:
     settings = get_settings()
-    client = RemnawaveClient(
-        settings.remnawave_api_url,
-        settings.remnawave_api_key,
-        settings.remnawave_mode,
-        settings.remnawave_caddy_token,
-    )
+    client = RemnawaveClient.from_settings(settings)
     try:
         users_payload = await client.get_user_by_username(username)
     except Exception as exc:
@@ -170,7 +184,13 @@ async def create_user_only(
     description: str | None,
     telegram_id: int | None = None,
     overrides: dict[str, Any] | None = None,
+    username_checked: bool = False,
 ) -> dict[str, Any]:
+    """Создаёт пользователя панели; ``{"exists": True}``, если username занят.
+
+    ``username_checked`` — занятость уже проверил вызывающий (массовый импорт):
+    поиск by-username пропускается, гонку ловим по 409 от панели.
+    """
     settings = get_settings()
     logging.info(
         "Remnawave create_user_only: username=%s days=%s telegram_id=%s",
@@ -178,28 +198,24 @@ async def create_user_only(
         days,
         telegram_id,
     )
-    client = RemnawaveClient(
-        settings.remnawave_api_url,
-        settings.remnawave_api_key,
-        settings.remnawave_mode,
-        settings.remnawave_caddy_token,
-    )
+    client = RemnawaveClient.from_settings(settings)
 
     if settings.remnawave_internal_squads and not _normalize_uuid_list(settings.internal_squads_set):
         logging.warning("REMNAWAVE_INTERNAL_SQUADS ignored: not UUIDs")
     if settings.remnawave_external_squad and not _normalize_uuid(settings.remnawave_external_squad):
         logging.warning("REMNAWAVE_EXTERNAL_SQUAD ignored: invalid UUID")
 
-    try:
-        users_payload = await client.get_user_by_username(username)
-    except Exception as exc:
-        logging.error("Remnawave get_user_by_username failed: %s", exc)
-        raise
-    users = _normalize_users(users_payload)
-    existing = users[0] if users else None
-    logging.info("Remnawave user lookup: username=%s found=%s", username, bool(existing))
-    if existing:
-        return {"exists": True}
+    if not username_checked:
+        try:
+            users_payload = await client.get_user_by_username(username)
+        except Exception as exc:
+            logging.error("Remnawave get_user_by_username failed: %s", exc)
+            raise
+        users = _normalize_users(users_payload)
+        existing = users[0] if users else None
+        logging.info("Remnawave user lookup: username=%s found=%s", username, bool(existing))
+        if existing:
+            return {"exists": True}
 
     new_expire = _calculate_new_expire(None, days)
     base_payload = _build_base_payload(
@@ -215,16 +231,22 @@ async def create_user_only(
             "expireAt": _to_iso(new_expire),
         }
     )
-    logging.info("Remnawave create_user payload: %s", payload)
+    _PAYLOAD_LOG.log("Remnawave create_user payload: %s", Summary(payload))
     try:
         response = await client.create_user(payload)
+    except RemnawaveConflict:
+        if not username_checked:
+            raise
+        logging.info("Remnawave create_user conflict: username=%s taken", username)
+        return {"exists": True}
     except Exception as exc:
         logging.error("Remnawave create_user failed: %s", exc)
         raise
     unwrapped = _unwrap_response(response)
-    logging.info("Remnawave create_user response: %s", unwrapped)
+    _RESPONSE_LOG.log("Remnawave create_user response: %s", Summary(unwrapped))
     return {
         "response": unwrapped,
+        "uuid": _get_value(unwrapped, "uuid"),
         "expires_at": _to_naive_utc(new_expire),
         "subscription_url": _get_value(unwrapped, "subscriptionUrl", "subscription_url"),
     }
@@ -241,26 +263,50 @@ async def create_or_extend_user(
     description: str | None,
     telegram_id: int | None = None,
     overrides: dict[str, Any] | None = None,
+    uuid: str | None = None,
+    known_expire: datetime | None = None,
 ) -> dict[str, Any]:
+    """Продлевает пользователя панели или создаёт его.
+
+    Если переданы сохранённые ``uuid`` и ``known_expire``, PATCH уходит сразу,
+    без поиска по username; поиск выполняется только при 404/409 от панели.
+    """
     settings = get_settings()
     logging.info(
-        "Remnawave create_or_extend_user: username=%s days=%s telegram_id=%s",
+        "Remnawave create_or_extend_user: username=%s days=%s telegram_id=%s cached_uuid=%s",
         username,
         days,
         telegram_id,
+        bool(uuid),
     )
-    client = RemnawaveClient(
-        settings.remnawave_api_url,
-        settings.remnawave_api_key,
-        settings.remnawave_mode,
-        settings.remnawave_caddy_token,
-    )
+    client = RemnawaveClient.from_settings(settings)
 
     if settings.remnawave_internal_squads and not _normalize_uuid_list(settings.internal_squads_set):
         logging.warning("REMNAWAVE_INTERNAL_SQUADS ignored: not UUIDs")
     if settings.remnawave_external_squad and not _normalize_uuid(settings.remnawave_external_squad):
         logging.warning("REMNAWAVE_EXTERNAL_SQUAD ignored: invalid UUID")
 
+    base_payload = _build_base_payload(
+        settings=settings,
+        description=description,
+        telegram_id=telegram_id,
+        overrides=overrides,
+    )
+
+    if uuid and known_expire:
+        new_expire = _calculate_new_expire(_from_naive_utc(known_expire), days)
+        try:
+            return await _update_user(client, base_payload, uuid, new_expire)
+        except RemnawaveError as exc:
+            if not _is_stale_uuid_error(exc):
+                logging.error("Remnawave update_user failed: %s", exc)
+                raise
+            logging.warning(
+                "Remnawave cached uuid rejected, falling back to lookup: username=%s error=%s",
+                username,
+                exc,
+            )
+
     try:
         users_payload = await client.get_user_by_username(username)
     except Exception as exc:
@@ -272,34 +318,13 @@ async def create_or_extend_user(
 
     current_expire = _parse_dt(_get_value(existing, "expireAt", "expire_at")) if existing else None
     new_expire = _calculate_new_expire(current_expire, days)
-    base_payload = _build_base_payload(
-        settings=settings,
-        description=description,
-        telegram_id=telegram_id,
-        overrides=overrides,
-    )
 
     if existing:
-        payload = _clean_payload(
-            {
-                **base_payload,
-                "uuid": _get_value(existing, "uuid"),
-                "expireAt": _to_iso(new_expire),
-            }
-        )
-        logging.info("Remnawave update_user payload: %s", payload)
         try:
-            response = await client.update_user(payload)
+            return await _update_user(client, base_payload, _get_value(existing, "uuid"), new_expire)
         except Exception as exc:
             logging.error("Remnawave update_user failed: %s", exc)
             raise
-        unwrapped = _unwrap_response(response)
-        logging.info("Remnawave update_user response: %s", unwrapped)
-        return {
-            "response": unwrapped,
-            "expires_at": _to_naive_utc(new_expire),
-            "subscription_url": _get_value(unwrapped, "subscriptionUrl", "subscription_url"),
-        }
 
     payload = _clean_payload(
         {
@@ -308,16 +333,136 @@ async def create_or_extend_user(
             "expireAt": _to_iso(new_expire),
         }
     )
-    logging.info("Remnawave create_user payload: %s", payload)
+    _PAYLOAD_LOG.log("Remnawave create_user payload: %s", Summary(payload))
     try:
         response = await client.create_user(payload)
     except Exception as exc:
         logging.error("Remnawave create_user failed: %s", exc)
         raise
     unwrapped = _unwrap_response(response)
-    logging.info("Remnawave create_user response: %s", unwrapped)
+    _RESPONSE_LOG.log("Remnawave create_user response: %s", Summary(unwrapped))
+    return {
+        "response": unwrapped,
+        "uuid": _get_value(unwrapped, "uuid"),
+        "expires_at": _to_naive_utc(new_expire),
+        "subscription_url": _get_value(unwrapped, "subscriptionUrl", "subscription_url"),
+    }
+
+
+async def update_user_fields(
+    username: str,
+    fields: dict[str, Any],
+    uuid: str | None = None,
+) -> dict[str, Any]:
+    """PATCH произвольных полей пользователя панели (без изменения expireAt)."""
+    settings = get_settings()
+    client = RemnawaveClient.from_settings(settings)
+    if uuid:
+        try:
+            return await _patch_fields(client, uuid, fields)
+        except RemnawaveError as exc:
+            if not _is_stale_uuid_error(exc):
+                logging.error("Remnawave update_user failed: %s", exc)
+                raise
+            logging.warning(
+                "Remnawave cached uuid rejected, falling back to lookup: username=%s error=%s",
+                username,
+                exc,
+            )
+    try:
+        users_payload = await client.get_user_by_username(username)
+    except Exception as exc:
+        logging.error("Remnawave get_user_by_username failed: %s", exc)
+        raise
+    users = _normalize_users(users_payload)
+    if not users:
+        raise LookupError(f"Remnawave user {username} not found")
+    try:
+        return await _patch_fields(client, _get_value(users[0], "uuid"), fields)
+    except Exception as exc:
+        logging.error("Remnawave update_user failed: %s", exc)
+        raise
+
+
+async def extend_user_expire(
+    username: str,
+    days: int,
+    uuid: str | None = None,
+    known_expire: datetime | None = None,
+) -> dict[str, Any]:
+    """Сдвигает только expireAt пользователя панели на ``days`` дней; тариф, лимиты и статус не трогает.
+
+    С сохранёнными ``uuid`` и ``known_expire`` PATCH уходит сразу, иначе срок берётся из панели
+    по username. Пользователя нет в панели — LookupError: создавать его здесь нельзя.
+    """
+    settings = get_settings()
+    client = RemnawaveClient.from_settings(settings)
+    if uuid and known_expire:
+        new_expire = _calculate_new_expire(_from_naive_utc(known_expire), days)
+        try:
+            result = await _patch_fields(client, uuid, {"expireAt": _to_iso(new_expire)})
+            return {**result, "expires_at": result["expires_at"] or _to_naive_utc(new_expire)}
+        except RemnawaveError as exc:
+            if not _is_stale_uuid_error(exc):
+                logging.error("Remnawave update_user failed: %s", exc)
+                raise
+            logging.warning(
+                "Remnawave cached uuid rejected, falling back to lookup: username=%s error=%s",
+                username,
+                exc,
+            )
+    try:
+        users_payload = await client.get_user_by_username(username)
+    except Exception as exc:
+        logging.error("Remnawave get_user_by_username failed: %s", exc)
+        raise
+    users = _normalize_users(users_payload)
+    if not users:
+        raise LookupError(f"Remnawave user {username} not found")
+    current_expire = _parse_dt(_get_value(users[0], "expireAt", "expire_at"))
+    new_expire = _calculate_new_expire(current_expire, days)
+    try:
+        result = await _patch_fields(client, _get_value(users[0], "uuid"), {"expireAt": _to_iso(new_expire)})
+    except Exception as exc:
+        logging.error("Remnawave update_user failed: %s", exc)
+        raise
+    return {**result, "expires_at": result["expires_at"] or _to_naive_utc(new_expire)}
+
+
+async def _patch_fields(client: RemnawaveClient, uuid: str, fields: dict[str, Any]) -> dict[str, Any]:
+    payload = _clean_payload({**fields, "uuid": uuid})
+    _PAYLOAD_LOG.log("Remnawave update_user payload: %s", Summary(payload))
+    response = await client.update_user(payload)
+    unwrapped = _unwrap_response(response)
+    _RESPONSE_LOG.log("Remnawave update_user response: %s", Summary(unwrapped))
+    return {
+        "response": unwrapped,
+        "uuid": _get_value(unwrapped, "uuid") or uuid,
+        "expires_at": _to_naive_utc(_parse_dt(_get_value(unwrapped, "expireAt", "expire_at"))),
+        "subscription_url": _get_value(unwrapped, "subscriptionUrl", "subscription_url"),
+    }
+
+
+async def _update_user(
+    client: RemnawaveClient,
+    base_payload: dict[str, Any],
+    uuid: str,
+    new_expire: datetime,
+) -> dict[str, Any]:
+    payload = _clean_payload(
+        {
+            **base_payload,
+            "uuid": uuid,
+            "expireAt": _to_iso(new_expire),
+        }
+    )
+    _PAYLOAD_LOG.log("Remnawave update_user payload: %s", Summary(payload))
+    response = await client.update_user(payload)
+    unwrapped = _unwrap_response(response)
+    _RESPONSE_LOG.log("Remnawave update_user response: %s", Summary(unwrapped))
     return {
         "response": unwrapped,
+        "uuid": _get_value(unwrapped, "uuid") or uuid,
         "expires_at": _to_naive_utc(new_expire),
         "subscription_url": _get_value(unwrapped, "subscriptionUrl", "subscription_url"),
     }
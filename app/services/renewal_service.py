@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import insert, select, update
+
+from app.db.session import SessionLocal
+from app.models import Agent, Client, DebtEvent, Renewal
+from app.services.client_service import add_days
+from app.services.data_version import bump_agents_version, bump_clients_version
+from app.services.remnawave_service import create_or_extend_user
+from app.services.revenue_service import add_revenue
+from app.services.stats_service import bump_agent_stats
+
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+@dataclass
+class BulkRenewResult:
+    renewed: list[str] = field(default_factory=list)
+    failed: list[tuple[str, str]] = field(default_factory=list)
+    # Продлены в панели, но не записаны в базу: повторное продление добавит дни второй раз.
+    unrecorded: list[str] = field(default_factory=list)
+
+
+async def _store_renewals(items: list[tuple[dict[str, Any], dict[str, Any]]]) -> set[int]:
+    """Одна транзакция на всё продление: клиенты, продления, события долга, долги агентов и сводки.
+
+    Клиенты, удалённые, пока шли запросы к панели, пропускаются; возвращает id записанных.
+    """
+    now = datetime.utcnow()
+    async with SessionLocal() as session:
+        result = await session.execute(select(Client).where(Client.id.in_([item["client_id"] for item, _ in items])))
+        clients = {client.id: client for client in result.scalars().all()}
+        items = [(item, panel) for item, panel in items if item["client_id"] in clients]
+        if not items:
+            return set()
+        debts: Counter[int] = Counter()
+        revenues: Counter[int] = Counter()
+        counts: Counter[int] = Counter()
+        rollup: dict[tuple[int, str], Counter] = defaultdict(Counter)
+        for item, panel in items:
+            client = clients[item["client_id"]]
+            expires_at = panel.get("expires_at") or add_days(client.expires_at, item["days"])
+            client.expires_at = expires_at
+            client.subscription_link = panel.get("subscription_url") or client.subscription_link
+            client.remnawave_uuid = panel.get("uuid") or client.remnawave_uuid
+            client.remnawave_expires_at = expires_at
+            client.monthly_price = item["amount_monthly"]
+            client.last_payment_amount = item["amount_total"]
+            client.last_payment_at = now
+            client.tariff_base_price = item["base_price"]
+            client.tariff_name = item["tariff_name"]
+            agent_id = item["agent_id"]
+            debts[agent_id] += item["owner_share"]
+            revenues[agent_id] += item["amount_total"]
+            counts[agent_id] += 1
+            rollup[(agent_id, item["tariff_name"])].update(
+                renewals=1, revenue=item["amount_total"], owner_share=item["owner_share"]
+            )
+        await session.execute(
+            insert(Renewal),
+            [
+                {
+                    "agent_id": item["agent_id"],
+                    "client_id": item["client_id"],
+                    "days": item["days"],
+                    "debt_amount": item["owner_share"],
+                    "payment_amount": item["amount_total"],
+                    "tariff_name": item["tariff_name"],
+                    "created_at": now,
+                }
+                for item, _ in items
+            ],
+        )
+        await session.execute(
+            insert(DebtEvent),
+            [
+                {
+                    "agent_id": item["agent_id"],
+                    "amount": item["owner_share"],
+                    "reason": f"Продление {item['days']} дней для {clients[item['client_id']].username}",
+                    "created_at": now,
+                }
+                for item, _ in items
+            ],
+        )
+        for agent_id, debt in debts.items():
+            await session.execute(
+                update(Agent)
+                .where(Agent.id == agent_id)
+                .values(current_debt=Agent.current_debt + debt)
+                .execution_options(synchronize_session=False)
+            )
+            await bump_agent_stats(
+                session,
+                agent_id,
+                renewals_count=counts[agent_id],
+                revenue_total=revenues[agent_id],
+                debt_charged_total=debt,
+            )
+        for (agent_id, tariff_name), totals in rollup.items():
+            await add_revenue(session, agent_id, tariff_name, **totals)
+        await session.commit()
+    bump_clients_version(*counts)
+    bump_agents_version()
+    return {item["client_id"] for item, _ in items}
+
+
+async def bulk_extend(
+    items: list[dict[str, Any]],
+    *,
+    concurrency: int,
+    progress: ProgressCallback | None = None,
+) -> BulkRenewResult:
+    """Продлевает клиентов в панели параллельно (не больше ``concurrency``), затем пишет всё одной транзакцией.
+
+    Элемент — словарь как payload JOB_EXTEND; суммы и лимит считает вызывающий.
+    """
+    result = BulkRenewResult()
+    async with SessionLocal() as session:
+        rows = await session.execute(select(Client).where(Client.id.in_([item["client_id"] for item in items])))
+        clients = {client.id: client for client in rows.scalars().all()}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    extended: list[tuple[dict[str, Any], dict[str, Any]]] = []
+    done = 0
+
+    async def extend(item: dict[str, Any]) -> None:
+        nonlocal done
+        client = clients.get(item["client_id"])
+        if client is None:
+            result.failed.append((f"#{item['client_id']}", "client not found"))
+        else:
+            async with semaphore:
+                try:
+                    panel = await create_or_extend_user(
+                        username=client.username,
+                        days=item["days"],
+                        description=item.get("description"),
+                        telegram_id=client.telegram_id,
+                        overrides=item.get("overrides") or {},
+                        uuid=client.remnawave_uuid,
+                        known_expire=client.remnawave_expires_at,
+                    )
+                except Exception as exc:
+                    logging.warning("Bulk renew failed: username=%s error=%s", client.username, exc)
+                    result.failed.append((client.username, str(exc)))
+                else:
+                    extended.append((item, panel))
+        done += 1
+        if progress is not None:
+            await progress(done, len(items))
+
+    await asyncio.gather(*(extend(item) for item in items))
+    if extended:
+        try:
+            stored = await _store_renewals(extended)
+        except Exception:
+            # Панель уже продлена: расхождение сроков поправит синхронизация, долг — только вручную.
+            logging.exception(
+                "Bulk renew store failed after panel update: clients=%s", [item["client_id"] for item, _ in extended]
+            )
+            stored = set()
+        for item, _ in extended:
+            username = clients[item["client_id"]].username
+            if item["client_id"] in stored:
+                result.renewed.append(username)
+            else:
+                result.unrecorded.append(username)
+        if result.unrecorded:
+            logging.error("Bulk renew extended in panel but not recorded: %s", result.unrecorded)
+    logging.info(
+        "Bulk renew finished: renewed=%s failed=%s unrecorded=%s",
+        len(result.renewed),
+        len(result.failed),
+        len(result.unrecorded),
+    )
+    return result
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Agent, Client, Renewal, RevenueDaily
+
+
+ROLLUP_FIELDS = ("renewals", "new_clients", "revenue", "owner_share")
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+def _as_date(value) -> date:
+    # SQLite отдаёт date(...) строкой, Postgres — датой.
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+async def add_revenue(
+    session: AsyncSession,
+    agent_id: int,
+    tariff_name: str | None,
+    *,
+    day: date | None = None,
+    **deltas: int,
+) -> None:
+    """Прибавляет ``deltas`` к дневной сводке (upsert в текущей транзакции; коммитит вызывающий)."""
+    values = {name: int(deltas.get(name, 0)) for name in ROLLUP_FIELDS}
+    if not any(values.values()):
+        return
+    key = {"day": day or _today(), "agent_id": agent_id, "tariff_name": tariff_name or ""}
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        stmt = pg_insert(RevenueDaily)
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(RevenueDaily)
+    else:
+        await _add_revenue_generic(session, key, values)
+        return
+    stmt = stmt.values(**key, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "agent_id", "tariff_name"],
+        set_={name: getattr(RevenueDaily, name) + getattr(stmt.excluded, name) for name in ROLLUP_FIELDS},
+    )
+    await session.execute(stmt)
+
+
+async def _add_revenue_generic(session: AsyncSession, key: dict, values: dict[str, int]) -> None:
+    """UPDATE, а если строки нет — INSERT; для баз без ON CONFLICT."""
+    stmt = (
+        update(RevenueDaily)
+        .where(*(getattr(RevenueDaily, name) == value for name, value in key.items()))
+        .values({name: getattr(RevenueDaily, name) + value for name, value in values.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if (await session.execute(stmt)).rowcount:
+        return
+    try:
+        # Точка сохранения: при гонке за вставку откатывается только она, а не вся транзакция.
+        async with session.begin_nested():
+            await session.execute(insert(RevenueDaily).values(**key, **values))
+    except IntegrityError:
+        await session.execute(stmt)
+
+
+async def backfill_revenue(session: AsyncSession, since: date | None = None) -> int:
+    """Пересобирает сводку из renewals и clients начиная с ``since`` (все дни, если не задано)."""
+    renewal_day = func.date(Renewal.created_at)
+    renewal_tariff = func.coalesce(Renewal.tariff_name, Client.tariff_name, "")
+    renewals = (
+        select(
+            renewal_day,
+            Renewal.agent_id,
+            renewal_tariff,
+            func.count(Renewal.id),
+            func.coalesce(func.sum(Renewal.payment_amount), 0),
+            func.coalesce(func.sum(Renewal.debt_amount), 0),
+        )
+        .outerjoin(Client, Client.id == Renewal.client_id)
+        .group_by(renewal_day, Renewal.agent_id, renewal_tariff)
+    )
+    client_day = func.date(Client.created_at)
+    client_tariff = func.coalesce(Client.tariff_name, "")
+    new_clients = select(client_day, Client.agent_id, client_tariff, func.count(Client.id)).group_by(
+        client_day, Client.agent_id, client_tariff
+    )
+    if since is not None:
+        start = datetime.combine(since, datetime.min.time())
+        renewals = renewals.where(Renewal.created_at >= start)
+        new_clients = new_clients.where(Client.created_at >= start)
+
+    rows: dict[tuple[date, int, str], dict[str, int]] = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    for day, agent_id, tariff, count, revenue, owner_share in (await session.execute(renewals)).all():
+        row = rows[(_as_date(day), agent_id, tariff)]
+        row.update(renewals=count, revenue=int(revenue), owner_share=int(owner_share))
+    for day, agent_id, tariff, count in (await session.execute(new_clients)).all():
+        rows[(_as_date(day), agent_id, tariff)]["new_clients"] = count
+
+    cleanup = delete(RevenueDaily)
+    if since is not None:
+        cleanup = cleanup.where(RevenueDaily.day >= since)
+    await session.execute(cleanup)
+    if rows:
+        await session.execute(
+            insert(RevenueDaily),
+            [
+                {"day": day, "agent_id": agent_id, "tariff_name": tariff, **values}
+                for (day, agent_id, tariff), values in rows.items()
+            ],
+        )
+    await session.commit()
+    return len(rows)
+
+
+async def backfill_revenue_if_empty(session: AsyncSession) -> int:
+    has_rollup = await session.scalar(select(RevenueDaily.id).limit(1))
+    if has_rollup is not None:
+        return 0
+    has_history = await session.scalar(select(Renewal.id).limit(1)) or await session.scalar(
+        select(Client.id).limit(1)
+    )
+    if has_history is None:
+        return 0
+    return await backfill_revenue(session)
+
+
+def _period_start(days: int) -> date:
+    return _today() - timedelta(days=max(1, days) - 1)
+
+
+async def revenue_totals(session: AsyncSession, days: int) -> dict[str, int]:
+    """Суммы за последние ``days`` дней включая сегодня; прибыль агентов = выручка − доля владельца."""
+    result = await session.execute(
+        select(*(func.coalesce(func.sum(getattr(RevenueDaily, name)), 0) for name in ROLLUP_FIELDS)).where(
+            RevenueDaily.day >= _period_start(days)
+        )
+    )
+    totals = dict(zip(ROLLUP_FIELDS, (int(value) for value in result.one())))
+    totals["profit"] = totals["revenue"] - totals["owner_share"]
+    return totals
+
+
+async def revenue_by_agent(session: AsyncSession, days: int, limit: int = 10) -> list[tuple[Agent, int, int, int]]:
+    """Агенты по убыванию выручки за период: (агент, выручка, доля владельца, продления)."""
+    revenue = func.sum(RevenueDaily.revenue)
+    result = await session.execute(
+        select(Agent, revenue, func.sum(RevenueDaily.owner_share), func.sum(RevenueDaily.renewals))
+        .join(Agent, Agent.id == RevenueDaily.agent_id)
+        .where(RevenueDaily.day >= _period_start(days))
+        .group_by(Agent.id)
+        .having(revenue > 0)
+        .order_by(revenue.desc())
+        .limit(limit)
+    )
+    return [(agent, int(total), int(share), int(count)) for agent, total, share, count in result.all()]
+
+
+async def revenue_by_tariff(session: AsyncSession, days: int) -> list[tuple[str, int, int]]:
+    """Тарифы по убыванию выручки за период: (тариф, выручка, продления)."""
+    revenue = func.sum(RevenueDaily.revenue)
+    result = await session.execute(
+        select(RevenueDaily.tariff_name, revenue, func.sum(RevenueDaily.renewals))
+        .where(RevenueDaily.day >= _period_start(days))
+        .group_by(RevenueDaily.tariff_name)
+        .having(revenue > 0)
+        .order_by(revenue.desc())
+    )
+    return [(tariff, int(total), int(count)) for tariff, total, count in result.all()]
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import and_, case, func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import get_settings
+from app.models import Agent, Client
+from app.services.data_version import clients_version
+
+
+TRIGRAM_INDEX = "ix_clients_username_trgm"
+
+# Нечёткий поиск (оператор % из pg_trgm) включается, только если индекс удалось создать.
+_trigram_enabled = False
+
+
+class AgentRef(NamedTuple):
+    name: str | None
+    telegram_username: str | None
+    telegram_id: int
+
+
+class ClientMatch(NamedTuple):
+    id: int
+    username: str
+    agent_id: int
+    expires_at: datetime | None
+    monthly_price: int | None
+    tariff_name: str | None
+    agent: AgentRef
+
+
+async def ensure_trigram_index(engine: AsyncEngine) -> bool:
+    """GIN-индекс pg_trgm по clients.username: ILIKE '%…%' и поиск похожих без полного прохода.
+
+    Нужны права на CREATE EXTENSION; без них поиск работает по подстроке без индекса.
+    """
+    global _trigram_enabled
+    if engine.dialect.name != "postgresql":
+        return False
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(
+                text(f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON clients USING gin (username gin_trgm_ops)")
+            )
+    except Exception as exc:
+        logging.warning("Trigram index unavailable, fuzzy client search disabled: %s", exc)
+        return False
+    _trigram_enabled = True
+    return True
+
+
+class _PrefixCache:
+    """Совпадения по подстроке для недавних запросов.
+
+    Если для запроса «ab» в кеше лежат все совпадения (выборка не упёрлась в лимит),
+    то совпадения для «abc» — их подмножество: уточнение запроса фильтруется в памяти.
+    Запись действительна, пока не изменилась версия клиентов области поиска
+    (см. ``data_version``), и не дольше ``ttl`` секунд.
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[
+            tuple[int | None, str], tuple[float, tuple[int, int], list[ClientMatch], bool]
+        ] = OrderedDict()
+
+    def get(self, scope: int | None, query: str) -> list[ClientMatch] | None:
+        now = time.monotonic()
+        version = clients_version(scope)
+        for end in range(len(query), 0, -1):
+            key = (scope, query[:end])
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            expires_at, entry_version, matches, complete = entry
+            if expires_at <= now or entry_version != version:
+                del self._entries[key]
+                continue
+            if end == len(query):
+                self._entries.move_to_end(key)
+                return matches
+            if complete:
+                self._entries.move_to_end(key)
+                return [match for match in matches if query in match.username.lower()]
+        return None
+
+    def put(self, scope: int | None, query: str, matches: list[ClientMatch], complete: bool) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        self._entries[(scope, query)] = (time.monotonic() + self.ttl, clients_version(scope), matches, complete)
+        self._entries.move_to_end((scope, query))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+_cache: _PrefixCache | None = None
+
+
+def _search_cache() -> _PrefixCache:
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = _PrefixCache(settings.client_search_cache_ttl_seconds, settings.client_search_cache_size)
+    return _cache
+
+
+def _rank(query: str, username: str, client_id: int) -> tuple[int, int, str, int]:
+    # id в конце: username без учёта регистра (и между агентами) повторяется.
+    username = username.lower()
+    if username == query:
+        kind = 0
+    elif username.startswith(query):
+        kind = 1
+    else:
+        kind = 2
+    return kind, len(username), username, client_id
+
+
+def _pack_cursor(match: ClientMatch) -> str:
+    return f"{match.id}:{match.username}"
+
+
+def _unpack_cursor(cursor: str) -> tuple[int, str] | None:
+    client_id, sep, username = cursor.partition(":")
+    if not sep or not client_id.isdigit():
+        return None
+    return int(client_id), username
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _match_query(agent_id: int | None):
+    stmt = select(
+        Client.id,
+        Client.username,
+        Client.agent_id,
+        Client.expires_at,
+        Client.monthly_price,
+        Client.tariff_name,
+        Agent.name,
+        Agent.telegram_username,
+        Agent.telegram_id,
+    ).join(Agent, Agent.id == Client.agent_id)
+    if agent_id is not None:
+        stmt = stmt.where(Client.agent_id == agent_id)
+    return stmt
+
+
+def _to_match(row) -> ClientMatch:
+    return ClientMatch(*row[:6], AgentRef(*row[6:]))
+
+
+async def _substring_matches(
+    session: AsyncSession, query: str, agent_id: int | None, fetch_limit: int
+) -> tuple[list[ClientMatch], bool]:
+    username = func.lower(Client.username)
+    pattern = _escape_like(query)
+    stmt = (
+        _match_query(agent_id)
+        .where(Client.username.ilike(f"%{pattern}%", escape="\\"))
+        # Лучшие совпадения первыми, чтобы обрезанная лимитом выборка их не потеряла.
+        .order_by(
+            case((username == query, 0), (username.like(f"{pattern}%", escape="\\"), 1), else_=2),
+            func.length(Client.username),
+            Client.username,
+            Client.id,
+        )
+        .limit(fetch_limit + 1)
+    )
+    rows = (await session.execute(stmt)).all()
+    return [_to_match(row) for row in rows[:fetch_limit]], len(rows) <= fetch_limit
+
+
+async def _fuzzy_matches(session: AsyncSession, query: str, agent_id: int | None, limit: int) -> list[ClientMatch]:
+    similarity = func.similarity(Client.username, query)
+    stmt = (
+        _match_query(agent_id)
+        .where(Client.username.op("%")(query))
+        .order_by(similarity.desc(), Client.username)
+        .limit(limit)
+    )
+    return [_to_match(row) for row in (await session.execute(stmt)).all()]
+
+
+def _normalize(query: str) -> str:
+    return query.strip().lstrip("@").lower()
+
+
+async def _ranked_matches(session: AsyncSession, query: str, agent_id: int | None) -> list[ClientMatch]:
+    cache = _search_cache()
+    matches = cache.get(agent_id, query)
+    if matches is None:
+        matches, complete = await _substring_matches(
+            session, query, agent_id, get_settings().client_search_cache_rows
+        )
+        cache.put(agent_id, query, matches, complete)
+    return sorted(matches, key=lambda match: _rank(query, match.username, match.id))
+
+
+async def search_clients(
+    session: AsyncSession,
+    query: str,
+    *,
+    agent_id: int | None = None,
+    limit: int = 10,
+) -> list[ClientMatch]:
+    """Клиенты по части username: точное совпадение, начало, подстрока; иначе — похожие (pg_trgm).
+
+    ``agent_id=None`` — по всем агентам (владелец и админы).
+    """
+    query = _normalize(query)
+    if not query:
+        return []
+    matches = await _ranked_matches(session, query, agent_id)
+    if matches:
+        return matches[:limit]
+    if _trigram_enabled:
+        return await _fuzzy_matches(session, query, agent_id, limit)
+    return []
+
+
+async def search_clients_page(
+    session: AsyncSession,
+    query: str,
+    *,
+    agent_id: int | None = None,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> tuple[list[ClientMatch], str | None]:
+    """Страница поиска для inline-запросов: (клиенты, курсор следующей страницы или None).
+
+    Курсор — ``id:username`` последнего клиента страницы: username не уникален
+    (регистр, клиенты разных агентов), поэтому равные username упорядочены по id,
+    и следующая страница — всё, что стоит после пары. Чужой курсор — конец выдачи.
+    Совпадения по подстроке листаются в пределах CLIENT_SEARCH_CACHE_ROWS лучших —
+    дальше запрос стоит уточнить. Пустой запрос листает всех клиентов по алфавиту
+    через индекс (agent_id, username). Похожие по pg_trgm отдаются одной страницей.
+    """
+    query = _normalize(query)
+    after = None
+    if cursor:
+        after = _unpack_cursor(cursor)
+        if after is None:
+            return [], None
+    if not query:
+        stmt = _match_query(agent_id).order_by(Client.username, Client.id).limit(limit + 1)
+        if after:
+            after_id, after_username = after
+            stmt = stmt.where(
+                or_(
+                    Client.username > after_username,
+                    and_(Client.username == after_username, Client.id > after_id),
+                )
+            )
+        rows = (await session.execute(stmt)).all()
+        matches = [_to_match(row) for row in rows[:limit]]
+        more = len(rows) > limit
+    else:
+        ranked = await _ranked_matches(session, query, agent_id)
+        if not ranked and not cursor:
+            if _trigram_enabled:
+                return await _fuzzy_matches(session, query, agent_id, limit), None
+            return [], None
+        if after:
+            after_id, after_username = after
+            last = _rank(query, after_username, after_id)
+            ranked = [match for match in ranked if _rank(query, match.username, match.id) > last]
+        matches = ranked[:limit]
+        more = len(ranked) > limit
+    return matches, _pack_cursor(matches[-1]) if more and matches else None
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics
+from app.models import Agent, AgentStats, Client, DebtEvent, Renewal
+
+
+STAT_FIELDS = (
+    "clients_count",
+    "renewals_count",
+    "revenue_total",
+    "debt_charged_total",
+    "debt_paid_total",
+)
+
+
+async def bump_agent_stats(session: AsyncSession, agent_id: int, **deltas: int) -> None:
+    """Атомарно прибавляет ``deltas`` к сводке агента в текущей транзакции; коммитит вызывающий.
+
+    Строки нет (агент создан до появления таблицы) — пропускаем: её создаст проверка сводок.
+    """
+    values = {name: getattr(AgentStats, name) + delta for name, delta in deltas.items() if delta}
+    if not values:
+        return
+    result = await session.execute(
+        update(AgentStats)
+        .where(AgentStats.agent_id == agent_id)
+        .values(**values, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        logging.info("Agent stats row missing for agent %s, left to consistency check", agent_id)
+
+
+def _stats_query(agent_id: int | None = None):
+    """Сводки по исходным таблицам рядом с сохранёнными — одним запросом, то есть из одного снимка базы.
+
+    Колонки: id агента, ``STAT_FIELDS`` посчитанные, затем ``STAT_FIELDS`` из agent_stats
+    (NULL, если строки нет).
+    """
+    clients = select(Client.agent_id, func.count(Client.id).label("clients_count")).group_by(Client.agent_id)
+    renewals = select(
+        Renewal.agent_id,
+        func.count(Renewal.id).label("renewals_count"),
+        func.sum(Renewal.payment_amount).label("revenue_total"),
+    ).group_by(Renewal.agent_id)
+    debts = select(
+        DebtEvent.agent_id,
+        func.sum(case((DebtEvent.amount > 0, DebtEvent.amount), else_=0)).label("debt_charged_total"),
+        func.sum(case((DebtEvent.amount < 0, -DebtEvent.amount), else_=0)).label("debt_paid_total"),
+    ).group_by(DebtEvent.agent_id)
+    stmt = select(Agent.id)
+    if agent_id is not None:
+        stmt = stmt.where(Agent.id == agent_id)
+        clients = clients.where(Client.agent_id == agent_id)
+        renewals = renewals.where(Renewal.agent_id == agent_id)
+        debts = debts.where(DebtEvent.agent_id == agent_id)
+    clients, renewals, debts = clients.subquery(), renewals.subquery(), debts.subquery()
+    sources = {
+        "clients_count": clients,
+        "renewals_count": renewals,
+        "revenue_total": renewals,
+        "debt_charged_total": debts,
+        "debt_paid_total": debts,
+    }
+    return (
+        stmt.add_columns(
+            *(func.coalesce(sources[name].c[name], 0) for name in STAT_FIELDS),
+            *(getattr(AgentStats, name) for name in STAT_FIELDS),
+        )
+        .outerjoin(clients, clients.c.agent_id == Agent.id)
+        .outerjoin(renewals, renewals.c.agent_id == Agent.id)
+        .outerjoin(debts, debts.c.agent_id == Agent.id)
+        .outerjoin(AgentStats, AgentStats.agent_id == Agent.id)
+    )
+
+
+def _split_row(row) -> tuple[int, dict[str, int], dict[str, int] | None]:
+    size = len(STAT_FIELDS)
+    actual = {name: int(value or 0) for name, value in zip(STAT_FIELDS, row[1 : 1 + size])}
+    stored_values = row[1 + size :]
+    stored = None if stored_values[0] is None else dict(zip(STAT_FIELDS, stored_values))
+    return row[0], actual, stored
+
+
+async def _actual_stats(session: AsyncSession, agent_id: int | None = None) -> dict[int, dict[str, int]]:
+    """Сводки, посчитанные по исходным таблицам: одним запросом вместо запроса на агента."""
+    rows = (await session.execute(_stats_query(agent_id))).all()
+    return {owner_id: actual for owner_id, actual, _ in map(_split_row, rows)}
+
+
+async def refresh_agent_stats(session: AsyncSession, agent_id: int) -> None:
+    """Пересчитывает сводку одного агента (после удалений, где дельту считать неудобно)."""
+    actual = (await _actual_stats(session, agent_id)).get(agent_id)
+    if actual is None:
+        return
+    stats = await session.get(AgentStats, agent_id)
+    if stats is None:
+        session.add(AgentStats(agent_id=agent_id, **actual))
+        return
+    for name, value in actual.items():
+        setattr(stats, name, value)
+    stats.updated_at = datetime.utcnow()
+
+
+async def check_agent_stats(session: AsyncSession) -> int:
+    """Сверяет сводки с исходными таблицами, чинит расхождения; возвращает число исправленных агентов.
+
+    Посчитанное и сохранённое читаются одним запросом, а расхождение прибавляется к строке
+    как дельта: продление, закоммиченное после чтения, своё приращение не потеряет.
+    """
+    fixed = 0
+    for agent_id, actual, stored in map(_split_row, (await session.execute(_stats_query())).all()):
+        if stored is None:
+            session.add(AgentStats(agent_id=agent_id, **actual))
+            fixed += 1
+            continue
+        drift = {name: value - stored[name] for name, value in actual.items() if value != stored[name]}
+        if not drift:
+            continue
+        logging.warning(
+            "Agent stats drift for agent %s: %s",
+            agent_id,
+            {name: (stored[name], actual[name]) for name in drift},
+        )
+        await bump_agent_stats(session, agent_id, **drift)
+        fixed += 1
+    # Сводки удалённых агентов.
+    result = await session.execute(
+        delete(AgentStats)
+        .where(AgentStats.agent_id.not_in(select(Agent.id)))
+        .execution_options(synchronize_session=False)
+    )
+    fixed += result.rowcount or 0
+    if fixed:
+        await session.commit()
+        metrics.AGENT_STATS_FIXED.inc(fixed)
+    return fixed
+
+
+async def get_agent_stats(session: AsyncSession, agent_id: int) -> AgentStats | None:
+    return await session.get(AgentStats, agent_id)
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import time
+from collections import Counter
 from datetime import datetime, timezone
 
 from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import metrics
 from app.models import Client
 from app.remnawave.client import RemnawaveClient
+from app.services.data_version import bump_clients_version
+from app.services.stats_service import bump_agent_stats
 
 
 def _parse_expire(value: str | None) -> datetime | None:
@@ -16,6 +21,29 @@ def _parse_expire(value: str | None) -> datetime | None:
     return dt.replace(tzinfo=None)
 
 
+def _apply_panel_user(client: Client, panel_user: dict) -> tuple[int, bool]:
+    """Переносит данные панели в клиента: (видимые изменения, обновлён ли кеш uuid/expireAt)."""
+    updated = 0
+    expire_at = _parse_expire(panel_user.get("expireAt"))
+    subscription_url = panel_user.get("subscriptionUrl")
+    if expire_at and expire_at != client.expires_at:
+        client.expires_at = expire_at
+        updated += 1
+    if subscription_url and subscription_url != client.subscription_link:
+        client.subscription_link = subscription_url
+        updated += 1
+
+    refreshed = False
+    uuid = panel_user.get("uuid")
+    if uuid and uuid != client.remnawave_uuid:
+        client.remnawave_uuid = uuid
+        refreshed = True
+    if expire_at and expire_at != client.remnawave_expires_at:
+        client.remnawave_expires_at = expire_at
+        refreshed = True
+    return updated, refreshed
+
+
 async def sync_clients_with_remnawave(
     session: AsyncSession,
     agent_id: int,
@@ -29,6 +57,7 @@ async def sync_clients_with_remnawave(
 
     removed = 0
     updated = 0
+    refreshed = False
     for client in clients:
         username = client.username
         if not username:
@@ -43,23 +72,40 @@ async def sync_clients_with_remnawave(
             continue
 
         panel_user = users[0]
-        expire_at = _parse_expire(panel_user.get("expireAt"))
-        subscription_url = panel_user.get("subscriptionUrl")
-        if expire_at and expire_at != client.expires_at:
-            client.expires_at = expire_at
-            updated += 1
-        if subscription_url and subscription_url != client.subscription_link:
-            client.subscription_link = subscription_url
-            updated += 1
+        changed, cached = _apply_panel_user(client, panel_user)
+        updated += changed
+        refreshed = refreshed or cached
 
-    if removed or updated:
+    if removed:
+        await bump_agent_stats(session, agent_id, clients_count=-removed)
+    if removed or updated or refreshed:
         await session.commit()
+    if removed or updated:
+        bump_clients_version(agent_id)
     return removed, updated
 
 
 async def sync_all_clients_with_remnawave(
     session: AsyncSession,
     remnawave_client: RemnawaveClient,
+) -> tuple[int, int]:
+    started = time.perf_counter()
+    try:
+        removed, updated = await _sync_all_clients(session, remnawave_client)
+    except Exception:
+        metrics.SYNC_RUNS.labels("error").inc()
+        raise
+    finally:
+        metrics.SYNC_DURATION.observe(time.perf_counter() - started)
+    metrics.SYNC_RUNS.labels("ok").inc()
+    metrics.SYNC_ROWS.labels("removed").inc(removed)
+    metrics.SYNC_ROWS.labels("updated").inc(updated)
+    return removed, updated
+
+
+async def _sync_all_clients(
+    session: AsyncSession,
+    remnawave_client: RemnawaveClient,
 ) -> tuple[int, int]:
     result = await session.execute(select(Client))
     clients = list(result.scalars().all())
@@ -68,6 +114,9 @@ async def sync_all_clients_with_remnawave(
 
     removed = 0
     updated = 0
+    refreshed = False
+    removed_by_agent: Counter[int] = Counter()
+    changed_agents: set[int] = set()
     for client in clients:
         username = client.username
         if not username:
@@ -78,19 +127,22 @@ async def sync_all_clients_with_remnawave(
             users = [users]
         if not users:
             await session.execute(delete(Client).where(Client.id == client.id))
+            removed_by_agent[client.agent_id] += 1
             removed += 1
             continue
 
         panel_user = users[0]
-        expire_at = _parse_expire(panel_user.get("expireAt"))
-        subscription_url = panel_user.get("subscriptionUrl")
-        if expire_at and expire_at != client.expires_at:
-            client.expires_at = expire_at
-            updated += 1
-        if subscription_url and subscription_url != client.subscription_link:
-            client.subscription_link = subscription_url
-            updated += 1
-
-    if removed or updated:
+        changed, cached = _apply_panel_user(client, panel_user)
+        updated += changed
+        refreshed = refreshed or cached
+        if changed:
+            changed_agents.add(client.agent_id)
+
+    for agent_id, count in removed_by_agent.items():
+        await bump_agent_stats(session, agent_id, clients_count=-count)
+    if removed or updated or refreshed:
         await session.commit()
+    changed_agents.update(removed_by_agent)
+    if changed_agents:
+        bump_clients_version(*changed_agents)
     return removed, updated
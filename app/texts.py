@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import logging
+from string import Formatter
+from typing import Callable
+
+from app.config import Settings, get_settings
+
+
+TEXT_PREFIXES = ("text_", "btn_")
+_ADHOC_CACHE_SIZE = 256
+_FORMATTER = Formatter()
+
+
+def _parse_fields(text: str) -> frozenset[str]:
+    fields: set[str] = set()
+    for _literal, field_name, _spec, _conversion in _FORMATTER.parse(text):
+        if field_name is None:
+            continue
+        root = field_name.split(".", 1)[0].split("[", 1)[0]
+        if not root or root.isdigit():
+            raise ValueError("positional placeholders are not supported")
+        fields.add(root)
+    return frozenset(fields)
+
+
+class TextTemplate:
+    __slots__ = ("name", "text", "fields", "static")
+
+    def __init__(self, name: str | None, raw: str, fields: frozenset[str] | None = None) -> None:
+        self.name = name
+        self.text = raw.replace("\\n", "\n")
+        self.fields = _parse_fields(self.text) if fields is None else fields
+        # Без плейсхолдеров и экранированных скобок format() ничего не меняет.
+        self.static = not self.fields and "{" not in self.text and "}" not in self.text
+
+    def render(self, **kwargs) -> str:
+        if not kwargs or self.static:
+            return self.text
+        return self.text.format(**kwargs)
+
+
+class TextCatalog:
+    """Нормализованные и проверенные шаблоны всех text_*/btn_* настроек."""
+
+    def __init__(self, settings: Settings) -> None:
+        self.templates: dict[str, TextTemplate] = {}
+        self.errors: list[str] = []
+        self._by_raw: dict[str, TextTemplate] = {}
+        self._adhoc: dict[str, TextTemplate] = {}
+        for name, field in Settings.model_fields.items():
+            if not name.startswith(TEXT_PREFIXES):
+                continue
+            raw = getattr(settings, name)
+            if not isinstance(raw, str):
+                continue
+            template = self._compile(name, raw, field.default)
+            self.templates[name] = template
+            self._by_raw.setdefault(raw, template)
+
+    def _compile(self, name: str, raw: str, default: object) -> TextTemplate:
+        default_template = TextTemplate(name, default) if isinstance(default, str) else None
+        try:
+            template = TextTemplate(name, raw)
+        except ValueError as exc:
+            return self._fallback(name, f"invalid template: {exc}", default_template)
+        if default_template is not None:
+            unknown = template.fields - default_template.fields
+            if unknown:
+                return self._fallback(
+                    name, f"unknown placeholders {sorted(unknown)}", default_template
+                )
+        return template
+
+    def _fallback(self, name: str, reason: str, default_template: TextTemplate | None) -> TextTemplate:
+        self.errors.append(f"{name.upper()}: {reason}")
+        logging.error("Text %s rejected (%s), using default", name.upper(), reason)
+        if default_template is None:
+            return TextTemplate(name, "")
+        return default_template
+
+    def get(self, name: str) -> TextTemplate:
+        return self.templates[name]
+
+    def render(self, name: str, **kwargs) -> str:
+        return self.templates[name].render(**kwargs)
+
+    def render_raw(self, value: str, **kwargs) -> str:
+        template = self._by_raw.get(value)
+        if template is None:
+            template = self._adhoc_template(value)
+        return template.render(**kwargs)
+
+    def _adhoc_template(self, value: str) -> TextTemplate:
+        template = self._adhoc.get(value)
+        if template is not None:
+            return template
+        try:
+            template = TextTemplate(None, value)
+        except ValueError:
+            # Сломанный шаблон вне настроек: ошибку покажет format(), как и раньше.
+            template = TextTemplate(None, value, fields=frozenset({"?"}))
+        if len(self._adhoc) >= _ADHOC_CACHE_SIZE:
+            self._adhoc.clear()
+        self._adhoc[value] = template
+        return template
+
+
+_catalog: TextCatalog | None = None
+_reload_hooks: list[Callable[[], None]] = []
+
+
+def get_texts() -> TextCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = TextCatalog(get_settings())
+    return _catalog
+
+
+def reload_texts() -> TextCatalog:
+    global _catalog
+    get_settings.cache_clear()
+    _catalog = TextCatalog(get_settings())
+    for hook in list(_reload_hooks):
+        try:
+            hook()
+        except Exception:
+            logging.exception("Texts reload hook failed")
+    logging.info("Texts reloaded: templates=%s errors=%s", len(_catalog.templates), len(_catalog.errors))
+    return _catalog
+
+
+def on_texts_reload(hook: Callable[[], None]) -> Callable[[], None]:
+    _reload_hooks.append(hook)
+    return hook
+
+
+def _t(value: str, **kwargs) -> str:
+    return get_texts().render_raw(value, **kwargs)
@@ -0,0 +1,144 @@
+"""Сравнение маршрутизации callback-запросов: цепочка lambda-фильтров против таблицы.
+
+Запуск: python -m benchmarks.bench_callback_routing [--updates 20000]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from app.bot.callbacks import ACTIONS, CallbackAction, CallbackTable
+
+
+# Порядок модулей и легаси-префиксы повторяют прежнюю раскладку хендлеров.
+_LEGACY_MODULES = (
+    ("menu", ("cancel", "menu", "vpn", "tariffs", "balance")),
+    ("clients", ("client", "skip:tg", "tariff", "amount:new")),
+    ("renewals", ("renew", "skip:days", "amount:renew")),
+    ("imports", ("import",)),
+    ("payments", ("debt", "transfer")),
+    ("owner", ("owner",)),
+)
+
+
+async def _noop(*_args, **_kwargs) -> None:
+    return None
+
+
+def _module_of(action: CallbackAction) -> str:
+    if action.legacy == "client:renew":
+        return "renewals"
+    for module, prefixes in _LEGACY_MODULES:
+        for prefix in prefixes:
+            if action.legacy == prefix or action.legacy.startswith(prefix + ":"):
+                return module
+    # Новые действия без записи выше — в отдельный роутер по первому слову, в конец цепочки.
+    return action.legacy.split(":", 1)[0]
+
+
+def _legacy_filter(action: CallbackAction):
+    if action.fields:
+        prefix = action.legacy + ":"
+        return lambda call: call.data.startswith(prefix)
+    legacy = action.legacy
+    return lambda call: call.data == legacy
+
+
+def build_linear_dispatcher() -> Dispatcher:
+    routers = {module: Router(name=module) for module, _ in _LEGACY_MODULES}
+    for action in ACTIONS:
+        module = _module_of(action)
+        if module not in routers:
+            routers[module] = Router(name=module)
+        routers[module].callback_query.register(_noop, _legacy_filter(action))
+    dp = Dispatcher(storage=MemoryStorage())
+    root = Router()
+    for router in routers.values():
+        root.include_router(router)
+    dp.include_router(root)
+    return dp
+
+
+def build_table_dispatcher() -> tuple[Dispatcher, CallbackTable]:
+    table = CallbackTable(ACTIONS, name="bench_callbacks")
+    for action in ACTIONS:
+        table.route(action)(_noop)
+    dp = Dispatcher(storage=MemoryStorage())
+    root = Router()
+    for module, _ in _LEGACY_MODULES:
+        root.include_router(Router(name=module))
+    root.include_router(table.router)
+    dp.include_router(root)
+    return dp, table
+
+
+def _sample_payloads(legacy: bool) -> list[str]:
+    payloads = []
+    for action in ACTIONS:
+        values = tuple(7 for _ in action.fields)
+        if legacy:
+            payloads.append(":".join([action.legacy, *map(str, values)]))
+        else:
+            payloads.append(action.pack(*values))
+    return payloads
+
+
+def _make_update(update_id: int, data: str) -> Update:
+    user = User(id=100, is_bot=False, first_name="bench")
+    chat = Chat(id=100, type="private")
+    message = Message(message_id=1, date=datetime.now(), chat=chat, text="menu")
+    call = CallbackQuery(id=str(update_id), from_user=user, chat_instance="bench", message=message, data=data)
+    return Update(update_id=update_id, callback_query=call)
+
+
+async def _time_feed(dp: Dispatcher, bot: Bot, payloads: list[str], count: int) -> float:
+    updates = [_make_update(i, payloads[i % len(payloads)]) for i in range(count)]
+    started = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def _time_resolve(table: CallbackTable, payloads: list[str], count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        table.resolve(payloads[i % len(payloads)])
+    return (time.perf_counter() - started) / count * 1e6
+
+
+async def main(count: int) -> None:
+    bot = Bot(token="42:TEST")
+    linear_dp = build_linear_dispatcher()
+    table_dp, table = build_table_dispatcher()
+    legacy_payloads = _sample_payloads(legacy=True)
+    compact_payloads = _sample_payloads(legacy=False)
+    last_legacy = legacy_payloads[-1:]
+    last_compact = compact_payloads[-1:]
+
+    rows = [
+        ("linear, all actions", await _time_feed(linear_dp, bot, legacy_payloads, count)),
+        ("linear, last action", await _time_feed(linear_dp, bot, last_legacy, count)),
+        ("table, all actions", await _time_feed(table_dp, bot, compact_payloads, count)),
+        ("table, last action", await _time_feed(table_dp, bot, last_compact, count)),
+        ("table, legacy payloads", await _time_feed(table_dp, bot, legacy_payloads, count)),
+        ("resolve() compact", _time_resolve(table, compact_payloads, count)),
+        ("resolve() legacy", _time_resolve(table, legacy_payloads, count)),
+    ]
+    await bot.session.close()
+
+    print(f"actions={len(ACTIONS)} updates={count}")
+    for name, micros in rows:
+        print(f"{name:<26} {micros:9.2f} us/update")
+    sizes = [len(p) for p in compact_payloads], [len(p) for p in legacy_payloads]
+    print(f"payload bytes: compact max={max(sizes[0])} legacy max={max(sizes[1])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().updates))
@@ -0,0 +1,180 @@
+"""Бенчмарк горячих путей: синхронизация с панелью, уведомления, список агентов, список клиентов.
+
+Для каждого размера база пересоздаётся и заполняется синтетическими клиентами,
+панель имитируется FakePanel, Telegram — заглушкой без сети.
+
+Запуск:
+    python -m benchmarks.bench_hot_paths [--sizes 1000 10000 100000]
+        [--database-url postgresql+asyncpg://...] [--output results.json] [--baseline old.json]
+
+По умолчанию используется SQLite-файл во временном каталоге.
+"""
+
+from __future__ import annotations
+
+# harness подставляет переменные окружения, поэтому импортируется раньше app.
+from benchmarks import harness
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from aiogram.types import CallbackQuery
+
+from app.bot.handlers.clients import _render_clients_list
+from app.config import get_settings
+from app.db.session import SessionLocal
+from app.remnawave.client import RemnawaveClient
+from app.services.agent_service import list_agents
+from app.services.notify_service import notify_expiring_clients
+from app.services.sync_service import sync_all_clients_with_remnawave
+
+
+PATHS = ("list_agents", "render_clients_owner", "render_clients_agent", "notify", "sync")
+
+
+def _callback(bot, user_id: int) -> CallbackQuery:
+    return CallbackQuery.model_validate(
+        {
+            "id": "bench",
+            "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+            "chat_instance": "bench",
+            "data": "bench",
+            "message": {
+                "message_id": 1,
+                "date": int(datetime.now().timestamp()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "menu",
+            },
+        },
+        context={"bot": bot},
+    )
+
+
+async def _list_agents() -> int:
+    async with SessionLocal() as session:
+        return len(await list_agents(session))
+
+
+async def _notify(bot) -> int:
+    async with SessionLocal() as session:
+        return await notify_expiring_clients(session, bot)
+
+
+async def _sync() -> tuple[int, int]:
+    async with SessionLocal() as session:
+        return await sync_all_clients_with_remnawave(session, RemnawaveClient.from_settings(get_settings()))
+
+
+async def run_size(args, size: int) -> list[dict]:
+    agents = max(1, size // args.clients_per_agent)
+    engine = await harness.use_database(args.database_url)
+    await harness.seed_clients(size, agents)
+    panel = harness.make_panel(size, latency=args.panel_latency)
+    bot, telegram = harness.make_bot()
+    owner_call = _callback(bot, get_settings().owner_telegram_id)
+    agent_call = _callback(bot, harness.AGENT_TELEGRAM_ID_BASE)
+
+    runs = {
+        "list_agents": _list_agents,
+        "render_clients_owner": lambda: _render_clients_list(owner_call, page=1),
+        "render_clients_agent": lambda: _render_clients_list(agent_call, page=1),
+        "notify": lambda: _notify(bot),
+        "sync": _sync,
+    }
+    results = []
+    with panel.install():
+        # Порядок важен: notify и sync меняют данные, поэтому идут последними.
+        for name in PATHS:
+            if name not in args.paths:
+                continue
+            measurement = await harness.measure(
+                name,
+                size,
+                runs[name],
+                engine=engine,
+                panel=panel,
+                telegram=telegram,
+                trace_memory=not args.no_memory,
+            )
+            measurement.detail["agents"] = agents
+            results.append(measurement.as_dict())
+            peak = f"{measurement.peak_memory_kb:.0f}KB" if measurement.peak_memory_kb is not None else "-"
+            print(
+                f"{name:<22} n={size:<7} {measurement.wall_seconds:9.3f}s "
+                f"sql={measurement.queries:<7} http={measurement.http_calls:<7} "
+                f"tg={measurement.telegram_calls:<6} peak={peak}",
+                flush=True,
+            )
+    await bot.session.close()
+    await engine.dispose()
+    return results
+
+
+def _compare(results: list[dict], baseline_path: Path) -> None:
+    baseline = {
+        (row["name"], row["size"]): row for row in json.loads(baseline_path.read_text())["results"]
+    }
+    print(f"\nсравнение с {baseline_path}:")
+    for row in results:
+        old = baseline.get((row["name"], row["size"]))
+        if not old or not old["wall_seconds"]:
+            continue
+        ratio = row["wall_seconds"] / old["wall_seconds"]
+        print(
+            f"{row['name']:<22} n={row['size']:<7} time x{ratio:5.2f} "
+            f"sql {old['queries']}->{row['queries']} http {old['http_calls']}->{row['http_calls']}"
+        )
+
+
+async def main(args) -> None:
+    logging.basicConfig(level=logging.WARNING)
+    # Логи на каждый запрос к панели искажают время.
+    logging.getLogger().setLevel(logging.WARNING)
+    results = []
+    for size in args.sizes:
+        results.extend(await run_size(args, size))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "database": args.database_url.split("://", 1)[0],
+            "python": platform.python_version(),
+            "sizes": args.sizes,
+            "clients_per_agent": args.clients_per_agent,
+            "panel_latency": args.panel_latency,
+            "trace_memory": not args.no_memory,
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"результаты: {args.output}")
+    if args.baseline:
+        _compare(results, Path(args.baseline))
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=list(PATHS))
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--clients-per-agent", type=int, default=200)
+    parser.add_argument("--panel-latency", type=float, default=0.0)
+    parser.add_argument("--no-memory", action="store_true", help="без tracemalloc: точнее время")
+    parser.add_argument("--output")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        args.database_url = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='agenthub-bench-')}/bench.db"
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args(sys.argv[1:])))
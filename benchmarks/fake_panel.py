@@ -0,0 +1,197 @@
+"""Имитация панели Remnawave для бенчмарков и локальных проверок без реальной панели.
+
+Реализует эндпоинты, которые использует RemnawaveClient:
+GET /api/users (size/start), GET /api/users/by-username/{username},
+GET /api/users/by-telegram-id/{id}, POST /api/users, PATCH /api/users.
+Задержка, доля ошибок и таймаутов и размер набора пользователей настраиваются.
+
+    panel = FakePanel(users=10_000, latency=0.02, error_rate=0.01)
+    with panel.install():
+        await sync_all_clients_with_remnawave(session, RemnawaveClient.from_settings(get_settings()))
+    print(panel.calls)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+import uuid as uuid_lib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterator
+from unittest import mock
+
+import httpx
+
+
+_BY_USERNAME = re.compile(r"^/api/users/by-username/(?P<username>[^/]+)$")
+_BY_TELEGRAM_ID = re.compile(r"^/api/users/by-telegram-id/(?P<telegram_id>-?\d+)$")
+
+
+def _iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakePanel:
+    def __init__(
+        self,
+        users: int = 0,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        timeout_rate: float = 0.0,
+        username_prefix: str = "user",
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.timeout_rate = timeout_rate
+        self.random = random.Random(seed)
+        self.users_by_uuid: dict[str, dict[str, Any]] = {}
+        self.users_by_username: dict[str, dict[str, Any]] = {}
+        self.calls: Counter[str] = Counter()
+        self.listeners: list[Callable[[str], None]] = []
+        self.seed_users(users, prefix=username_prefix)
+
+    # --- данные ---
+
+    def add_user(
+        self,
+        username: str,
+        *,
+        expire_at: datetime | None = None,
+        telegram_id: int | None = None,
+        **fields: Any,
+    ) -> dict[str, Any]:
+        user_uuid = str(uuid_lib.UUID(int=self.random.getrandbits(128), version=4))
+        expire_at = expire_at or datetime.now(timezone.utc) + timedelta(days=30)
+        user = {
+            "uuid": user_uuid,
+            "shortUuid": user_uuid[:8],
+            "username": username,
+            "status": "ACTIVE",
+            "expireAt": _iso(expire_at),
+            "telegramId": telegram_id,
+            "subscriptionUrl": f"https://panel.local/sub/{user_uuid[:8]}",
+            "trafficLimitBytes": 0,
+            "trafficLimitStrategy": "MONTH",
+            "createdAt": _iso(datetime.now(timezone.utc)),
+            **fields,
+        }
+        self.users_by_uuid[user_uuid] = user
+        self.users_by_username[username] = user
+        return user
+
+    def seed_users(self, count: int, prefix: str = "user") -> list[dict[str, Any]]:
+        """Добавляет ``count`` пользователей ``{prefix}{n}`` со сроком от -10 до +60 дней."""
+        now = datetime.now(timezone.utc)
+        start = len(self.users_by_username)
+        return [
+            self.add_user(
+                f"{prefix}{start + n}",
+                expire_at=now + timedelta(days=self.random.randint(-10, 60)),
+                telegram_id=10_000_000 + start + n if n % 2 == 0 else None,
+            )
+            for n in range(count)
+        ]
+
+    def remove_user(self, username: str) -> None:
+        user = self.users_by_username.pop(username, None)
+        if user:
+            self.users_by_uuid.pop(user["uuid"], None)
+
+    # --- транспорт ---
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    @contextmanager
+    def install(self) -> Iterator[FakePanel]:
+        """Направляет все httpx.AsyncClient процесса в эту панель (RemnawaveClient создаёт их сам)."""
+        original = httpx.AsyncClient
+        transport = self.transport()
+
+        def factory(*args: Any, **kwargs: Any) -> httpx.AsyncClient:
+            kwargs["transport"] = transport
+            return original(*args, **kwargs)
+
+        with mock.patch.object(httpx, "AsyncClient", factory):
+            yield self
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        route = self._route_name(request)
+        self.calls[route] += 1
+        for listener in self.listeners:
+            listener(route)
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+        if self.timeout_rate and self.random.random() < self.timeout_rate:
+            self.calls["timeout"] += 1
+            raise httpx.ReadTimeout("fake panel timeout", request=request)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.calls["error"] += 1
+            return httpx.Response(self.error_status, json={"message": "fake panel error"})
+        handler = getattr(self, f"_handle_{route}", None)
+        if handler is None:
+            return httpx.Response(404, json={"message": f"Cannot {request.method} {request.url.path}"})
+        return handler(request)
+
+    def _route_name(self, request: httpx.Request) -> str:
+        path = request.url.path
+        if path == "/api/users":
+            return {"GET": "list", "POST": "create", "PATCH": "update"}.get(request.method, "unknown")
+        if request.method == "GET" and _BY_USERNAME.match(path):
+            return "by_username"
+        if request.method == "GET" and _BY_TELEGRAM_ID.match(path):
+            return "by_telegram_id"
+        return "unknown"
+
+    def _handle_list(self, request: httpx.Request) -> httpx.Response:
+        size = int(request.url.params.get("size", 25))
+        start = int(request.url.params.get("start", 0))
+        users = list(self.users_by_uuid.values())
+        return httpx.Response(
+            200, json={"response": {"users": users[start : start + size], "total": len(users)}}
+        )
+
+    def _handle_by_username(self, request: httpx.Request) -> httpx.Response:
+        username = _BY_USERNAME.match(request.url.path).group("username")
+        user = self.users_by_username.get(username)
+        if user is None:
+            return httpx.Response(404, json={"message": "User not found", "errorCode": "A063"})
+        return httpx.Response(200, json={"response": user})
+
+    def _handle_by_telegram_id(self, request: httpx.Request) -> httpx.Response:
+        telegram_id = int(_BY_TELEGRAM_ID.match(request.url.path).group("telegram_id"))
+        users = [user for user in self.users_by_uuid.values() if user.get("telegramId") == telegram_id]
+        if not users:
+            return httpx.Response(404, json={"message": "Users not found", "errorCode": "A063"})
+        return httpx.Response(200, json={"response": users})
+
+    def _handle_create(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content or b"{}")
+        username = payload.pop("username", None)
+        if not username:
+            return httpx.Response(400, json={"message": "username is required"})
+        if username in self.users_by_username:
+            return httpx.Response(400, json={"message": "User username already exists", "errorCode": "A019"})
+        expire_raw = payload.pop("expireAt", None)
+        expire_at = datetime.fromisoformat(expire_raw.replace("Z", "+00:00")) if expire_raw else None
+        telegram_id = payload.pop("telegramId", None)
+        user = self.add_user(username, expire_at=expire_at, telegram_id=telegram_id, **payload)
+        return httpx.Response(201, json={"response": user})
+
+    def _handle_update(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content or b"{}")
+        user = self.users_by_uuid.get(payload.pop("uuid", None))
+        if user is None:
+            return httpx.Response(404, json={"message": "User not found", "errorCode": "A063"})
+        user.update(payload)
+        return httpx.Response(200, json={"response": user})
@@ -0,0 +1,289 @@
+"""Общая обвязка бенчмарков: окружение, база с синтетическими данными, заглушка Telegram и счётчики.
+
+Модуль нужно импортировать раньше модулей ``app``: он подставляет обязательные
+переменные окружения, если они не заданы.
+"""
+
+from __future__ import annotations
+
+import os
+
+for _key, _value in {
+    "BOT_TOKEN": "42:BENCH",
+    "DATABASE_URL": "sqlite+aiosqlite:///:memory:",
+    "OWNER_TELEGRAM_ID": "1",
+    "REMNAWAVE_API_URL": "http://fake-panel",
+    "REMNAWAVE_API_KEY": "bench",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+import asyncio
+import random
+import time
+import tracemalloc
+import typing
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.bot.handlers import pages
+from app.db.base import Base
+from app.db.init_db import init_db
+from app.db.session import SessionLocal, instrument_engine
+from app.models import Agent, Client
+from app.remnawave import breaker, lookup_cache
+from app.services import search_service
+from app.services.data_version import bump_agents_version, bump_clients_version
+from app.services.stats_service import check_agent_stats
+
+from benchmarks.fake_panel import FakePanel
+
+
+AGENT_TELEGRAM_ID_BASE = 1_000_000
+CLIENT_USERNAME_PREFIX = "client"
+
+# Счётчик текущей задачи (одного апдейта): http и telegram. Контекст наследуется
+# дочерними задачами и гринлетами SQLAlchemy, поэтому параллельные апдейты не смешиваются.
+current_tally: ContextVar[Counter[str] | None] = ContextVar("current_tally", default=None)
+
+
+def _tally(kind: str) -> None:
+    tally = current_tally.get()
+    if tally is not None:
+        tally[kind] += 1
+
+
+# --- база ---
+
+
+def reset_process_state() -> None:
+    """Сбрасывает кеши и состояние процесса, оставшиеся от прошлого прогона.
+
+    Кеши поиска панели, предохранители, страницы списков и поиск живут на уровне
+    модуля; без сброса следующий размер читал бы данные предыдущего.
+    """
+    for cache in lookup_cache._caches.values():
+        cache.invalidate()
+    lookup_cache._caches.clear()
+    breaker._breakers.clear()
+    pages.clear_page_cache()
+    for task in pages._PREFETCHING.values():
+        task.cancel()
+    pages._PREFETCHING.clear()
+    search_service._cache = None
+    bump_clients_version()
+    bump_agents_version()
+
+
+async def use_database(database_url: str) -> AsyncEngine:
+    """Пересоздаёт схему и переключает SessionLocal приложения на указанную базу."""
+    reset_process_state()
+    engine = create_async_engine(database_url)
+    instrument_engine(engine)
+    SessionLocal.configure(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await init_db(engine)
+    return engine
+
+
+async def seed_clients(
+    clients: int,
+    agents: int,
+    *,
+    seed: int = 0,
+    chunk_size: int = 5000,
+) -> None:
+    """Агенты ``agents`` и клиенты ``client{n}``, распределённые по ним по кругу.
+
+    Сроки — от -10 до +60 дней, так что часть клиентов попадает в окно уведомлений.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    async with SessionLocal() as session:
+        await session.execute(
+            insert(Agent),
+            [
+                {
+                    "telegram_id": AGENT_TELEGRAM_ID_BASE + n,
+                    "name": f"agent{n}",
+                    "telegram_username": f"agent{n}",
+                    "is_active": True,
+                    "credit_limit": 0,
+                    "current_debt": 0,
+                    "owner_share_percent": 100,
+                    "created_at": now,
+                }
+                for n in range(agents)
+            ],
+        )
+        for start in range(0, clients, chunk_size):
+            rows = []
+            for n in range(start, min(clients, start + chunk_size)):
+                expires_at = now + timedelta(days=rng.randint(-10, 60), hours=rng.randint(0, 23))
+                rows.append(
+                    {
+                        "agent_id": n % agents + 1,
+                        "telegram_id": 10_000_000 + n if n % 2 == 0 else None,
+                        "username": f"{CLIENT_USERNAME_PREFIX}{n}",
+                        "expires_at": expires_at,
+                        "monthly_price": 300,
+                        "last_payment_amount": 300,
+                        "last_payment_at": now - timedelta(days=rng.randint(0, 30)),
+                        "tariff_name": "Базовый",
+                        "tariff_base_price": 200,
+                        "created_at": now,
+                    }
+                )
+            await session.execute(insert(Client), rows)
+        await session.commit()
+        # Массовая вставка идёт мимо сервисов: сводки agent_stats строит проверка, как при старте бота.
+        await check_agent_stats(session)
+    # По той же причине версии данных не выросли: кеши отображения о новых клиентах не знают.
+    bump_clients_version()
+    bump_agents_version()
+
+
+def make_panel(clients: int, *, missing_ratio: float = 0.01, **options: Any) -> FakePanel:
+    """Панель с теми же username, что и в базе; ``missing_ratio`` клиентов в панели нет."""
+    panel = FakePanel(**options)
+    panel.seed_users(clients, prefix=CLIENT_USERNAME_PREFIX)
+    if missing_ratio:
+        for n in range(0, clients, max(1, round(1 / missing_ratio))):
+            panel.remove_user(f"{CLIENT_USERNAME_PREFIX}{n}")
+    return panel
+
+
+@contextmanager
+def count_queries(engine: AsyncEngine) -> Iterator[Counter[str]]:
+    """Считает SQL-запросы движка; ключ ``total`` и первое слово запроса (SELECT, UPDATE...)."""
+    counter: Counter[str] = Counter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        counter["total"] += 1
+        counter[statement.lstrip().split(None, 1)[0].upper()] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def tally_panel_calls(panel: FakePanel) -> None:
+    panel.listeners.append(lambda route: _tally("http"))
+
+
+def http_calls(panel: FakePanel) -> int:
+    # error/timeout — пометки поверх маршрутов, а не отдельные запросы.
+    return sum(count for route, count in panel.calls.items() if route not in ("error", "timeout"))
+
+
+# --- Telegram ---
+
+
+class StubTelegramSession(BaseSession):
+    """Сессия бота без сети: запоминает вызовы API и возвращает правдоподобные ответы."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        _tally("telegram")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        returning = method.__returning__
+        if returning is Message or Message in typing.get_args(returning):
+            self._message_id += 1
+            chat_id = getattr(method, "chat_id", None) or 0
+            return Message.model_validate(
+                {
+                    "message_id": getattr(method, "message_id", None) or self._message_id,
+                    "date": datetime.now(),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": getattr(method, "text", None),
+                },
+                context={"bot": bot},
+            )
+        return True
+
+    async def stream_content(self, url: str, *args: Any, **kwargs: Any) -> AsyncIterator[bytes]:
+        yield b""
+
+    async def close(self) -> None:
+        return None
+
+
+def make_bot(latency: float = 0.0) -> tuple[Bot, StubTelegramSession]:
+    session = StubTelegramSession(latency)
+    return Bot(token=os.environ["BOT_TOKEN"], session=session), session
+
+
+# --- замеры ---
+
+
+@dataclass
+class Measurement:
+    name: str
+    size: int
+    wall_seconds: float
+    queries: int
+    http_calls: int
+    telegram_calls: int
+    peak_memory_kb: float | None
+    detail: dict[str, Any] = field(default_factory=dict)
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+async def measure(
+    name: str,
+    size: int,
+    run: Callable[[], Awaitable[Any]],
+    *,
+    engine: AsyncEngine,
+    panel: FakePanel,
+    telegram: StubTelegramSession,
+    trace_memory: bool = True,
+) -> Measurement:
+    """Один прогон ``run`` с подсчётом запросов к базе, панели и Telegram.
+
+    tracemalloc заметно замедляет код, поэтому время без него честнее (``trace_memory=False``).
+    """
+    http_before = http_calls(panel)
+    telegram_before = sum(telegram.calls.values())
+    if trace_memory:
+        tracemalloc.start()
+    with count_queries(engine) as queries:
+        started = time.perf_counter()
+        result = await run()
+        wall = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return Measurement(
+        name=name,
+        size=size,
+        wall_seconds=round(wall, 4),
+        queries=queries["total"],
+        http_calls=http_calls(panel) - http_before,
+        telegram_calls=sum(telegram.calls.values()) - telegram_before,
+        peak_memory_kb=round(peak, 1) if peak is not None else None,
+        detail={"result": repr(result), "queries_by_kind": dict(queries)},
+    )
@@ -0,0 +1,412 @@
+"""Нагрузочный прогон реального Dispatcher синтетическими апдейтами.
+
+Виртуальные агенты параллельно проходят сценарии (/start, новый клиент, продление,
+листание списка, оплата долга), владелец — отчёт. Апдейты идут через
+``create_dispatcher().feed_update``; Telegram заменён заглушкой, панель — FakePanel.
+Рядом крутится воркер очереди задач панели, как в боте: запросы и вызовы его задач
+засчитываются сценарию, который их поставил (создание — new_client, продление — renew).
+По каждому сценарию выводятся p50/p95/p99 задержки апдейта и среднее число
+SQL-запросов, вызовов панели и Telegram API на апдейт.
+
+Запуск:
+    python -m benchmarks.load_dispatcher [--clients 10000] [--users 20] [--iterations 5]
+        [--flows start new_client renew list_paging pay_debt owner_report]
+        [--database-url ...] [--telegram-latency 0.03] [--panel-latency 0.02] [--output load.json]
+"""
+
+from __future__ import annotations
+
+# harness подставляет переменные окружения, поэтому импортируется раньше app.
+from benchmarks import harness
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from sqlalchemy import select
+
+from app.bot import callbacks as cb
+from app.bot.app import create_dispatcher
+from app.bot.handlers.jobs import notify_job_finished
+from app.config import get_settings
+from app.db.query_stats import QueryBudgetExceeded, assert_query_budget, track_queries
+from app.db.session import SessionLocal
+from app.models import Agent, Client, PanelJob
+from app.services.job_service import JOB_CREATE, JOB_EXTEND, _run_job, claim_jobs, wait_for_jobs
+
+
+_update_ids = itertools.count(1)
+
+
+@dataclass
+class VirtualUser:
+    telegram_id: int
+    name: str
+    renew_client_ids: list[int]
+    sequence: int = 0
+
+    def next_username(self) -> str:
+        self.sequence += 1
+        return f"load{self.telegram_id}x{self.sequence}"
+
+
+def _user_payload(user: VirtualUser) -> dict[str, Any]:
+    return {"id": user.telegram_id, "is_bot": False, "first_name": user.name, "username": user.name}
+
+
+def _message_payload(user: VirtualUser, text: str) -> dict[str, Any]:
+    return {
+        "message_id": next(_update_ids),
+        "date": int(time.time()),
+        "chat": {"id": user.telegram_id, "type": "private"},
+        "from": _user_payload(user),
+        "text": text,
+    }
+
+
+def message_update(bot: Bot, user: VirtualUser, text: str) -> Update:
+    update_id = next(_update_ids)
+    return Update.model_validate(
+        {"update_id": update_id, "message": _message_payload(user, text)},
+        context={"bot": bot},
+    )
+
+
+def callback_update(bot: Bot, user: VirtualUser, data: str) -> Update:
+    update_id = next(_update_ids)
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": _user_payload(user),
+                "chat_instance": "load",
+                "data": data,
+                "message": _message_payload(user, "menu"),
+            },
+        },
+        context={"bot": bot},
+    )
+
+
+# Шаг сценария: (бот, пользователь) -> апдейт. Пользователь хранит своё состояние.
+Step = Callable[[Bot, VirtualUser], Update]
+
+
+def _text(value: str | Callable[[VirtualUser], str]) -> Step:
+    return lambda bot, user: message_update(bot, user, value(user) if callable(value) else value)
+
+
+def _press(action: cb.CallbackAction, *values: Any) -> Step:
+    return lambda bot, user: callback_update(bot, user, action.pack(*values))
+
+
+def _renew_pick() -> Step:
+    def step(bot: Bot, user: VirtualUser) -> Update:
+        client_id = user.renew_client_ids[user.sequence % len(user.renew_client_ids)]
+        user.sequence += 1
+        return callback_update(bot, user, cb.RENEW_PICK.pack(client_id))
+
+    return step
+
+
+AGENT_FLOWS: dict[str, list[Step]] = {
+    "start": [_text("/start")],
+    "new_client": [
+        _press(cb.CLIENT_NEW),
+        _text(VirtualUser.next_username),
+        _press(cb.CLIENT_NEW_DAYS, 30),
+        _press(cb.AMOUNT_NEW, 300),
+        _press(cb.CLIENT_NEW_CONFIRM),
+    ],
+    "renew": [
+        _press(cb.CLIENT_RENEW),
+        _renew_pick(),
+        _press(cb.RENEW_DAYS, 30),
+        _press(cb.AMOUNT_RENEW, 300),
+        _press(cb.RENEW_CONFIRM),
+    ],
+    "list_paging": [
+        _press(cb.CLIENT_LIST),
+        _press(cb.CLIENT_LIST_PAGE, 2),
+        _press(cb.CLIENT_LIST_PAGE, 3),
+    ],
+    "pay_debt": [_press(cb.DEBT_PAY), _text("100")],
+}
+OWNER_FLOWS: dict[str, list[Step]] = {
+    "owner_report": [_press(cb.OWNER_REPORT), _press(cb.OWNER_REPORT_PAGE, 2)],
+}
+FLOWS = (*AGENT_FLOWS, *OWNER_FLOWS)
+# Сценарий, который ставит задачу этого вида: ему засчитывается работа воркера.
+JOB_FLOWS = {JOB_CREATE: "new_client", JOB_EXTEND: "renew"}
+# Опрос очереди в прогоне: задачи будят воркер сами, интервал нужен только для остановки.
+WORKER_POLL_SECONDS = 0.1
+
+# Потолок SQL-запросов на один апдейт сценария для --enforce-budgets.
+QUERY_BUDGETS: dict[str, int] = {
+    "start": 10,
+    "new_client": 10,
+    "renew": 10,
+    "list_paging": 8,
+    "pay_debt": 12,
+    "owner_report": 12,
+}
+
+
+class FlowStats:
+    def __init__(self) -> None:
+        self.update_latencies: dict[str, list[float]] = defaultdict(list)
+        self.flow_latencies: dict[str, list[float]] = defaultdict(list)
+        self.job_latencies: dict[str, list[float]] = defaultdict(list)
+        # Опросы очереди, которые нельзя отнести ни к одной задаче.
+        self.worker: Counter[str] = Counter()
+        self.tallies: dict[str, Counter[str]] = defaultdict(Counter)
+        self.errors: Counter[str] = Counter()
+        self.budget_failures: list[str] = []
+        self.budgets: dict[str, int] = {}
+
+    async def feed(self, dp: Dispatcher, bot: Bot, flow: str, update: Update) -> None:
+        tally: Counter[str] = Counter()
+        token = harness.current_tally.set(tally)
+        started = time.perf_counter()
+        try:
+            with track_queries() as queries:
+                await dp.feed_update(bot, update)
+        except Exception:
+            logging.exception("Load flow %s failed", flow)
+            self.errors[flow] += 1
+        finally:
+            self.update_latencies[flow].append(time.perf_counter() - started)
+            harness.current_tally.reset(token)
+        tally["updates"] += 1
+        tally["sql"] += queries.count
+        tally["db_us"] += int(queries.seconds * 1e6)
+        flow_tally = self.tallies[flow]
+        flow_tally.update(tally)
+        flow_tally["sql_max"] = max(flow_tally["sql_max"], queries.count)
+        budget = self.budgets.get(flow)
+        if budget is not None:
+            try:
+                assert_query_budget(queries, budget, f"{flow} update {update.event_type}")
+            except QueryBudgetExceeded as exc:
+                self.budget_failures.append(str(exc))
+
+    async def run_job(self, bot: Bot, job: PanelJob) -> None:
+        flow = JOB_FLOWS.get(job.kind, job.kind)
+        tally: Counter[str] = Counter()
+        token = harness.current_tally.set(tally)
+        started = time.perf_counter()
+        try:
+            with track_queries() as queries:
+                await _run_job(job, partial(notify_job_finished, bot))
+        finally:
+            self.job_latencies[flow].append(time.perf_counter() - started)
+            harness.current_tally.reset(token)
+        tally["jobs"] += 1
+        tally["sql"] += queries.count
+        tally["db_us"] += int(queries.seconds * 1e6)
+        self.tallies[flow].update(tally)
+
+    async def run_flow(self, dp: Dispatcher, bot: Bot, flow: str, steps: list[Step], user: VirtualUser) -> None:
+        started = time.perf_counter()
+        for step in steps:
+            await self.feed(dp, bot, flow, step(bot, user))
+        self.flow_latencies[flow].append(time.perf_counter() - started)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            flow: {
+                "updates": self.tallies[flow]["updates"],
+                "jobs": self.tallies[flow]["jobs"],
+                "errors": self.errors[flow],
+                "update_ms": _percentiles(self.update_latencies[flow]),
+                "flow_ms": _percentiles(self.flow_latencies[flow]),
+                "job_ms": _percentiles(self.job_latencies[flow]),
+                "sql_per_update": _per_update(self.tallies[flow], "sql"),
+                "sql_max_per_update": self.tallies[flow]["sql_max"],
+                "db_ms_per_update": round(_per_update(self.tallies[flow], "db_us") / 1000, 2),
+                "http_per_update": _per_update(self.tallies[flow], "http"),
+                "telegram_per_update": _per_update(self.tallies[flow], "telegram"),
+            }
+            for flow in self.update_latencies
+        }
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {}
+    if len(samples) == 1:
+        value = round(samples[0] * 1000, 2)
+        return {"p50": value, "p95": value, "p99": value, "max": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50": round(cuts[49] * 1000, 2),
+        "p95": round(cuts[94] * 1000, 2),
+        "p99": round(cuts[98] * 1000, 2),
+        "max": round(max(samples) * 1000, 2),
+    }
+
+
+def _per_update(tally: Counter[str], kind: str) -> float:
+    return round(tally[kind] / tally["updates"], 2) if tally["updates"] else 0.0
+
+
+async def _virtual_agents(count: int) -> list[VirtualUser]:
+    """Первые ``count`` агентов и их клиенты, которых уже можно продлевать."""
+    settings = get_settings()
+    renewable_until = datetime.utcnow() + timedelta(days=settings.renew_min_days_left)
+    async with SessionLocal() as session:
+        agents = (await session.execute(select(Agent).order_by(Agent.id).limit(count))).scalars().all()
+        rows = await session.execute(
+            select(Client.agent_id, Client.id).where(
+                Client.agent_id.in_([agent.id for agent in agents]),
+                Client.expires_at <= renewable_until,
+            )
+        )
+        renewable: dict[int, list[int]] = defaultdict(list)
+        for agent_id, client_id in rows.all():
+            renewable[agent_id].append(client_id)
+    return [
+        VirtualUser(agent.telegram_id, agent.name, renewable.get(agent.id) or [0]) for agent in agents
+    ]
+
+
+async def _run_user(dp, bot, stats: FlowStats, user: VirtualUser, flows: dict[str, list[Step]], iterations: int):
+    for _ in range(iterations):
+        for flow, steps in flows.items():
+            await stats.run_flow(dp, bot, flow, steps, user)
+
+
+async def _run_job_worker(bot: Bot, stats: FlowStats, stop: asyncio.Event) -> None:
+    """Воркер очереди, как ``run_job_worker_loop`` бота; после ``stop`` дорабатывает готовые задачи."""
+    settings = get_settings()
+    while True:
+        with track_queries() as queries:
+            async with SessionLocal() as session:
+                jobs = await claim_jobs(session, settings.job_worker_concurrency)
+        stats.worker["polls"] += 1
+        stats.worker["sql"] += queries.count
+        if jobs:
+            await asyncio.gather(*(stats.run_job(bot, job) for job in jobs))
+            continue
+        if stop.is_set():
+            return
+        await wait_for_jobs(WORKER_POLL_SECONDS)
+
+
+async def main(args) -> None:
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    settings = get_settings()
+    engine = await harness.use_database(args.database_url)
+    agents = max(args.users, args.clients // args.clients_per_agent)
+    await harness.seed_clients(args.clients, agents)
+    panel = harness.make_panel(args.clients, latency=args.panel_latency)
+    harness.tally_panel_calls(panel)
+    bot, telegram = harness.make_bot(latency=args.telegram_latency)
+    dp = create_dispatcher()
+
+    users = await _virtual_agents(args.users)
+    owner = VirtualUser(settings.owner_telegram_id, "owner", [0])
+    agent_flows = {name: steps for name, steps in AGENT_FLOWS.items() if name in args.flows}
+    owner_flows = {name: steps for name, steps in OWNER_FLOWS.items() if name in args.flows}
+
+    stats = FlowStats()
+    if args.enforce_budgets:
+        stats.budgets = {flow: QUERY_BUDGETS[flow] for flow in args.flows}
+    stop_worker = asyncio.Event()
+    started = time.perf_counter()
+    with panel.install():
+        worker = asyncio.create_task(_run_job_worker(bot, stats, stop_worker))
+        tasks = [_run_user(dp, bot, stats, user, agent_flows, args.iterations) for user in users]
+        if owner_flows:
+            tasks.append(_run_user(dp, bot, stats, owner, owner_flows, args.iterations))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            stop_worker.set()
+            await worker
+    wall = time.perf_counter() - started
+    await bot.session.close()
+    await engine.dispose()
+
+    flows = stats.report()
+    total_updates = sum(row["updates"] for row in flows.values())
+    print(f"clients={args.clients} users={args.users} updates={total_updates} wall={wall:.2f}s "
+          f"throughput={total_updates / wall:.1f} upd/s")
+    print(
+        f"{'flow':<14}{'p50':>9}{'p95':>9}{'p99':>9}{'sql/u':>8}{'sqlmax':>7}{'db ms/u':>9}"
+        f"{'http/u':>8}{'tg/u':>7}{'jobs':>6}{'job p95':>9}{'err':>5}"
+    )
+    for flow, row in flows.items():
+        ms = row["update_ms"]
+        print(
+            f"{flow:<14}{ms['p50']:>9.1f}{ms['p95']:>9.1f}{ms['p99']:>9.1f}"
+            f"{row['sql_per_update']:>8}{row['sql_max_per_update']:>7}{row['db_ms_per_update']:>9}"
+            f"{row['http_per_update']:>8}{row['telegram_per_update']:>7}{row['jobs']:>6}"
+            f"{row['job_ms'].get('p95', 0.0):>9.1f}{row['errors']:>5}"
+        )
+    print(f"воркер: опросов очереди {stats.worker['polls']}, SQL вне задач {stats.worker['sql']}")
+
+    if args.output:
+        report = {
+            "meta": {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "database": args.database_url.split("://", 1)[0],
+                "clients": args.clients,
+                "users": args.users,
+                "iterations": args.iterations,
+                "telegram_latency": args.telegram_latency,
+                "panel_latency": args.panel_latency,
+                "wall_seconds": round(wall, 3),
+                "updates": total_updates,
+                "telegram_calls": dict(telegram.calls),
+                "panel_calls": dict(panel.calls),
+                "worker": dict(stats.worker),
+            },
+            "flows": flows,
+        }
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"результаты: {args.output}")
+
+    if stats.budget_failures:
+        print(f"\nпревышен бюджет SQL-запросов: {len(stats.budget_failures)} апдейтов")
+        for failure in stats.budget_failures[:10]:
+            print(failure)
+        raise SystemExit(1)
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--clients-per-agent", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20, help="параллельных виртуальных агентов")
+    parser.add_argument("--iterations", type=int, default=5, help="проходов всех сценариев на пользователя")
+    parser.add_argument("--flows", nargs="+", choices=FLOWS, default=list(FLOWS))
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--panel-latency", type=float, default=0.0)
+    parser.add_argument("--enforce-budgets", action="store_true", help="код 1, если апдейт превысил QUERY_BUDGETS")
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        args.database_url = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='agenthub-load-')}/load.db"
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args(sys.argv[1:])))
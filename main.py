@@ -2,38 +2,60 @@ import asyncio
 import logging
 
 from app.bot.app import create_bot, create_dispatcher
+from app.bot.handlers.compensations import resume_compensations
+from app.bot.handlers.jobs import notify_job_finished
 from app.config import get_settings
 from app.db.init_db import init_db
 from app.db.session import SessionLocal, engine
+from app.loop_monitor import start_loop_monitor
+from app.metrics import start_metrics_server
 from app.remnawave.client import RemnawaveClient
+from app.services.job_service import process_due_jobs, wait_for_jobs
 from app.services.notify_service import notify_expiring_clients
+from app.services.profiling_service import sync_cycle_profile
+from app.services.revenue_service import backfill_revenue_if_empty
+from app.services.search_service import ensure_trigram_index
+from app.services.stats_service import check_agent_stats
 from app.services.sync_service import sync_all_clients_with_remnawave
+from app.texts import get_texts
 
 
 async def main() -> None:
     settings = get_settings()
     logging.basicConfig(level=settings.log_level)
+    texts = get_texts()
+    if texts.errors:
+        logging.warning("Texts with errors replaced by defaults: %s", ", ".join(texts.errors))
 
     bot = create_bot(settings.bot_token)
     dp = create_dispatcher()
 
     await init_db(engine)
-    asyncio.create_task(run_sync_loop())
-    asyncio.create_task(run_expiry_notify_loop(bot))
+    await ensure_trigram_index(engine)
+    async with SessionLocal() as session:
+        backfilled = await backfill_revenue_if_empty(session)
+    if backfilled:
+        logging.info("Revenue rollup backfilled: rows=%s", backfilled)
+    if settings.metrics_port:
+        await start_metrics_server(settings.metrics_host, settings.metrics_port)
+    if settings.loop_monitor_interval_ms:
+        start_loop_monitor(settings.loop_monitor_interval_ms / 1000, settings.loop_stall_threshold_ms / 1000)
+    asyncio.create_task(run_sync_loop(), name="sync")
+    asyncio.create_task(run_expiry_notify_loop(bot), name="expiry-notify")
+    asyncio.create_task(run_job_worker_loop(bot), name="job-worker")
+    asyncio.create_task(run_stats_check_loop(), name="stats-check")
+    resumed = await resume_compensations(bot)
+    if resumed:
+        logging.info("Compensations resumed: %s", resumed)
     await dp.start_polling(bot)
 
 
 async def run_sync_loop() -> None:
     settings = get_settings()
-    remnawave_client = RemnawaveClient(
-        settings.remnawave_api_url,
-        settings.remnawave_api_key,
-        settings.remnawave_mode,
-        settings.remnawave_caddy_token,
-    )
+    remnawave_client = RemnawaveClient.from_settings(settings)
     while True:
         try:
-            async with SessionLocal() as session:
+            async with SessionLocal() as session, sync_cycle_profile():
                 removed, updated = await sync_all_clients_with_remnawave(session, remnawave_client)
             logging.info("Sync finished. Removed=%s Updated=%s", removed, updated)
         except Exception as exc:
@@ -54,5 +76,34 @@ async def run_expiry_notify_loop(bot) -> None:
         await asyncio.sleep(settings.expiry_notify_interval_seconds)
 
 
+async def run_stats_check_loop() -> None:
+    settings = get_settings()
+    while True:
+        try:
+            async with SessionLocal() as session:
+                fixed = await check_agent_stats(session)
+            if fixed:
+                logging.info("Agent stats check: fixed=%s", fixed)
+        except Exception as exc:
+            logging.error("Agent stats check failed: %s", exc)
+        await asyncio.sleep(settings.agent_stats_check_interval_seconds)
+
+
+async def run_job_worker_loop(bot) -> None:
+    settings = get_settings()
+
+    async def on_finished(job) -> None:
+        await notify_job_finished(bot, job)
+
+    while True:
+        try:
+            processed = await process_due_jobs(on_finished)
+        except Exception as exc:
+            logging.error("Job worker failed: %s", exc)
+            processed = 0
+        if not processed:
+            await wait_for_jobs(settings.job_poll_interval_seconds)
+
+
 if __name__ == "__main__":
     asyncio.run(main())